@@ -1,20 +1,66 @@
+import asyncio
+import json
+import re
+import numpy as np
+from app.agents.planner import STOPWORDS, WORD, extract_keywords
+from app.core.config import settings
 from app.llm.client import LLMClient
+from app.llm.prompts.agent_prompts import evaluator_followup_prompt, evaluator_prompt
+from app.rag.embeddings import EmbeddingService
 from app.observability.logger import JsonLogger
 from typing import Dict, Any
 
-llm_client = LLMClient()
 logger = JsonLogger("evaluator-agent")
 
+EVALUATOR_MODES = ("auto", "local", "llm")
+
+# Weights of the local quality signals; they sum to 1
+RELEVANCE_WEIGHT = 0.3
+SUPPORT_WEIGHT = 0.3
+GROUNDING_WEIGHT = 0.2
+COVERAGE_WEIGHT = 0.2
+# Cosine similarities of related texts rarely leave this band, so it is stretched to [0, 1]
+SIMILARITY_FLOOR = 0.15
+SIMILARITY_CEILING = 0.75
+
+
+def _content_words(text: str) -> np.ndarray:
+    words = [w.lower() for w in WORD.findall(text)]
+    return np.array([w for w in words if w not in STOPWORDS and len(w) > 1], dtype=object)
+
+
+def _stretch(similarity: float) -> float:
+    return float(np.clip((similarity - SIMILARITY_FLOOR) / (SIMILARITY_CEILING - SIMILARITY_FLOOR), 0.0, 1.0))
+
 
 class EvaluatorAgent:
-    """Agent responsible for evaluating answer quality and determining if refinement is needed"""
+    """
+    Agent responsible for evaluating answer quality and determining if refinement is needed.
+
+    In ``auto`` mode (``EVALUATOR_MODE``) the answer is scored locally from
+    embedding similarity between question, answer and contexts plus lexical
+    grounding checks. Only scores inside
+    [``EVALUATOR_BORDERLINE_LOW``, ``EVALUATOR_BORDERLINE_HIGH``] are handed
+    to the LLM judge; ``local`` never calls it and ``llm`` always does.
+
+    Given the verifier's Ollama ``llm_context``, the LLM judge continues from
+    it with a short follow-up prompt instead of re-sending question and answer.
+    """
+
+    def __init__(self, llm_client: LLMClient, embedding_service: EmbeddingService, mode: str = None):
+        self.llm_client = llm_client
+        self.embedding_service = embedding_service
+        self.mode = (mode or settings.EVALUATOR_MODE).lower()
+        if self.mode not in EVALUATOR_MODES:
+            raise ValueError(f"Unknown evaluator mode '{self.mode}', expected one of {', '.join(EVALUATOR_MODES)}")
 
     async def evaluate(
         self, 
         question: str, 
         answer: str, 
         contexts: list[dict],
-        iteration: int = 0
+        iteration: int = 0,
+        llm_context: list[int] | None = None
     ) -> Dict[str, Any]:
         """
         Evaluate the quality of the generated answer.
@@ -24,12 +70,14 @@ class EvaluatorAgent:
             answer: Generated answer
             contexts: Retrieved contexts used for answer
             iteration: Current iteration number
+            llm_context: Ollama context of the verifier call that produced ``answer``
         
         Returns:
             Dictionary with:
             - quality_score: float (0.0 to 1.0)
             - needs_refinement: bool
             - feedback: str (reasoning for the evaluation)
+            - suggested_query_improvement: str or None
         """
         if not answer or not answer.strip():
             return {
@@ -55,41 +103,122 @@ class EvaluatorAgent:
                 "feedback": "Answer indicates insufficient information"
             }
 
-        # Use LLM to evaluate answer quality
-        context_count = len(contexts) if contexts else 0
-        context_summary = f"{context_count} context chunks retrieved"
-        
-        evaluation_prompt = f"""You are an answer quality evaluator. Evaluate if the answer adequately addresses the question based on the retrieved contexts.
+        if self.mode == "llm":
+            return await self.llm_evaluate(question, answer, contexts, iteration, llm_context)
 
-Question: {question}
+        try:
+            result = await self.local_evaluate(question, answer, contexts, iteration)
+        except Exception as e:
+            logger.log("ERROR", "local_evaluation_failed", error=str(e))
+            return await self.llm_evaluate(question, answer, contexts, iteration, llm_context)
 
-Answer: {answer}
+        borderline = settings.EVALUATOR_BORDERLINE_LOW <= result["quality_score"] <= settings.EVALUATOR_BORDERLINE_HIGH
+        if self.mode == "auto" and borderline:
+            logger.log("INFO", "evaluation_escalated", local_score=result["quality_score"], iteration=iteration)
+            return await self.llm_evaluate(question, answer, contexts, iteration, llm_context)
+        return result
 
-Context Information: {context_summary}
+    async def local_evaluate(
+        self,
+        question: str,
+        answer: str,
+        contexts: list[dict],
+        iteration: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Score the answer without an LLM call.
 
-Evaluate:
-1. Does the answer directly address the question? (Yes/No)
-2. Is the answer based on the provided contexts? (Yes/No/Uncertain)
-3. Is the answer complete and informative? (Yes/No/Partial)
-4. Would retrieving more or different contexts improve the answer? (Yes/No)
+        Signals, each in [0, 1]:
+        - relevance: answer/question embedding similarity
+        - support: best answer/context embedding similarity
+        - grounding: share of the answer's content words found in the contexts
+        - coverage: share of the question's keywords found in the answer or contexts
 
-Respond in JSON format:
-{{
-  "quality_score": <0.0 to 1.0>,
-  "needs_refinement": <true/false>,
-  "feedback": "<brief explanation>",
-  "suggested_query_improvement": "<if needs_refinement is true, suggest better search query>"
-}}
+        Scores below ``EVALUATOR_BORDERLINE_LOW`` ask for refinement. No query
+        is suggested, so the orchestrator falls back to its "more specific"
+        variant.
 
-JSON Response:"""
+        Returns:
+            Same shape as ``evaluate``
+        """
+        texts = [c.get("content", "") for c in contexts or [] if c.get("content")]
+
+        # Concurrent requests are coalesced into one encode call by the embedding service
+        vectors = np.array(
+            await asyncio.gather(*(self.embedding_service.embed_query(t) for t in [question, answer, *texts])),
+            dtype="float32"
+        )
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        question_vector, answer_vector, context_vectors = vectors[0], vectors[1], vectors[2:]
+
+        relevance = _stretch(float(answer_vector @ question_vector))
+        support = _stretch(float((context_vectors @ answer_vector).max())) if len(texts) else 0.0
+
+        answer_words = _content_words(answer)
+        context_words = np.unique(_content_words(" ".join(texts))) if texts else np.array([], dtype=object)
+        grounding = float(np.isin(answer_words, context_words).mean()) if answer_words.size else 0.0
+
+        keywords = np.array([k.lower() for k in extract_keywords(question)], dtype=object)
+        available = np.union1d(np.unique(answer_words), context_words) if answer_words.size else context_words
+        coverage = float(np.isin(keywords, available).mean()) if keywords.size else 1.0
+
+        signals = np.array([relevance, support, grounding, coverage])
+        weights = np.array([RELEVANCE_WEIGHT, SUPPORT_WEIGHT, GROUNDING_WEIGHT, COVERAGE_WEIGHT])
+        quality_score = round(float(signals @ weights), 2)
+        needs_refinement = quality_score < settings.EVALUATOR_BORDERLINE_LOW and iteration < 2
+
+        logger.log(
+            "INFO",
+            "evaluation_completed",
+            evaluator="local",
+            quality_score=quality_score,
+            relevance=round(relevance, 3),
+            support=round(support, 3),
+            grounding=round(grounding, 3),
+            coverage=round(coverage, 3),
+            needs_refinement=needs_refinement,
+            iteration=iteration
+        )
+
+        return {
+            "quality_score": quality_score,
+            "needs_refinement": needs_refinement,
+            "feedback": (
+                f"relevance {relevance:.2f}, context support {support:.2f}, "
+                f"grounding {grounding:.2f}, keyword coverage {coverage:.2f}"
+            ),
+            "suggested_query_improvement": None
+        }
+
+    async def llm_evaluate(
+        self,
+        question: str,
+        answer: str,
+        contexts: list[dict],
+        iteration: int = 0,
+        llm_context: list[int] | None = None
+    ) -> Dict[str, Any]:
+        """
+        Ask the LLM to judge the answer.
+
+        With ``llm_context`` (the verifier's Ollama context) the judge continues
+        that conversation, so only the follow-up prompt is prefilled.
+
+        Returns:
+            Same shape as ``evaluate``
+        """
+        # Use LLM to evaluate answer quality
+        if llm_context:
+            evaluation_prompt = evaluator_followup_prompt(question)
+        else:
+            context_count = len(contexts) if contexts else 0
+            context_summary = f"{context_count} context chunks retrieved"
+            evaluation_prompt = evaluator_prompt(question, answer, context_summary)
 
         try:
-            response = await llm_client.generate(evaluation_prompt)
+            response = await self.llm_client.generate(evaluation_prompt, context=llm_context)
             
             # Clean and parse JSON response
-            import json
-            import re
-            
             response = response.strip()
             if response.startswith("```"):
                 response = re.sub(r"^```(?:json)?\s*", "", response, flags=re.MULTILINE)
@@ -123,6 +252,8 @@ JSON Response:"""
             logger.log(
                 "INFO",
                 "evaluation_completed",
+                evaluator="llm",
+                continued_context=bool(llm_context),
                 quality_score=quality_score,
                 needs_refinement=needs_refinement,
                 iteration=iteration
@@ -136,6 +267,7 @@ JSON Response:"""
             return {
                 "quality_score": 0.5,
                 "needs_refinement": False,
-                "feedback": f"Evaluation failed: {str(e)}"
+                "feedback": f"Evaluation failed: {str(e)}",
+                "suggested_query_improvement": None
             }
 
@@ -1,22 +1,82 @@
+import asyncio
+import time
 from app.agents.planner import PlannerAgent
 from app.agents.executer import ExecutorAgent
-from app.agents.verifier import VerifierAgent
+from app.agents.verifier import VerifierAgent, ERROR_ANSWER
 from app.agents.evaluator import EvaluatorAgent
 from app.observability.logger import JsonLogger
 from app.observability.timing import measure_latency
+from app.llm.client import LLMClient
+from app.rag.embeddings import EmbeddingService
+from app.rag.context_packer import ContextPacker
+from app.core.config import settings
 from typing import Optional, Callable
 
-planner = PlannerAgent()
-executor = ExecutorAgent()
-verifier = VerifierAgent()
-evaluator = EvaluatorAgent()
-
 logger = JsonLogger("agent-orchestrator")
 
 # Feedback loop configuration
 MAX_ITERATIONS = 3
 MIN_QUALITY_THRESHOLD = 0.6
 
+ORCHESTRATOR_MODES = ("serial", "speculative")
+
+# Retrieval confidence is the mean similarity of this many best contexts
+CONFIDENCE_TOP_CONTEXTS = 3
+
+
+def fallback_question(question: str) -> str:
+    """Query used for the next iteration when the evaluator suggests none"""
+    return f"{question} (searching for more specific information)"
+
+
+def context_confidence(contexts: list[dict]) -> float:
+    """
+    Confidence in the retrieved contexts, in [0, 1].
+
+    Uses the cosine similarity ``score`` retrieval attaches to each context;
+    contexts without scores (e.g. cutoff disabled and keyword-only hits) fall
+    back to counting how many were found.
+    """
+    scores = sorted((c["score"] for c in contexts if c.get("score") is not None), reverse=True)
+    if not scores:
+        return min(1.0, len(contexts) / 5.0) if contexts else 0.0
+    top = scores[:CONFIDENCE_TOP_CONTEXTS]
+    return min(1.0, max(0.0, sum(top) / len(top)))
+
+
+class _Speculation:
+    """Plan and retrieval for a likely next query, running as a background task"""
+
+    def __init__(self, question: str, task: asyncio.Task):
+        self.question = question
+        self.task = task
+        self.started = time.perf_counter()
+        self.finished = None
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, _task: asyncio.Task):
+        self.finished = time.perf_counter()
+
+    async def consume(self) -> tuple[tuple[dict, list[dict]], float]:
+        """
+        Wait for the result.
+
+        Returns:
+            ``((plan, contexts), saved_seconds)`` where saved_seconds is how
+            long the task ran before it was needed, i.e. time overlapped with
+            verification and evaluation
+        """
+        saved = (self.finished or time.perf_counter()) - self.started
+        return await self.task, saved
+
+    async def cancel(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except BaseException:
+            # Cancelled, or failed before it was cancelled; the result is unused either way
+            pass
+
 
 class AgentOrchestrator:
     """
@@ -24,13 +84,57 @@ class AgentOrchestrator:
     1. Planner: Determines which tools to use
     2. Executor: Executes the planned tools
     3. Verifier: Generates final answer from retrieved contexts
+
+    All LLM-backed agents share the lifespan-owned ``llm_client``; the
+    evaluator scores answers locally with the shared ``embedding_service``.
+
+    With ``CONTEXT_PACKING_ENABLED``, retrieved contexts are packed (merged,
+    deduplicated and fitted to ``CONTEXT_TOKEN_BUDGET``) before they reach
+    the verifier and evaluator.
+
+    In ``speculative`` mode (``ORCHESTRATOR_MODE``), once an iteration has
+    its contexts, planning and retrieval for the fallback refinement query
+    start as a background task while the answer is verified and evaluated.
+    The next iteration reuses the result when it asks for that query, and
+    the task is cancelled otherwise. Speculation only starts when retrieval
+    confidence is below ``SPECULATION_MAX_RETRIEVAL_CONFIDENCE`` (so a
+    refinement is likely) and the rule-based planner can plan the query, so
+    it never adds an LLM generation competing with the verifier.
     """
 
+    def __init__(self, llm_client: LLMClient, embedding_service: EmbeddingService, mode: str = None):
+        self.planner = PlannerAgent(llm_client)
+        self.executor = ExecutorAgent()
+        self.verifier = VerifierAgent(llm_client)
+        self.evaluator = EvaluatorAgent(llm_client, embedding_service)
+        self.packer = ContextPacker(embedding_service) if settings.CONTEXT_PACKING_ENABLED else None
+        self.mode = (mode or settings.ORCHESTRATOR_MODE).lower()
+        if self.mode not in ORCHESTRATOR_MODES:
+            raise ValueError(
+                f"Unknown orchestrator mode '{self.mode}', expected one of {', '.join(ORCHESTRATOR_MODES)}"
+            )
+
+    def _should_speculate(self, question: str, contexts: list[dict], iteration: int) -> bool:
+        """Whether to retrieve for the fallback refinement query while this iteration is answered"""
+        if self.mode != "speculative" or iteration + 1 >= MAX_ITERATIONS:
+            return False
+        if context_confidence(contexts) >= settings.SPECULATION_MAX_RETRIEVAL_CONFIDENCE:
+            return False
+        return not self.planner.uses_llm(fallback_question(question))
+
+    async def _plan_and_execute(self, question: str, filters: dict | None) -> tuple[dict, list[dict]]:
+        plan = await self.planner.plan(question, filters)
+        if not plan or "tool" not in plan or "arguments" not in plan:
+            raise ValueError("Invalid plan returned from planner")
+        return plan, await self.executor.execute(plan)
+
     async def run(
         self, 
         question: str, 
         trace_id: str | None = None,
-        progress_callback: Optional[Callable[[str, str, dict], None]] = None
+        progress_callback: Optional[Callable[[str, str, dict], None]] = None,
+        token_callback: Optional[Callable[[str, dict], None]] = None,
+        filters: dict | None = None
     ) -> dict:
         """
         Execute the complete multi-agent workflow with feedback loop.
@@ -43,6 +147,11 @@ class AgentOrchestrator:
         Args:
             question: User's question
             trace_id: Optional trace ID for request tracking
+            progress_callback: Optional callback for stage updates (stage, message, data)
+            token_callback: Optional callback receiving answer fragments as they
+                are generated (fragment, data); when set, the verifier streams
+            filters: Optional metadata filter (``document_ids``, ``tags``)
+                applied to every retrieval
         
         Returns:
             Dictionary with answer, contexts, confidence, and quality_score
@@ -72,6 +181,10 @@ class AgentOrchestrator:
         best_quality = 0.0
         current_question = question
         all_contexts = []
+        seen_contexts = set()
+        speculation: _Speculation | None = None
+        # Wall-clock time speculative work overlapped with other stages
+        speculation_saved = 0.0
 
         try:
             for iteration in range(MAX_ITERATIONS):
@@ -90,32 +203,58 @@ class AgentOrchestrator:
                     max_iterations=MAX_ITERATIONS
                 )
 
+                # Speculative plan and retrieval from the previous iteration
+                speculated = None
+                if speculation is not None:
+                    if speculation.question == current_question:
+                        try:
+                            speculated, saved = await speculation.consume()
+                            speculation_saved += saved
+                            logger.log(
+                                "INFO",
+                                "speculative_retrieval_used",
+                                trace_id=trace_id,
+                                iteration=iteration + 1,
+                                saved_ms=round(saved * 1000, 2)
+                            )
+                        except Exception as e:
+                            # Redo the work inline; a real failure will surface there
+                            logger.log("WARN", "speculative_retrieval_failed", trace_id=trace_id, error=str(e))
+                    else:
+                        await speculation.cancel()
+                        logger.log("INFO", "speculative_retrieval_cancelled", trace_id=trace_id, iteration=iteration + 1)
+                    speculation = None
+
                 # Phase 1: Planning
                 if progress_callback:
                     progress_callback("planning", "Creating execution plan...", {"iteration": iteration + 1})
                 
-                with measure_latency() as elapsed:
-                    plan = await planner.plan(current_question)
+                if speculated is not None:
+                    plan, contexts = speculated
+                else:
+                    with measure_latency() as elapsed:
+                        plan = await self.planner.plan(current_question, filters)
 
-                logger.log(
-                    "INFO",
-                    "planning_completed",
-                    trace_id=trace_id,
-                    iteration=iteration + 1,
-                    tool=plan.get("tool"),
-                    latency_ms=round(elapsed() * 1000, 2)
-                )
+                    logger.log(
+                        "INFO",
+                        "planning_completed",
+                        trace_id=trace_id,
+                        iteration=iteration + 1,
+                        tool=plan.get("tool"),
+                        latency_ms=round(elapsed() * 1000, 2)
+                    )
 
-                # Validate plan
-                if not plan or "tool" not in plan or "arguments" not in plan:
-                    raise ValueError("Invalid plan returned from planner")
+                    # Validate plan
+                    if not plan or "tool" not in plan or "arguments" not in plan:
+                        raise ValueError("Invalid plan returned from planner")
 
                 # Phase 2: Execution
                 if progress_callback:
                     progress_callback("retrieving", "Retrieving relevant document contexts...", {"iteration": iteration + 1})
                 
                 with measure_latency() as elapsed:
-                    contexts = await executor.execute(plan)
+                    if speculated is None:
+                        contexts = await self.executor.execute(plan)
                 
                 if progress_callback:
                     progress_callback(
@@ -130,6 +269,7 @@ class AgentOrchestrator:
                     trace_id=trace_id,
                     iteration=iteration + 1,
                     contexts_count=len(contexts) if contexts else 0,
+                    speculative=speculated is not None,
                     latency_ms=round(elapsed() * 1000, 2)
                 )
 
@@ -159,15 +299,57 @@ class AgentOrchestrator:
                         )
                         break
 
-                # Accumulate contexts
-                all_contexts.extend(contexts)
+                # Accumulate contexts, without chunks an earlier iteration already returned
+                for context in contexts:
+                    key = (context.get("document_id"), context.get("chunk_index"), context.get("content"))
+                    if key not in seen_contexts:
+                        seen_contexts.add(key)
+                        all_contexts.append(context)
+
+                # The fallback refinement query is known now, so its retrieval
+                # can overlap verification and evaluation
+                if self._should_speculate(question, contexts, iteration):
+                    next_question = fallback_question(question)
+                    speculation = _Speculation(
+                        next_question,
+                        asyncio.create_task(self._plan_and_execute(next_question, filters))
+                    )
+
+                if self.packer:
+                    contexts = await self.packer.pack(contexts)
 
                 # Phase 3: Verification/Answer Generation
                 if progress_callback:
                     progress_callback("verifying", "Generating answer from contexts...", {"iteration": iteration + 1})
                 
+                first_token_ms = None
+                # Ollama context of the answer, continued by the LLM judge with LLM_CONTEXT_REUSE
+                llm_context = []
+                on_context = llm_context.extend if settings.LLM_CONTEXT_REUSE else None
                 with measure_latency() as elapsed:
-                    answer = await verifier.verify(current_question, contexts)
+                    if token_callback:
+                        # Forward fragments as they arrive; the evaluator still needs the full answer
+                        fragments = []
+                        try:
+                            async for fragment in self.verifier.verify_stream(current_question, contexts, on_context):
+                                if first_token_ms is None:
+                                    first_token_ms = round(elapsed() * 1000, 2)
+                                fragments.append(fragment)
+                                token_callback(fragment, {"iteration": iteration + 1})
+                            answer = "".join(fragments).strip()
+                        except Exception as e:
+                            # Same outcome as a failed verify(): the truncated answer is neither kept nor cached
+                            logger.log(
+                                "ERROR",
+                                "verification_stream_interrupted",
+                                trace_id=trace_id,
+                                iteration=iteration + 1,
+                                partial_length=len("".join(fragments)),
+                                error=str(e)
+                            )
+                            answer = ERROR_ANSWER
+                    else:
+                        answer = await self.verifier.verify(current_question, contexts, on_context)
 
                 logger.log(
                     "INFO",
@@ -175,6 +357,7 @@ class AgentOrchestrator:
                     trace_id=trace_id,
                     iteration=iteration + 1,
                     answer_length=len(answer) if answer else 0,
+                    time_to_first_token_ms=first_token_ms,
                     latency_ms=round(elapsed() * 1000, 2)
                 )
 
@@ -183,11 +366,12 @@ class AgentOrchestrator:
                     progress_callback("evaluating", "Assessing answer quality...", {"iteration": iteration + 1})
                 
                 with measure_latency() as elapsed:
-                    evaluation = await evaluator.evaluate(
+                    evaluation = await self.evaluator.evaluate(
                         question, 
                         answer, 
                         contexts,
-                        iteration=iteration
+                        iteration=iteration,
+                        llm_context=llm_context or None
                     )
                 
                 if progress_callback:
@@ -240,11 +424,11 @@ class AgentOrchestrator:
                     )
                 else:
                     # Use original question with emphasis
-                    current_question = f"{question} (searching for more specific information)"
+                    current_question = fallback_question(question)
 
-            # Calculate final confidence (combination of quality and context count)
-            context_confidence = min(1.0, len(best_contexts) / 5.0) if best_contexts else 0.0
-            final_confidence = (best_quality * 0.7) + (context_confidence * 0.3)
+            # Calculate final confidence (combination of answer quality and retrieval similarity)
+            retrieval_confidence = context_confidence(best_contexts)
+            final_confidence = (best_quality * 0.7) + (retrieval_confidence * 0.3)
 
             result = {
                 "answer": best_answer or "I couldn't generate an answer. Please try again.",
@@ -258,8 +442,11 @@ class AgentOrchestrator:
                 "agent_workflow_completed",
                 trace_id=trace_id,
                 final_confidence=final_confidence,
+                retrieval_confidence=round(retrieval_confidence, 4),
                 quality_score=best_quality,
-                iterations_used=min(iteration + 1, MAX_ITERATIONS)
+                iterations_used=min(iteration + 1, MAX_ITERATIONS),
+                orchestrator_mode=self.mode,
+                speculation_saved_ms=round(speculation_saved * 1000, 2)
             )
 
             # Emit progress: complete
@@ -270,7 +457,8 @@ class AgentOrchestrator:
                     {
                         "confidence": final_confidence,
                         "quality_score": best_quality,
-                        "contexts_count": len(best_contexts)
+                        "contexts_count": len(best_contexts),
+                        "speculation_saved_ms": round(speculation_saved * 1000, 2)
                     }
                 )
 
@@ -287,4 +475,8 @@ class AgentOrchestrator:
                 error=str(e),
                 error_type=type(e).__name__
             )
-            raise RuntimeError(f"Agent workflow failed: {str(e)}") from e
\ No newline at end of file
+            raise RuntimeError(f"Agent workflow failed: {str(e)}") from e
+        finally:
+            # Speculation for an iteration that never ran
+            if speculation is not None:
+                await speculation.cancel()
\ No newline at end of file
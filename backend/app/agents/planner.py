@@ -1,47 +1,179 @@
 from app.llm.client import LLMClient
+from app.llm.prompts.agent_prompts import planner_prompt
 from app.core.config import settings
 from app.observability.logger import JsonLogger
+from app.tools.registry import list_tools
 import json
 import re
 
-llm_client = LLMClient()
 logger = JsonLogger("planner-agent")
 
+PLANNER_MODES = ("auto", "fast", "llm")
+DEFAULT_TOOL = "retrieve_documents"
+
+# Lower-cased words that carry no search signal
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his
+how i if in into is it its itself just me more most my no nor not now of off on once only or other our ours out
+over own please same she should so some such than that the their theirs them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with would you your
+tell know explain describe give show find list say mean means
+""".split())
+
+# Conversational lead-ins stripped from the search query
+FILLER_PREFIX = re.compile(
+    r"^(?:(?:hi|hello|hey)[,!.\s]+)?(?:(?:can|could|would) you\s+)?(?:please\s+)?(?:tell me|let me know|i want to know|i'd like to know)?\s*",
+    re.IGNORECASE
+)
+# Questions a single retrieval answers well
+SIMPLE_QUESTION = re.compile(
+    r"^(?:what|who|whom|when|where|which|how|why|is|are|does|do|can|define|explain|describe|list|summari[sz]e|give|show|find)\b",
+    re.IGNORECASE
+)
+WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9_\-\.]*[A-Za-z0-9]|[A-Za-z0-9]")
+PRONOUN_ONLY = frozenset({"it", "this", "that", "they", "them", "those", "these", "he", "she"})
+
+
+def extract_keywords(text: str) -> list[str]:
+    """Content words of ``text`` in order, without stopwords or duplicates"""
+    seen = set()
+    keywords = []
+    for word in WORD.findall(text):
+        lower = word.lower()
+        if lower in STOPWORDS or lower in seen or (len(lower) < 2 and not lower.isdigit()):
+            continue
+        seen.add(lower)
+        keywords.append(word)
+    return keywords
+
 
 class PlannerAgent:
-    """Agent responsible for planning tool usage based on user questions"""
+    """
+    Agent responsible for planning tool usage based on user questions.
+
+    In ``auto`` mode (``PLANNER_MODE``) a rule-based planner handles the
+    common case without an LLM round trip: a single registered tool, or a
+    simple question, with heuristic confidence at least
+    ``PLANNER_FAST_MIN_CONFIDENCE``. Everything else goes to the LLM planner.
+    """
+
+    def __init__(self, llm_client: LLMClient, mode: str = None):
+        self.llm_client = llm_client
+        self.mode = (mode or settings.PLANNER_MODE).lower()
+        if self.mode not in PLANNER_MODES:
+            raise ValueError(f"Unknown planner mode '{self.mode}', expected one of {', '.join(PLANNER_MODES)}")
 
-    async def plan(self, question: str) -> dict:
+    async def plan(self, question: str, filters: dict | None = None) -> dict:
         """
         Plan which tool to use and with what arguments.
         
         Args:
             question: User's question
+            filters: Optional metadata filter from the request; it is set on
+                the plan for tools that accept ``filters``, never chosen by the LLM
         
         Returns:
             Dictionary with 'tool' and 'arguments' keys
         """
-        prompt = f"""You are an AI planner that decides which tools to use.
+        return self._apply_filters(await self._plan(question), filters)
 
-Available tools:
-- retrieve_documents(query: string, top_k: integer): Search for relevant documents
+    def _apply_filters(self, plan: dict, filters: dict | None) -> dict:
+        if not isinstance(plan, dict) or not isinstance(plan.get("arguments"), dict):
+            return plan
+        plan["arguments"].pop("filters", None)
+        if filters:
+            tool = next((t for t in list_tools() if t.name == plan.get("tool")), None)
+            if tool is not None and "filters" in tool.input_schema:
+                plan["arguments"]["filters"] = filters
+        return plan
+
+    def _accepts_fast_plan(self, confidence: float, simple: bool) -> bool:
+        return self.mode == "fast" or (
+            confidence >= settings.PLANNER_FAST_MIN_CONFIDENCE and (len(list_tools()) <= 1 or simple)
+        )
 
-Given the user question, respond ONLY with valid JSON (no markdown, no code blocks):
+    def uses_llm(self, question: str) -> bool:
+        """Whether planning ``question`` takes an LLM round trip"""
+        if self.mode == "llm":
+            return True
+        _, confidence, simple = self.fast_plan(question)
+        return not self._accepts_fast_plan(confidence, simple)
 
-{{
-  "tool": "retrieve_documents",
-  "arguments": {{
-    "query": "<extract the key search terms from the question>",
-    "top_k": {settings.RETRIEVAL_TOP_K}
-  }}
-}}
+    async def _plan(self, question: str) -> dict:
+        if self.mode != "llm":
+            plan, confidence, simple = self.fast_plan(question)
+            if self._accepts_fast_plan(confidence, simple):
+                logger.log(
+                    "INFO",
+                    "plan_created",
+                    planner="fast",
+                    tool=plan["tool"],
+                    query=plan["arguments"]["query"],
+                    confidence=confidence
+                )
+                return plan
+            logger.log("INFO", "fast_plan_rejected", confidence=confidence, simple=simple, tools=len(list_tools()))
 
-Question: {question}
+        return await self.llm_plan(question)
+
+    def fast_plan(self, question: str) -> tuple[dict, float, bool]:
+        """
+        Rule-based plan for ``question``.
+
+        The search query is the question without conversational filler (the
+        embedding model handles natural questions well); keywords only feed
+        the confidence heuristic.
+
+        Returns:
+            ``(plan, confidence, simple)`` where confidence is in [0, 1] and
+            simple tells whether the question matches a single-lookup pattern
+        """
+        query = FILLER_PREFIX.sub("", question.strip()).strip() or question.strip()
+        keywords = extract_keywords(query)
+        words = WORD.findall(query)
+        sentences = [s for s in re.split(r"[.?!]+\s+", query) if s.strip()]
+
+        confidence = 1.0
+        if not keywords:
+            confidence = 0.0
+        elif len(keywords) == 1 and any(w.lower() in PRONOUN_ONLY for w in words):
+            # "what about it?" needs context the planner does not have
+            confidence -= 0.6
+        if len(words) > 40:
+            confidence -= 0.3
+        if len(sentences) > 1 or query.count("?") > 1:
+            confidence -= 0.3
+
+        simple = bool(SIMPLE_QUESTION.match(query)) and len(sentences) == 1
+        plan = {
+            "tool": DEFAULT_TOOL,
+            "arguments": {
+                "query": query,
+                "top_k": settings.RETRIEVAL_TOP_K
+            }
+        }
+        return plan, round(max(0.0, confidence), 2), simple
+
+    async def llm_plan(self, question: str) -> dict:
+        """
+        Ask the LLM which tool to use and with what arguments.
+
+        Args:
+            question: User's question
+
+        Returns:
+            Dictionary with 'tool' and 'arguments' keys
+        """
+        available_tools = "\n".join(
+            f"- {tool.name}({', '.join(f'{arg}: {kind}' for arg, kind in tool.input_schema.items())}): {tool.description}"
+            for tool in list_tools()
+        ) or "- retrieve_documents(query: string, top_k: integer): Search for relevant documents"
 
-JSON Response:"""
+        prompt = planner_prompt(available_tools, settings.RETRIEVAL_TOP_K, question)
 
         try:
-            response = await llm_client.generate(prompt)
+            response = await self.llm_client.generate(prompt)
             
             # Clean response - remove markdown code blocks if present
             response = response.strip()
@@ -63,7 +195,7 @@ JSON Response:"""
             if "top_k" not in plan["arguments"]:
                 plan["arguments"]["top_k"] = settings.RETRIEVAL_TOP_K
             
-            logger.log("INFO", "plan_created", tool=plan["tool"], query=plan["arguments"].get("query"))
+            logger.log("INFO", "plan_created", planner="llm", tool=plan["tool"], query=plan["arguments"].get("query"))
             
             return plan
         
@@ -1,26 +1,43 @@
 from app.llm.client import LLMClient
+from app.llm.prompts.agent_prompts import verifier_prompt
 from app.observability.logger import JsonLogger
+from typing import AsyncIterator, Callable
 
-llm_client = LLMClient()
 logger = JsonLogger("verifier-agent")
 
+NO_DOCUMENTS_ANSWER = "I don't have enough information to answer this question. Please upload relevant documents first."
+NO_CONTEXT_ANSWER = "I don't have enough information to answer this question."
+ERROR_ANSWER = "I encountered an error while generating a response. Please try again."
+# Openings of the fallbacks above and of the refusal the verifier prompt asks the model for
+FALLBACK_ANSWER_PREFIXES = ("I don't have enough information", "I encountered an error")
+
+
+def is_fallback_answer(answer: str | None) -> bool:
+    """Whether ``answer`` is a refusal or error message rather than an actual answer"""
+    return not answer or answer.strip().startswith(FALLBACK_ANSWER_PREFIXES)
+
 
 class VerifierAgent:
-    """Agent responsible for generating final answers from retrieved contexts"""
+    """
+    Agent responsible for generating final answers from retrieved contexts.
+
+    ``on_context`` receives the Ollama context of the generated answer, so
+    the evaluator can continue from it instead of re-sending the prompt.
+    """
+
+    def __init__(self, llm_client: LLMClient):
+        self.llm_client = llm_client
 
-    async def verify(self, question: str, contexts: list[dict]) -> str:
+    def _build_prompt(self, question: str, contexts: list[dict]) -> tuple[str | None, str | None]:
         """
-        Generate answer from retrieved contexts with verification focus.
-        
-        Args:
-            question: User's question
-            contexts: List of retrieved context dictionaries with 'content' key
-        
+        Build the answer prompt.
+
         Returns:
-            Generated answer string
+            ``(prompt, None)``, or ``(None, fallback_answer)`` when there is no
+            usable context
         """
         if not contexts:
-            return "I don't have enough information to answer this question. Please upload relevant documents first."
+            return None, NO_DOCUMENTS_ANSWER
         
         # Extract content from contexts (handle both 'content' and 'context' keys for compatibility)
         context_list = []
@@ -30,38 +47,82 @@ class VerifierAgent:
                 context_list.append({"content": content})
         
         if not context_list:
-            return "I don't have enough information to answer this question."
+            return None, NO_CONTEXT_ANSWER
         
-        # Build verification-focused prompt
+        # Build verification-focused prompt; static instructions come first so Ollama reuses their KV cache
         context_text = "\n\n".join(
             f"[Context {i+1}]: {c['content']}" 
             for i, c in enumerate(context_list)
         )
+        return verifier_prompt(context_text, question), None
+
+    async def verify(
+        self,
+        question: str,
+        contexts: list[dict],
+        on_context: Callable[[list[int]], None] | None = None
+    ) -> str:
+        """
+        Generate answer from retrieved contexts with verification focus.
         
-        prompt = f"""You are a verification agent that answers questions based ONLY on the provided context.
+        Args:
+            question: User's question
+            contexts: List of retrieved context dictionaries with 'content' key
+            on_context: Optional callback for the Ollama context of the answer
+        
+        Returns:
+            Generated answer string
+        """
+        prompt, fallback = self._build_prompt(question, contexts)
+        if fallback:
+            return fallback
 
-Your role is to:
-1. Verify that the answer can be derived from the given context
-2. Provide accurate, factual answers based solely on the context
-3. Clearly state when the context is insufficient
+        try:
+            answer = await self.llm_client.generate(prompt, on_context=on_context)
+            logger.log("INFO", "verification_completed", question_length=len(question), contexts_count=len(contexts))
+            return answer.strip()
+        except Exception as e:
+            logger.log("ERROR", "verification_failed", error=str(e))
+            return ERROR_ANSWER
 
-Context:
-{context_text}
+    async def verify_stream(
+        self,
+        question: str,
+        contexts: list[dict],
+        on_context: Callable[[list[int]], None] | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of ``verify`` that yields the answer as it is generated.
+
+        Fallback and error messages are yielded as a single fragment, so the
+        joined fragments always form the complete answer. A generation that
+        fails after fragments were yielded re-raises instead, since the
+        partial answer is not usable.
 
-Question: {question}
+        Args:
+            question: User's question
+            contexts: List of retrieved context dictionaries with 'content' key
+            on_context: Optional callback for the Ollama context of the answer
 
-Instructions:
-- Answer the question using ONLY information from the context above
-- If the answer cannot be found in the context, respond with "I don't have enough information in the provided documents to answer this question."
-- Be precise and cite relevant parts of the context when possible
-- Do not make assumptions or use knowledge outside the provided context
+        Yields:
+            Answer text fragments
 
-Answer:"""
+        Raises:
+            Exception: The generation error, when the stream broke after its first fragment
+        """
+        prompt, fallback = self._build_prompt(question, contexts)
+        if fallback:
+            yield fallback
+            return
 
+        produced = False
         try:
-            answer = await llm_client.generate(prompt)
-            logger.log("INFO", "verification_completed", question_length=len(question), contexts_count=len(context_list))
-            return answer.strip()
+            async for fragment in self.llm_client.generate_stream(prompt, on_context=on_context):
+                produced = True
+                yield fragment
+            logger.log("INFO", "verification_completed", question_length=len(question), contexts_count=len(contexts), streamed=True)
         except Exception as e:
-            logger.log("ERROR", "verification_failed", error=str(e))
-            return "I encountered an error while generating a response. Please try again."
\ No newline at end of file
+            logger.log("ERROR", "verification_failed", error=str(e), streamed=True, partial=produced)
+            if produced:
+                raise
+            yield ERROR_ANSWER
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
-from app.schemas.document import DocumentResponse
+from fastapi import APIRouter, Depends, Request, Response, UploadFile, File, Form, HTTPException, status
+from app.auth.api_key import validate_api_key
+from app.auth.rate_limit import rate_limit
+from app.schemas.document import DocumentResponse, DocumentStatusResponse, DocumentDeleteResponse
 from app.services.document_service import DocumentService
-from app.rag.ingest import ingest_document
+from app.services.ingestion_scheduler import STATUS_DELETED, DuplicateDocumentError, QueueFullError
 from app.core.config import settings
 from app.observability.logger import JsonLogger
 from pathlib import Path
 import aiofiles
 import asyncio
+import hashlib
+import shutil
+import weakref
 
 router = APIRouter(prefix='/documents')
 logger = JsonLogger("documents-api")
@@ -16,38 +21,137 @@ document_service = DocumentService()
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".md"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+# Suggested client back-off when the ingestion queue is full
+QUEUE_FULL_RETRY_AFTER_SECONDS = 30
+# Replacing or deleting a document destroys indexed content, so it needs an API key
+DESTRUCTIVE_ROUTE_DEPENDENCIES = [Depends(validate_api_key), Depends(rate_limit)]
+# Serializes replace and delete per document, from the active-job check until
+# the new job is queued; entries go away once no request holds them
+_document_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
 
 
-@router.post("/upload", response_model=DocumentResponse)
-async def upload_document(file: UploadFile = File(...)):
+def document_lock(document_id: str) -> asyncio.Lock:
+    lock = _document_locks.get(document_id)
+    if lock is None:
+        lock = _document_locks[document_id] = asyncio.Lock()
+    return lock
+
+
+def queue_full_error(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER_SECONDS)}
+    )
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """Validate the file type and size of an upload and return its content"""
+    file_ext = Path(file.filename).suffix.lower() if file.filename else ""
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+    content = await file.read()
+    if len(content) > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024}MB"
+        )
+    return content
+
+
+async def save_upload(document_id: str, filename: str | None, content: bytes) -> Path:
+    """Write an uploaded file to the document's storage directory, replacing what was there"""
+    storage_path = Path(settings.DOCUMENT_STORAGE_PATH) / document_id
+    shutil.rmtree(storage_path, ignore_errors=True)
+    storage_path.mkdir(parents=True, exist_ok=True)
+
+    file_path = storage_path / (filename or "document")
+    async with aiofiles.open(file_path, "wb") as f:
+        await f.write(content)
+    return file_path
+
+
+def split_tags(tags: str | None) -> list[str]:
+    return [tag for tag in (tags or "").split(",") if tag.strip()]
+
+
+async def duplicate_document(
+    request: Request,
+    response: Response,
+    document_id: str,
+    filename: str | None,
+    tags: list[str]
+) -> DocumentResponse:
+    """Answer an upload whose content is already ingested (or queued) with the existing document"""
+    vector_store = request.app.state.vector_store
+    if tags:
+        await asyncio.to_thread(
+            vector_store.set_document_tags, document_id, vector_store.document_tags(document_id) + tags
+        )
+    job_status = await request.app.state.ingestion_scheduler.status(document_id)
+
+    logger.log("INFO", "document_upload_deduplicated", document_id=document_id, filename=filename)
+
+    response.status_code = status.HTTP_200_OK
+    return DocumentResponse(
+        document_id=document_id,
+        title=filename or "Untitled",
+        status=job_status["status"],
+        queue_position=job_status["queue_position"],
+        tags=vector_store.document_tags(document_id),
+        duplicate=True
+    )
+
+
+def document_in_progress_error(document_id: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Document {document_id} is still being ingested. Please retry once it has finished."
+    )
+
+
+@router.post("/upload", response_model=DocumentResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_document(
+    request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    tags: str | None = Form(None)
+):
     """
     Upload and ingest a document into the RAG system.
     
     Flow:
     1. Validate file type and size
-    2. Create document record
-    3. Save file to storage
-    4. Trigger background ingestion (chunking, embedding, vector store)
+    2. Short-circuit to the existing document if its SHA-256 was already uploaded
+    3. Reject with 429 if the ingestion queue is full
+    4. Create document record
+    5. Save file to storage
+    6. Queue ingestion (chunking, embedding, vector store) on the scheduler
+
+    ``tags`` is an optional comma-separated list used to filter queries; on a
+    duplicate upload they are added to the existing document.
     
-    Returns immediately after file save; ingestion runs asynchronously.
+    Returns 202 immediately after the job is queued, with its queue position,
+    or 200 with ``duplicate`` set and the existing document's id and status.
     """
-    trace_id = None  # Could be added if needed for document uploads
+    scheduler = request.app.state.ingestion_scheduler
     try:
-        # Validate file extension
-        file_ext = Path(file.filename).suffix.lower() if file.filename else ""
-        if file_ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-            )
+        # Validate file type and size
+        content = await read_upload(file)
 
-        # Validate file size
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024}MB"
-            )
+        # Identical content maps to the document that already holds it
+        content_hash = hashlib.sha256(content).hexdigest()
+        existing = await scheduler.find_document(content_hash)
+        if existing is not None:
+            return await duplicate_document(request, response, existing["document_id"], file.filename, split_tags(tags))
+
+        # Push back before writing anything to disk
+        if not await scheduler.has_capacity():
+            raise queue_full_error("Ingestion queue is full. Please retry later.")
 
         # Create document record
         document = document_service.create_document(
@@ -64,13 +168,7 @@ async def upload_document(file: UploadFile = File(...)):
         )
 
         # Save file to storage
-        storage_path = Path(settings.DOCUMENT_STORAGE_PATH) / document["document_id"]
-        storage_path.mkdir(parents=True, exist_ok=True)
-        
-        file_path = storage_path / (file.filename or "document")
-
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
+        file_path = await save_upload(document["document_id"], file.filename, content)
 
         logger.log(
             "INFO",
@@ -79,55 +177,40 @@ async def upload_document(file: UploadFile = File(...)):
             file_path=str(file_path)
         )
 
-        # Ingest document asynchronously (don't block response)
-        # Use create_task to run in background, but track it for error handling
-        ingestion_task = asyncio.create_task(
-            asyncio.to_thread(ingest_document, file_path, document["document_id"])
-        )
-        
-        # Add callback to log ingestion completion/failure
-        def ingestion_done(task):
-            try:
-                if task.exception():
-                    exception = task.exception()
-                    error_msg = str(exception)
-                    error_type = type(exception).__name__
-                    logger.log(
-                        "ERROR",
-                        "ingestion_failed",
-                        document_id=document["document_id"],
-                        error=error_msg,
-                        error_type=error_type,
-                        traceback=str(exception.__traceback__) if hasattr(exception, '__traceback__') else None
-                    )
-                else:
-                    logger.log(
-                        "INFO",
-                        "ingestion_completed",
-                        document_id=document["document_id"]
-                    )
-            except Exception as e:
-                import traceback
-                logger.log(
-                    "ERROR",
-                    "ingestion_callback_error",
-                    document_id=document["document_id"],
-                    error=str(e),
-                    traceback=traceback.format_exc()
-                )
-        
-        ingestion_task.add_done_callback(ingestion_done)
+        document_tags = split_tags(tags)
+        if document_tags:
+            await asyncio.to_thread(
+                request.app.state.vector_store.set_document_tags, document["document_id"], document_tags
+            )
+            document_tags = request.app.state.vector_store.document_tags(document["document_id"])
+
+        # Queue ingestion on the persistent, bounded scheduler
+        try:
+            queue_position = await scheduler.submit(document["document_id"], file_path, content_hash, deduplicate=True)
+        except (QueueFullError, DuplicateDocumentError) as e:
+            # Lost the race for the last slot or to an identical upload; don't leave an orphaned file behind
+            shutil.rmtree(file_path.parent, ignore_errors=True)
+            if document_tags:
+                await asyncio.to_thread(request.app.state.vector_store.set_document_tags, document["document_id"], [])
+            if isinstance(e, DuplicateDocumentError):
+                return await duplicate_document(request, response, e.document_id, file.filename, document_tags)
+            raise queue_full_error(str(e))
 
         logger.log(
             "INFO",
             "document_upload_completed",
-            document_id=document["document_id"]
+            document_id=document["document_id"],
+            queue_position=queue_position
         )
 
-        return DocumentResponse(**document)
+        return DocumentResponse(
+            **{**document, "status": "queued"},
+            queue_position=queue_position,
+            tags=document_tags
+        )
     
     except HTTPException:
-        # Re-raise HTTP exceptions (validation errors)
+        # Re-raise HTTP exceptions (validation errors, backpressure)
         raise
     except Exception as e:
         logger.log(
@@ -141,3 +224,161 @@ async def upload_document(file: UploadFile = File(...)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to upload document. Please try again."
         )
+
+
+@router.get("/{document_id}/status", response_model=DocumentStatusResponse)
+async def document_status(request: Request, document_id: str):
+    """Return the ingestion status and queue position of a document"""
+    job_status = await request.app.state.ingestion_scheduler.status(document_id)
+    if job_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document {document_id} not found"
+        )
+    return DocumentStatusResponse(**job_status)
+
+
+@router.put(
+    "/{document_id}",
+    response_model=DocumentResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=DESTRUCTIVE_ROUTE_DEPENDENCIES
+)
+async def replace_document(
+    request: Request,
+    response: Response,
+    document_id: str,
+    file: UploadFile = File(...),
+    tags: str | None = Form(None)
+):
+    """
+    Replace a document's content and re-ingest it under the same id.
+
+    The old chunks are tombstoned before the new version is queued, so
+    searches never see both. Tags are kept unless ``tags`` is given.
+    Re-sending the content the document already holds only updates its tags.
+    Returns 409 while the document is still being ingested, including by a
+    concurrent replace. Requires an
+    ``X-API-Key`` and counts against the rate limit.
+    """
+    scheduler = request.app.state.ingestion_scheduler
+    vector_store = request.app.state.vector_store
+    try:
+        content = await read_upload(file)
+
+        # Two replaces of one document must not both pass the check below and both queue a job
+        async with document_lock(document_id):
+            job_status = await scheduler.status(document_id)
+            if job_status is None or job_status["status"] == STATUS_DELETED:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Document {document_id} not found"
+                )
+            if await scheduler.is_active(document_id):
+                raise document_in_progress_error(document_id)
+
+            content_hash = hashlib.sha256(content).hexdigest()
+            if await scheduler.find_document(content_hash, document_id) is not None:
+                if tags is not None:
+                    await asyncio.to_thread(vector_store.set_document_tags, document_id, split_tags(tags))
+                logger.log("INFO", "document_replace_unchanged", document_id=document_id)
+                response.status_code = status.HTTP_200_OK
+                return DocumentResponse(
+                    document_id=document_id,
+                    title=file.filename or "Untitled",
+                    status=job_status["status"],
+                    tags=vector_store.document_tags(document_id)
+                )
+
+            if not await scheduler.has_capacity():
+                raise queue_full_error("Ingestion queue is full. Please retry later.")
+
+            deleted_chunks = await asyncio.to_thread(vector_store.delete_document, document_id, tags is None)
+            if tags is not None:
+                await asyncio.to_thread(vector_store.set_document_tags, document_id, split_tags(tags))
+            file_path = await save_upload(document_id, file.filename, content)
+
+            try:
+                queue_position = await scheduler.submit(document_id, file_path, content_hash)
+            except QueueFullError as e:
+                # The old version is already gone; report the document as deleted and drop the new file
+                shutil.rmtree(file_path.parent, ignore_errors=True)
+                await scheduler.mark_deleted(document_id)
+                raise queue_full_error(str(e))
+
+            logger.log(
+                "INFO",
+                "document_replaced",
+                document_id=document_id,
+                filename=file.filename,
+                deleted_chunks=deleted_chunks,
+                queue_position=queue_position
+            )
+
+            return DocumentResponse(
+                document_id=document_id,
+                title=file.filename or "Untitled",
+                status="queued",
+                queue_position=queue_position,
+                tags=vector_store.document_tags(document_id)
+            )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.log(
+            "ERROR",
+            "document_replace_failed",
+            document_id=document_id,
+            error=str(e),
+            error_type=type(e).__name__
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to replace document. Please try again."
+        )
+
+
+@router.delete(
+    "/{document_id}",
+    response_model=DocumentDeleteResponse,
+    dependencies=DESTRUCTIVE_ROUTE_DEPENDENCIES
+)
+async def delete_document(request: Request, document_id: str):
+    """
+    Delete a document: its chunks are tombstoned immediately (excluded from
+    search) and physically removed by background compaction.
+
+    Returns 409 while the document is still being ingested. Requires an
+    ``X-API-Key`` and counts against the rate limit.
+    """
+    scheduler = request.app.state.ingestion_scheduler
+    vector_store = request.app.state.vector_store
+
+    # Not interleaved with a replace of the same document
+    async with document_lock(document_id):
+        job_status = await scheduler.status(document_id)
+        if job_status is not None and job_status["status"] == STATUS_DELETED:
+            job_status = None
+        if job_status is not None and await scheduler.is_active(document_id):
+            raise document_in_progress_error(document_id)
+
+        try:
+            deleted_chunks = await asyncio.to_thread(vector_store.delete_document, document_id)
+        except Exception as e:
+            logger.log("ERROR", "document_delete_failed", document_id=document_id, error=str(e))
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to delete document. Please try again."
+            )
+
+        if job_status is None and deleted_chunks == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Document {document_id} not found"
+            )
+
+        shutil.rmtree(Path(settings.DOCUMENT_STORAGE_PATH) / document_id, ignore_errors=True)
+        await scheduler.mark_deleted(document_id)
+
+        return DocumentDeleteResponse(document_id=document_id, status=STATUS_DELETED, deleted_chunks=deleted_chunks)
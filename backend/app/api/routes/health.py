@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from app.core.config import settings
 from pathlib import Path
 
@@ -6,7 +6,7 @@ router = APIRouter()
 
 
 @router.get('/health')
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint with dependency checks"""
     health_status = {
         "status": "ok",
@@ -27,5 +27,17 @@ async def health_check():
         health_status["document_storage"] = "accessible" if doc_storage_path.exists() else "not_initialized"
     except Exception:
         health_status["document_storage"] = "error"
+
+    answer_cache = getattr(request.app.state, "answer_cache", None)
+    if answer_cache is not None:
+        health_status["answer_cache"] = answer_cache.stats()
+
+    embedding_service = getattr(request.app.state, "embedding_service", None)
+    if embedding_service is not None and embedding_service.model.cache is not None:
+        health_status["embedding_cache"] = embedding_service.model.cache.stats()
+
+    llm_client = getattr(request.app.state, "llm_client", None)
+    if llm_client is not None and llm_client.cache is not None:
+        health_status["llm_cache"] = llm_client.cache.stats()
     
     return health_status
\ No newline at end of file
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Request, HTTPException, status
 from fastapi.responses import StreamingResponse
 from app.schemas.query import QueryRequest, QueryResponse
-from app.services.query_service import QueryService
 from app.observability.logger import JsonLogger
 import asyncio
 import json
@@ -9,8 +8,6 @@ import json
 router = APIRouter()
 logger = JsonLogger("query-api")
 
-query_service = QueryService()
-
 
 @router.post("/query/stream")
 async def query_stream(request: Request, payload: QueryRequest):
@@ -24,9 +21,16 @@ async def query_stream(request: Request, payload: QueryRequest):
     - verifying: Generating answer
     - evaluating: Assessing answer quality
     - refining: Refining query (if needed)
+    - cached: Answer served from the semantic answer cache
     - complete: Final result
+
+    While the answer is generated, ``token`` events carry each fragment and
+    the iteration it belongs to; a new iteration replaces the previous answer.
+
+    ``metadata`` may restrict retrieval with ``document_ids`` and/or ``tags``.
     """
     trace_id = getattr(request.state, "trace_id", None)
+    query_service = request.app.state.query_service
     
     try:
         # Validate request payload
@@ -38,14 +42,15 @@ async def query_stream(request: Request, payload: QueryRequest):
         
         question = payload.question.strip()
         
-        # Create a queue for progress events
+        # Create a queue for progress events (unbounded, so callbacks never block
+        # and events keep their order)
         progress_queue = asyncio.Queue()
         
         async def event_generator():
             try:
                 # Start query processing in background
                 query_task = asyncio.create_task(
-                    process_query_with_progress(question, trace_id, progress_queue)
+                    process_query_with_progress(question, trace_id, progress_queue, payload.metadata)
                 )
                 
                 # Stream events from queue
@@ -76,7 +81,12 @@ async def query_stream(request: Request, payload: QueryRequest):
                 logger.log("ERROR", "sse_stream_failed", trace_id=trace_id, error=str(e))
                 yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
         
-        async def process_query_with_progress(question: str, trace_id: str | None, queue: asyncio.Queue):
+        async def process_query_with_progress(
+            question: str,
+            trace_id: str | None,
+            queue: asyncio.Queue,
+            filters: dict | None
+        ):
             """Process query and emit progress events"""
             try:
                 def progress_callback(stage: str, message: str, data: dict = None):
@@ -88,10 +98,19 @@ async def query_stream(request: Request, payload: QueryRequest):
                     }
                     if data:
                         event.update(data)
-                    asyncio.create_task(queue.put(event))
+                    queue.put_nowait(event)
+
+                def token_callback(token: str, data: dict = None):
+                    """Callback to emit answer fragments"""
+                    event = {"type": "token", "token": token}
+                    if data:
+                        event.update(data)
+                    queue.put_nowait(event)
                 
                 # Process query
-                result = await query_service.process_query(question, trace_id, progress_callback)
+                result = await query_service.process_query(
+                    question, trace_id, progress_callback, token_callback, filters
+                )
                 
                 # Emit final result
                 await queue.put({
@@ -140,8 +159,11 @@ async def query(request: Request, payload: QueryRequest):
     2. Executor agent retrieves relevant document contexts
     3. Verifier agent generates answer from contexts
     4. Evaluator agent assesses answer quality (with feedback loop)
+
+    ``metadata`` may restrict retrieval with ``document_ids`` and/or ``tags``.
     """
     trace_id = getattr(request.state, "trace_id", None)
+    query_service = request.app.state.query_service
     
     try:
         # Validate request payload
@@ -154,7 +176,8 @@ async def query(request: Request, payload: QueryRequest):
         # Process query through service layer
         result = await query_service.process_query(
             payload.question.strip(),
-            trace_id
+            trace_id,
+            filters=payload.metadata
         )
         
         return result
@@ -18,15 +18,103 @@ class Settings(BaseSettings):
     ]
     OLLAMA_URL: str = "http://host.docker.internal:11434"
     OLLAMA_MODEL: str = "phi3"
+    # Shared, pooled HTTP client for Ollama
+    OLLAMA_TIMEOUT_SECONDS: float = 300.0
+    OLLAMA_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    OLLAMA_MAX_CONNECTIONS: int = 20
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OLLAMA_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    # Needs httpx[http2]; Ollama itself only speaks HTTP/1.1 unless behind a TLS proxy
+    OLLAMA_HTTP2: bool = False
+    # How long Ollama keeps the model (and its prompt KV cache) loaded after a request
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    # Continue the LLM judge from the verifier's Ollama context instead of re-sending the answer;
+    # pays off with OLLAMA_NUM_PARALLEL=1, where agents evict each other's cached prefixes
+    LLM_CONTEXT_REUSE: bool = False
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    # Exact-match response cache keyed by hash(model, prompt, options)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "storage/llm_cache.db"
+    LLM_CACHE_MEMORY_MAX_ENTRIES: int = 512
+    LLM_CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     EMBEDDING_DIM: int = 384
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+    # Embeddings keyed by hash(model, text), so repeated chunks are encoded once
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "storage/embedding_cache.db"
+    EMBEDDING_CACHE_MEMORY_MAX_ENTRIES: int = 10_000
+    EMBEDDING_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024
     VECTOR_STORE_PATH: str = "storage/vectorstore"
+    # flat | ivf_flat | ivf_pq | hnsw
+    VECTOR_INDEX_TYPE: str = "flat"
+    # l2 | cosine (inner product over normalised vectors); run migrate_index after changing it
+    VECTOR_METRIC: str = "l2"
+    IVF_NLIST: int = 1024
+    IVF_NPROBE: int = 16
+    IVF_TRAIN_MIN_VECTORS: int = 50000
+    PQ_M: int = 48
+    PQ_NBITS: int = 8
+    HNSW_M: int = 32
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    # Segment log: merge this many similar-sized segments at a time
+    SEGMENT_MERGE_FACTOR: int = 8
+    SEGMENT_MAX_ROWS: int = 2_000_000
+    SEGMENT_COMPACTION_INTERVAL_SECONDS: float = 30.0
+    # Rewrite a segment once this share of its rows is deleted
+    TOMBSTONE_COMPACTION_RATIO: float = 0.2
     DOCUMENT_STORAGE_PATH: str = "storage/documents"
     RATE_LIMIT_REQUESTS: int = 30
     RATE_LIMIT_WINDOW_SECONDS: int = 60
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 100
+    # fixed | sentence | markdown | token
+    CHUNK_STRATEGY: str = "fixed"
+    CHUNK_TOKENS: int = 256
+    CHUNK_TOKEN_OVERLAP: int = 32
     RETRIEVAL_TOP_K: int = 5
+    # Chunks below this cosine similarity to the query are not retrieved (-1 disables the cutoff)
+    RETRIEVAL_MIN_SCORE: float = 0.2
+    # Hybrid retrieval: BM25 and vector candidates fused with reciprocal-rank fusion
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATES: int = 20
+    RRF_K: int = 60
+    # Optional cross-encoder rerank of RERANK_CANDIDATES results; vector order is kept past the budget
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20
+    RERANK_BUDGET_MS: float = 200.0
+    RERANK_MAX_LENGTH: int = 256
+    # Verifier contexts: merge adjacent chunks, drop near-duplicates, fit an estimated token budget
+    CONTEXT_PACKING_ENABLED: bool = True
+    CONTEXT_TOKEN_BUDGET: int = 1536
+    CONTEXT_DEDUP_SIMILARITY: float = 0.95
+    # auto: rule-based planner unless several tools are registered or its confidence is low
+    PLANNER_MODE: str = "auto"
+    PLANNER_FAST_MIN_CONFIDENCE: float = 0.5
+    # auto: local (embedding + lexical) scoring, LLM judge only for scores in the borderline band
+    EVALUATOR_MODE: str = "auto"
+    EVALUATOR_BORDERLINE_LOW: float = 0.45
+    EVALUATOR_BORDERLINE_HIGH: float = 0.7
+    # speculative: retrieve for the next refinement while verifying/evaluating | serial
+    ORCHESTRATOR_MODE: str = "speculative"
+    # Speculate only when retrieval confidence (mean top-context similarity) is below this
+    SPECULATION_MAX_RETRIEVAL_CONFIDENCE: float = 0.5
+    # Semantic answer cache in front of the agent workflow
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    INGESTION_QUEUE_PATH: str = "storage/ingestion_queue.db"
+    INGESTION_QUEUE_MAX_SIZE: int = 100
+    INGESTION_WORKERS: int = 2
+    INGESTION_PARSE_PROCESSES: int = 2
+    PDF_PAGES_PER_TASK: int = 16
+    PDF_PARALLEL_MIN_PAGES: int = 32
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from app.core.config import settings
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("llm-cache")
+
+
+def cache_key(model: str, prompt: str, options: dict | None = None, context: list[int] | None = None) -> str:
+    """Content-addressed key for a generation request"""
+    request = {"model": model, "prompt": prompt, "options": options or {}}
+    if context:
+        # A continued prompt only means something together with the context it continues
+        request["context"] = context
+    material = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier exact-match cache of LLM responses keyed by ``cache_key``.
+
+    Tier 1 is an in-memory LRU of ``max_memory_entries`` responses. Tier 2 is
+    a SQLite table on local disk that survives restarts and is trimmed to
+    ``max_disk_bytes`` of response text, dropping the least recently used
+    rows. Disk hits are promoted to memory.
+
+    ``get_memory`` only touches the in-memory tier and is cheap enough for
+    the event loop; ``get`` and ``put`` do SQLite I/O and belong on a worker
+    thread.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_memory_entries: int = None,
+        max_disk_bytes: int = None
+    ):
+        self.max_memory_entries = max(1, max_memory_entries or settings.LLM_CACHE_MEMORY_MAX_ENTRIES)
+        self.max_disk_bytes = max_disk_bytes or settings.LLM_CACHE_DISK_MAX_BYTES
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get_memory(self, key: str) -> str | None:
+        """Memory-tier lookup; a miss is not counted, since ``get`` is expected to follow"""
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.bytes_saved += len(response.encode("utf-8"))
+            return response
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            else:
+                row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                response = row[0]
+                with self._conn:
+                    self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self._remember(key, response)
+                self.disk_hits += 1
+
+            self.bytes_saved += len(response.encode("utf-8"))
+            return response
+
+    def put(self, key: str, model: str, response: str):
+        size = len(response.encode("utf-8"))
+        if size > self.max_disk_bytes:
+            return
+
+        with self._lock:
+            self._remember(key, response)
+            now = time.time()
+            with self._conn:
+                previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, size, now, now)
+                )
+                self._disk_bytes += size - (previous[0] if previous else 0)
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._trim_disk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "bytes_saved": self.bytes_saved
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, key: str, response: str):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _trim_disk(self):
+        """Drop least recently used rows until the table is back under 90% of the limit"""
+        target = int(self.max_disk_bytes * 0.9)
+        removed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if self._disk_bytes <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._disk_bytes -= size
+            removed += 1
+        logger.log("INFO", "llm_cache_trimmed", removed=removed, disk_bytes=self._disk_bytes)
@@ -1,48 +1,197 @@
+import asyncio
+import json
+import random
 import httpx
+from typing import AsyncIterator, Callable
 from app.core.config import settings
+from app.llm.cache import LLMResponseCache, cache_key
 from app.observability.logger import JsonLogger
+from app.observability.timing import measure_latency
 
 logger = JsonLogger("llm-client")
 
 
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given 0-based retry attempt"""
+    cap = min(settings.LLM_RETRY_MAX_DELAY_SECONDS, settings.LLM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
 class LLMClient:
-    def __init__(self, model: str = None):
+    """
+    Ollama client sharing one pooled, keep-alive HTTP connection pool.
+
+    A single instance is created in the application lifespan and passed to
+    the agents, so planner, verifier and evaluator calls reuse warm
+    connections instead of opening a new one per request. ``close()`` must be
+    awaited on shutdown.
+
+    With a ``cache``, responses are stored under a hash of (model, prompt,
+    options) and identical requests are answered without calling Ollama;
+    pass ``use_cache=False`` to bypass it for a call.
+
+    Every request sets ``keep_alive`` (``OLLAMA_KEEP_ALIVE``) so the model and
+    its prompt KV cache stay loaded between queries. ``on_context`` receives
+    the Ollama ``context`` of a completed generation, which a later call can
+    continue from with ``context`` instead of re-sending the conversation.
+    Prompt and generated token counts reported by Ollama are summed in
+    ``usage``.
+    """
+
+    def __init__(self, model: str = None, base_url: str = None, cache: LLMResponseCache | None = None):
         self.model = model or settings.OLLAMA_MODEL
-        self.base_url = settings.OLLAMA_URL
+        self.base_url = base_url or settings.OLLAMA_URL
+        self.cache = cache
+        self.usage = {"requests": 0, "prompt_eval_tokens": 0, "eval_tokens": 0}
+
+        http2 = settings.OLLAMA_HTTP2
+        if http2 and not _http2_available():
+            logger.log("WARN", "llm_http2_unavailable", reason="install httpx[http2] to enable HTTP/2")
+            http2 = False
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                settings.OLLAMA_TIMEOUT_SECONDS,
+                connect=settings.OLLAMA_CONNECT_TIMEOUT_SECONDS
+            )
+        )
+
+        logger.log(
+            "INFO",
+            "llm_client_created",
+            model=self.model,
+            http2=http2,
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS
+        )
+
+    async def close(self):
+        await self._client.aclose()
+
+    def _payload(self, prompt: str, stream: bool, options: dict | None, context: list[int] | None) -> dict:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream
+        }
+        if settings.OLLAMA_KEEP_ALIVE:
+            payload["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
+        if options:
+            payload["options"] = options
+        if context:
+            payload["context"] = context
+        return payload
 
-    async def generate(self, prompt: str, max_retries: int = 3) -> str:
+    def _completed(self, data: dict, context: list[int] | None, on_context: Callable[[list[int]], None] | None):
+        """Record token usage of a finished generation and hand its context to ``on_context``"""
+        self.usage["requests"] += 1
+        self.usage["prompt_eval_tokens"] += data.get("prompt_eval_count") or 0
+        self.usage["eval_tokens"] += data.get("eval_count") or 0
+        logger.log(
+            "INFO",
+            "llm_generation_completed",
+            model=self.model,
+            prompt_eval_count=data.get("prompt_eval_count"),
+            eval_count=data.get("eval_count"),
+            continued_context=bool(context)
+        )
+        if on_context and data.get("context"):
+            on_context(data["context"])
+
+    async def _cached(
+        self,
+        prompt: str,
+        options: dict | None,
+        use_cache: bool,
+        context: list[int] | None = None
+    ) -> tuple[str | None, str | None]:
+        """Return (key, cached response); key is None when the cache is not used"""
+        if not (self.cache and use_cache):
+            return None, None
+        key = cache_key(self.model, prompt, options, context)
+        try:
+            cached = self.cache.get_memory(key)
+            if cached is None:
+                # The disk tier is SQLite; keep it off the event loop
+                cached = await asyncio.to_thread(self.cache.get, key)
+            return key, cached
+        except Exception as e:
+            logger.log("ERROR", "llm_cache_read_failed", error=str(e))
+            return key, None
+
+    async def _store(self, key: str | None, response: str):
+        if key is None or not response:
+            return
+        try:
+            await asyncio.to_thread(self.cache.put, key, self.model, response)
+        except Exception as e:
+            logger.log("ERROR", "llm_cache_write_failed", error=str(e))
+
+    async def generate(
+        self,
+        prompt: str,
+        max_retries: int = None,
+        options: dict | None = None,
+        use_cache: bool = True,
+        context: list[int] | None = None,
+        on_context: Callable[[list[int]], None] | None = None
+    ) -> str:
         """
         Generate text using the LLM.
-        
+
         Args:
             prompt: Input prompt
-            max_retries: Maximum number of retry attempts
-        
+            max_retries: Maximum number of attempts (defaults to LLM_MAX_RETRIES)
+            options: Ollama model options (temperature, num_ctx, ...); part of the cache key
+            use_cache: Set to False to bypass the response cache for this call
+            context: Ollama context of an earlier generation to continue from
+            on_context: Called with the context of this generation (not on cache hits)
+
         Returns:
             Generated text response
         """
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False
-        }
+        key, cached = await self._cached(prompt, options, use_cache, context)
+        if cached is not None:
+            logger.log("INFO", "llm_cache_hit", model=self.model, response_length=len(cached))
+            return cached
+
+        max_retries = max_retries or settings.LLM_MAX_RETRIES
+        payload = self._payload(prompt, False, options, context)
 
         last_error = None
         for attempt in range(max_retries):
+            if attempt > 0:
+                delay = backoff_delay(attempt - 1)
+                logger.log("INFO", "llm_retry_backoff", attempt=attempt + 1, delay_ms=round(delay * 1000, 1))
+                await asyncio.sleep(delay)
+
             try:
-                async with httpx.AsyncClient(timeout=300.0) as client:
-                    response = await client.post(
-                        f"{self.base_url}/api/generate",
-                        json=payload
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    if "response" not in data:
-                        raise ValueError("Invalid response format from LLM")
-                    
-                    return data["response"].strip()
-            
+                response = await self._client.post("/api/generate", json=payload)
+                response.raise_for_status()
+                data = response.json()
+
+                if "response" not in data:
+                    raise ValueError("Invalid response format from LLM")
+
+                text = data["response"].strip()
+                self._completed(data, context, on_context)
+                await self._store(key, text)
+                return text
+
             except httpx.TimeoutException as e:
                 last_error = e
                 logger.log(
@@ -54,7 +203,7 @@ class LLMClient:
                 )
                 if attempt == max_retries - 1:
                     raise
-            
+
             except httpx.HTTPStatusError as e:
                 last_error = e
                 logger.log(
@@ -69,7 +218,7 @@ class LLMClient:
                     raise
                 if attempt == max_retries - 1:
                     raise
-            
+
             except Exception as e:
                 last_error = e
                 logger.log(
@@ -80,6 +229,116 @@ class LLMClient:
                 )
                 if attempt == max_retries - 1:
                     raise
-        
+
         # Should not reach here, but just in case
-        raise Exception(f"Failed to generate response after {max_retries} attempts: {last_error}")
\ No newline at end of file
+        raise Exception(f"Failed to generate response after {max_retries} attempts: {last_error}")
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        max_retries: int = None,
+        options: dict | None = None,
+        use_cache: bool = True,
+        context: list[int] | None = None,
+        on_context: Callable[[list[int]], None] | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text from the LLM as it is produced.
+
+        Consumes Ollama's NDJSON stream and yields each non-empty ``response``
+        fragment. Connection failures and 5xx responses are retried with
+        backoff until the first fragment arrives; after that errors propagate,
+        since the caller has already consumed part of the answer.
+
+        A cached response is yielded as a single fragment; a completed stream
+        is stored in the cache.
+
+        Args:
+            prompt: Input prompt
+            max_retries: Maximum number of attempts (defaults to LLM_MAX_RETRIES)
+            options: Ollama model options; part of the cache key
+            use_cache: Set to False to bypass the response cache for this call
+            context: Ollama context of an earlier generation to continue from
+            on_context: Called with the context of this generation once the stream is done
+
+        Yields:
+            Text fragments in generation order
+        """
+        key, cached = await self._cached(prompt, options, use_cache, context)
+        if cached is not None:
+            logger.log("INFO", "llm_cache_hit", model=self.model, response_length=len(cached), streamed=True)
+            yield cached
+            return
+
+        max_retries = max_retries or settings.LLM_MAX_RETRIES
+        payload = self._payload(prompt, True, options, context)
+
+        for attempt in range(max_retries):
+            if attempt > 0:
+                delay = backoff_delay(attempt - 1)
+                logger.log("INFO", "llm_retry_backoff", attempt=attempt + 1, delay_ms=round(delay * 1000, 1))
+                await asyncio.sleep(delay)
+
+            started = False
+            done = False
+            fragments = []
+            try:
+                with measure_latency() as elapsed:
+                    async with self._client.stream("POST", "/api/generate", json=payload) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.strip():
+                                continue
+                            data = json.loads(line)
+                            if "error" in data:
+                                raise ValueError(f"LLM stream error: {data['error']}")
+
+                            fragment = data.get("response", "")
+                            if fragment:
+                                if not started:
+                                    started = True
+                                    logger.log(
+                                        "INFO",
+                                        "llm_first_token",
+                                        model=self.model,
+                                        attempt=attempt + 1,
+                                        time_to_first_token_ms=round(elapsed() * 1000, 2)
+                                    )
+                                fragments.append(fragment)
+                                yield fragment
+
+                            if data.get("done"):
+                                done = True
+                                self._completed(data, context, on_context)
+                                break
+
+                if not done:
+                    # A connection closed mid-answer leaves a truncated response that must not be cached
+                    raise ValueError("LLM stream ended before the done event")
+
+                logger.log("INFO", "llm_stream_completed", model=self.model, latency_ms=round(elapsed() * 1000, 2))
+                # Stored stripped, the same as generate() returns it
+                await self._store(key, "".join(fragments).strip())
+                return
+
+            except httpx.HTTPStatusError as e:
+                logger.log(
+                    "ERROR",
+                    "llm_http_error",
+                    attempt=attempt + 1,
+                    status_code=e.response.status_code,
+                    error=str(e)
+                )
+                if 400 <= e.response.status_code < 500 or attempt == max_retries - 1:
+                    raise
+
+            except (httpx.TransportError, ValueError) as e:
+                logger.log(
+                    "WARN" if isinstance(e, httpx.TimeoutException) else "ERROR",
+                    "llm_stream_error",
+                    attempt=attempt + 1,
+                    started=started,
+                    error=str(e)
+                )
+                if started or attempt == max_retries - 1:
+                    raise
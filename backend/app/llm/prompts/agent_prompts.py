@@ -0,0 +1,105 @@
+"""
+Agent prompts laid out as a stable prefix plus a variable suffix.
+
+Ollama keeps the KV cache of the last prompt evaluated on each slot and only
+prefills the tokens after the longest common prefix with the new prompt. Every
+prompt therefore starts with the same ``PREAMBLE``, followed by the agent's
+static instructions; only the suffix (tools, contexts, question, answer)
+changes between requests. Nothing request-specific may be added to a prefix.
+"""
+
+PREAMBLE = """You are part of Docent, a question answering system over the user's uploaded documents. \
+Follow the role and output format described below exactly.
+
+"""
+
+PLANNER_PREFIX = PREAMBLE + """Role: planner. You decide which tool to use and with what arguments.
+
+Given the user question, respond ONLY with valid JSON (no markdown, no code blocks) of the form:
+
+{{
+  "tool": "retrieve_documents",
+  "arguments": {{
+    "query": "<extract the key search terms from the question>",
+    "top_k": {top_k}
+  }}
+}}
+
+"""
+
+VERIFIER_PREFIX = PREAMBLE + """Role: verification agent. You answer questions based ONLY on the provided context.
+
+Your role is to:
+1. Verify that the answer can be derived from the given context
+2. Provide accurate, factual answers based solely on the context
+3. Clearly state when the context is insufficient
+
+Instructions:
+- Answer the question using ONLY information from the context below
+- If the answer cannot be found in the context, respond with "I don't have enough information in the provided documents to answer this question."
+- Be precise and cite relevant parts of the context when possible
+- Do not make assumptions or use knowledge outside the provided context
+
+"""
+
+EVALUATION_INSTRUCTIONS = """Evaluate:
+1. Does the answer directly address the question? (Yes/No)
+2. Is the answer based on the provided contexts? (Yes/No/Uncertain)
+3. Is the answer complete and informative? (Yes/No/Partial)
+4. Would retrieving more or different contexts improve the answer? (Yes/No)
+
+Respond in JSON format:
+{
+  "quality_score": <0.0 to 1.0>,
+  "needs_refinement": <true/false>,
+  "feedback": "<brief explanation>",
+  "suggested_query_improvement": "<if needs_refinement is true, suggest better search query>"
+}
+
+"""
+
+EVALUATOR_PREFIX = PREAMBLE + """Role: answer quality evaluator. You evaluate if the answer adequately addresses the \
+question based on the retrieved contexts.
+
+""" + EVALUATION_INSTRUCTIONS
+
+# Appended to the verifier's prompt and answer when its Ollama ``context`` is reused
+EVALUATOR_FOLLOWUP = """Role: answer quality evaluator. Evaluate if the answer you just gave adequately addresses \
+the question based on the context above.
+
+""" + EVALUATION_INSTRUCTIONS
+
+
+def planner_prompt(available_tools: str, top_k: int, question: str) -> str:
+    # The tool list only changes when tools are registered, so it is part of the common prefix too
+    return PLANNER_PREFIX.format(top_k=top_k) + f"""Available tools:
+{available_tools}
+
+Question: {question}
+
+JSON Response:"""
+
+
+def verifier_prompt(context_text: str, question: str) -> str:
+    return VERIFIER_PREFIX + f"""Context:
+{context_text}
+
+Question: {question}
+
+Answer:"""
+
+
+def evaluator_prompt(question: str, answer: str, context_summary: str) -> str:
+    return EVALUATOR_PREFIX + f"""Question: {question}
+
+Answer: {answer}
+
+Context Information: {context_summary}
+
+JSON Response:"""
+
+
+def evaluator_followup_prompt(question: str) -> str:
+    return EVALUATOR_FOLLOWUP + f"""Original question: {question}
+
+JSON Response:"""
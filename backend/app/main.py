@@ -7,14 +7,79 @@ from app.observability.tracing import generate_trace_id
 from app.observability.logger import JsonLogger
 from app.auth.api_key import validate_api_key
 from app.auth.rate_limit import rate_limit
+from app.rag.vectorstore import VectorStore
+from app.rag.embeddings import EmbeddingModel, EmbeddingService
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.reranker import CrossEncoderReranker
+from app.tools.registry import register_tools
+from app.services.ingestion_scheduler import IngestionScheduler
+from app.services.query_service import QueryService
+from app.services.answer_cache import SemanticAnswerCache
+from app.agents.orchestrator import AgentOrchestrator
+from app.llm.client import LLMClient
+from app.llm.cache import LLMResponseCache
+from pathlib import Path
+from contextlib import asynccontextmanager
 import traceback
 
 logger = JsonLogger("GenAI backend")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    # One vector store per process, shared by ingestion and retrieval
+    vector_store = VectorStore(dim=settings.EMBEDDING_DIM)
+    vector_store.start_compaction()
+    app.state.vector_store = vector_store
+
+    # One embedding model per process; queries go through the batching service
+    embedding_cache = EmbeddingCache(Path(settings.EMBEDDING_CACHE_PATH)) if settings.EMBEDDING_CACHE_ENABLED else None
+    embedding_service = EmbeddingService(EmbeddingModel(model_name=settings.EMBEDDING_MODEL, cache=embedding_cache))
+    await embedding_service.start()
+    app.state.embedding_service = embedding_service
+
+    reranker = CrossEncoderReranker() if settings.RERANK_ENABLED else None
+    register_tools(vector_store, embedding_service, reranker)
+
+    # Bounded, persistent ingestion pipeline feeding the shared store
+    ingestion_scheduler = IngestionScheduler(vector_store, embedding_service.model)
+    await ingestion_scheduler.start()
+    app.state.ingestion_scheduler = ingestion_scheduler
+
+    # One pooled HTTP client to Ollama shared by every agent
+    llm_cache = LLMResponseCache(Path(settings.LLM_CACHE_PATH)) if settings.LLM_CACHE_ENABLED else None
+    llm_client = LLMClient(cache=llm_cache)
+    app.state.llm_client = llm_client
+    answer_cache = None
+    if settings.ANSWER_CACHE_ENABLED:
+        answer_cache = SemanticAnswerCache(embedding_service, vector_store)
+    app.state.answer_cache = answer_cache
+    app.state.query_service = QueryService(AgentOrchestrator(llm_client, embedding_service), answer_cache)
+
+    logger.log("INFO", "application_started", vectors=vector_store.ntotal)
+
+    yield
+
+    await llm_client.close()
+    if llm_cache:
+        llm_cache.close()
+    await ingestion_scheduler.stop()
+    await embedding_service.stop()
+    if reranker:
+        reranker.close()
+    if embedding_cache:
+        embedding_cache.close()
+    vector_store.stop_compaction()
+    vector_store.persist()
+    logger.log("INFO", "application_stopped")
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version="1.0.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # CORS configuration
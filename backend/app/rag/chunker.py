@@ -1,34 +1,407 @@
-from typing import List
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import deque
+from typing import Iterable, Iterator
+from app.core.config import settings
+
+CHUNK_STRATEGIES = ("fixed", "sentence", "markdown", "token")
+
+
+def _validate(chunk_size: int, overlap: int):
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    if overlap < 0 or overlap >= chunk_size:
+        raise ValueError("overlap must be non-negative and less than chunk_size")
+
+
+def _iter_windows(pieces: Iterable[str], chunk_size: int, overlap: int) -> Iterator[tuple[str, int]]:
+    """
+    Slide a ``chunk_size`` window with ``overlap`` over the concatenation of ``pieces``.
+
+    Only the current piece plus less than ``chunk_size`` characters of
+    carry-over are held at any time.
+
+    Yields:
+        ``(chunk, offset)`` where offset is the window start in the concatenated text
+    """
+    step = chunk_size - overlap
+    buffer = ""
+    buffer_start = 0      # absolute offset of buffer[0]
+    next_start = 0        # absolute offset of the next window
+
+    for piece in pieces:
+        if not piece:
+            continue
+        buffer += piece
+        buffer_end = buffer_start + len(buffer)
+
+        while next_start + chunk_size <= buffer_end:
+            local = next_start - buffer_start
+            chunk = buffer[local:local + chunk_size].strip()
+            if chunk:
+                yield chunk, next_start
+            next_start += step
+
+        # Drop text no future window can reach
+        buffer = buffer[next_start - buffer_start:]
+        buffer_start = next_start
+
+    buffer_end = buffer_start + len(buffer)
+    while next_start < buffer_end:
+        local = next_start - buffer_start
+        chunk = buffer[local:local + chunk_size].strip()
+        if chunk:
+            yield chunk, next_start
+        next_start += step
+
+
+def chunk_stream(pieces: Iterable[str], chunk_size: int = 500, overlap: int = 100) -> Iterator[str]:
+    """
+    Split and yield a stream of text pieces into overlapping chunks.
+
+    Produces the same chunks as ``chunk_text`` over ``"".join(pieces)`` while
+    keeping memory bounded by the largest piece plus ``chunk_size``, so file
+    reads or pages can be chunked without materialising the whole document.
+
+    Args:
+        pieces: Text pieces in document order, e.g. successive file reads
+        chunk_size: Size of each chunk in characters
+        overlap: Number of characters to overlap between chunks
+    """
+    _validate(chunk_size, overlap)
+
+    for chunk, _ in _iter_windows(pieces, chunk_size, overlap):
+        yield chunk
 
 
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100):
     """
     Split and yield text into overlapping chunks.
-    
+
     Args:
         text: Text to chunk
         chunk_size: Size of each chunk in characters
         overlap: Number of characters to overlap between chunks
-    
+
     """
     if not text or not text.strip():
         return []
-    
-    if chunk_size <= 0:
-        raise ValueError("chunk_size must be positive")
-    
-    if overlap < 0 or overlap >= chunk_size:
-        raise ValueError("overlap must be non-negative and less than chunk_size")
-    
-    text_length = len(text)
-    step = chunk_size - overlap
-    start = 0
 
-    while start < text_length:
-        end = min(start + chunk_size, text_length)
-        chunk = text[start:end].strip()
+    yield from chunk_stream([text], chunk_size=chunk_size, overlap=overlap)
 
-        if chunk:
+
+def chunk_pages(pages: Iterable[tuple[int | None, str]], chunk_size: int = 500, overlap: int = 100):
+    """
+    Chunk a stream of ``(page_number, text)`` pages as they arrive.
+
+    Produces the same chunks as ``chunk_text`` over the pages joined the way
+    the PDF loader joins them (each page followed by a newline, leading and
+    trailing whitespace stripped), with the same bounded buffer as
+    ``chunk_stream``.
+
+    Yields:
+        ``(chunk, page_number)`` where page_number is the page the chunk starts on
+    """
+    yield from FixedSizeChunker(chunk_size, overlap).chunk_pages(pages)
+
+
+class Chunker(ABC):
+    """
+    Base class for chunking strategies.
+
+    Strategies consume documents as a stream of text pieces (file reads or
+    pages) and must keep memory bounded by a piece plus a few chunks.
+    """
+
+    name: str
+
+    @abstractmethod
+    def windows(self, pieces: Iterable[str]) -> Iterator[tuple[str, int]]:
+        """
+        Chunk the concatenation of ``pieces``.
+
+        Yields:
+            ``(chunk, offset)`` where offset is where the chunk starts in the
+            concatenated text
+        """
+        pass
+
+    def chunk(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Yield the chunks of a stream of text pieces"""
+        for chunk, _ in self.windows(pieces):
             yield chunk
 
-        start += step
+    def chunk_text(self, text: str) -> Iterator[str]:
+        """Yield the chunks of a single string"""
+        return self.chunk([text])
+
+    def chunk_pages(self, pages: Iterable[tuple[int | None, str]]) -> Iterator[tuple[str, int | None]]:
+        """
+        Chunk a stream of ``(page_number, text)`` pages as they arrive.
+
+        Pages are joined the way the PDF loader joins them (each page followed
+        by a newline, leading whitespace of the document stripped).
+
+        Yields:
+            ``(chunk, page_number)`` where page_number is the page the chunk starts on
+        """
+        page_starts = deque() # (absolute offset, page_number) for pages still in the buffer
+
+        def pieces():
+            offset = 0
+            started = False
+            for page_number, page_text in pages:
+                piece = page_text + "\n"
+                if not started:
+                    # Leading whitespace of the whole document is stripped
+                    piece = piece.lstrip()
+                    if not piece:
+                        continue
+                    started = True
+                page_starts.append((offset, page_number))
+                offset += len(piece)
+                yield piece
+
+        def page_at(offset: int):
+            while len(page_starts) > 1 and page_starts[1][0] <= offset:
+                page_starts.popleft()
+            return page_starts[0][1] if page_starts else None
+
+        for chunk, offset in self.windows(pieces()):
+            yield chunk, page_at(offset)
+
+
+class FixedSizeChunker(Chunker):
+    """Fixed character windows with overlap (the original ``chunk_text`` behaviour)"""
+
+    name = "fixed"
+
+    def __init__(self, chunk_size: int = 500, overlap: int = 100):
+        _validate(chunk_size, overlap)
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def windows(self, pieces: Iterable[str]) -> Iterator[tuple[str, int]]:
+        return _iter_windows(pieces, self.chunk_size, self.overlap)
+
+
+class _Packer:
+    """Greedily packs text units into chunks of at most ``chunk_size`` characters"""
+
+    def __init__(self, chunk_size: int, overlap: int):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.units: deque[tuple[str, int]] = deque()
+        self.size = 0
+        # Whether the buffered units hold text not yet emitted in a chunk
+        self.fresh = False
+
+    def add(self, unit: str, offset: int) -> Iterator[tuple[str, int]]:
+        if self.units and self.size + len(unit) > self.chunk_size:
+            if self.fresh:
+                yield from self._emit()
+            # Carry trailing units up to ``overlap`` characters into the next chunk
+            while self.units and (self.size > self.overlap or self.size + len(unit) > self.chunk_size):
+                self.size -= len(self.units.popleft()[0])
+        self.units.append((unit, offset))
+        self.size += len(unit)
+        self.fresh = True
+
+    def flush(self) -> Iterator[tuple[str, int]]:
+        """Emit what is buffered and start the next chunk without overlap"""
+        if self.fresh:
+            yield from self._emit()
+        self.units.clear()
+        self.size = 0
+
+    def _emit(self) -> Iterator[tuple[str, int]]:
+        self.fresh = False
+        chunk = "".join(unit for unit, _ in self.units).strip()
+        if chunk:
+            yield chunk, self.units[0][1]
+
+
+class SentenceChunker(Chunker):
+    """
+    Packs whole sentences and paragraphs into chunks of up to ``chunk_size`` characters.
+
+    Boundaries are found with one compiled regex scan per piece, and whole
+    sentences up to ``overlap`` characters are repeated between chunks.
+    Sentences longer than ``chunk_size`` are split at ``chunk_size``.
+    """
+
+    name = "sentence"
+    # A unit ends after sentence punctuation (plus closing quotes/brackets) and
+    # its whitespace, or at a blank line
+    boundary = re.compile(r"[.!?]+[\"')\]]*\s+|\n[ \t]*\n\s*")
+
+    def __init__(self, chunk_size: int = 500, overlap: int = 100):
+        _validate(chunk_size, overlap)
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def _is_section_start(self, unit: str) -> bool:
+        return False
+
+    def _units(self, pieces: Iterable[str]) -> Iterator[tuple[str, int]]:
+        carry = ""
+        carry_start = 0
+        for piece in pieces:
+            if not piece:
+                continue
+            text = carry + piece
+            start = 0
+            for match in self.boundary.finditer(text):
+                # A boundary touching the end of the piece may still grow
+                if match.end() == len(text):
+                    break
+                yield from self._split_long(text[start:match.end()], carry_start + start)
+                start = match.end()
+
+            carry = text[start:]
+            carry_start += start
+            # Bound the carry when a piece holds no boundary at all
+            if len(carry) > self.chunk_size:
+                cut = len(carry) - len(carry) % self.chunk_size
+                yield from self._split_long(carry[:cut], carry_start)
+                carry = carry[cut:]
+                carry_start += cut
+
+        if carry:
+            yield from self._split_long(carry, carry_start)
+
+    def _split_long(self, unit: str, offset: int) -> Iterator[tuple[str, int]]:
+        for start in range(0, len(unit), self.chunk_size):
+            yield unit[start:start + self.chunk_size], offset + start
+
+    def windows(self, pieces: Iterable[str]) -> Iterator[tuple[str, int]]:
+        packer = _Packer(self.chunk_size, self.overlap)
+        for unit, offset in self._units(pieces):
+            if self._is_section_start(unit):
+                yield from packer.flush()
+            yield from packer.add(unit, offset)
+        yield from packer.flush()
+
+
+class MarkdownChunker(SentenceChunker):
+    """
+    Sentence packing that never lets a chunk span a markdown heading.
+
+    Each heading starts a new chunk and no overlap is carried across it, so
+    chunks stay within one section.
+    """
+
+    name = "markdown"
+    boundary = re.compile(r"[.!?]+[\"')\]]*\s+|\n[ \t]*\n\s*|\n(?=#{1,6}[ \t])")
+    heading = re.compile(r"\s*#{1,6}[ \t]")
+
+    def _is_section_start(self, unit: str) -> bool:
+        return self.heading.match(unit) is not None
+
+
+class TokenChunker(Chunker):
+    """
+    Windows of at most ``max_tokens`` tokens of the embedding model's tokenizer.
+
+    Chunks never exceed what the embedding model encodes, so no text is
+    silently truncated. Each piece is tokenized in one call to the (Rust)
+    fast tokenizer and sliced by its character offsets.
+    """
+
+    name = "token"
+
+    def __init__(self, tokenizer, max_tokens: int = 256, overlap_tokens: int = 32):
+        _validate(max_tokens, overlap_tokens)
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _offsets(self, text: str) -> list[tuple[int, int]]:
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )
+        return encoding["offset_mapping"]
+
+    def windows(self, pieces: Iterable[str]) -> Iterator[tuple[str, int]]:
+        step = self.max_tokens - self.overlap_tokens
+        carry = ""
+        carry_start = 0
+
+        def emit(text: str, offsets, stop: int, final: bool):
+            """Yield windows over offsets[:stop]; returns the first token not yet covered"""
+            i = 0
+            while i < stop and (final or i + self.max_tokens <= stop):
+                end = min(i + self.max_tokens, stop)
+                chunk = text[offsets[i][0]:offsets[end - 1][1]].strip()
+                if chunk:
+                    yield chunk, carry_start + offsets[i][0]
+                if end >= stop and final:
+                    break
+                i += step
+            return i
+
+        for piece in pieces:
+            if not piece:
+                continue
+            text = carry + piece
+            offsets = self._offsets(text)
+            # The last word of a piece may continue in the next one, so only
+            # tokens ending before the last whitespace are final
+            last_space = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"))
+            if last_space >= 0:
+                stop = bisect_right([end for _, end in offsets], last_space)
+            else:
+                stop = max(len(offsets) - 1, 0)
+
+            i = yield from emit(text, offsets, stop, final=False)
+            cut = offsets[i][0] if i < len(offsets) else len(text)
+            carry = text[cut:]
+            carry_start += cut
+
+        if carry:
+            offsets = self._offsets(carry)
+            yield from emit(carry, offsets, len(offsets), final=True)
+
+
+def validate_chunk_strategy(strategy: str) -> str:
+    strategy = (strategy or "").lower()
+    if strategy not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunk strategy '{strategy}', expected one of {', '.join(CHUNK_STRATEGIES)}")
+    return strategy
+
+
+def create_chunker(strategy: str = None, embedding_model=None) -> Chunker:
+    """
+    Build the chunker selected by ``CHUNK_STRATEGY``.
+
+    Args:
+        strategy: One of ``CHUNK_STRATEGIES`` (defaults to ``CHUNK_STRATEGY``)
+        embedding_model: ``EmbeddingModel`` whose tokenizer the ``token`` strategy uses
+
+    Returns:
+        Configured chunker
+    """
+    strategy = validate_chunk_strategy(strategy or settings.CHUNK_STRATEGY)
+
+    if strategy == "sentence":
+        return SentenceChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    if strategy == "markdown":
+        return MarkdownChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    if strategy == "token":
+        if embedding_model is None:
+            raise ValueError("The token chunk strategy needs the embedding model's tokenizer")
+        # Leave room for the [CLS]/[SEP] tokens the model adds
+        max_tokens = min(settings.CHUNK_TOKENS, embedding_model.max_seq_length - 2)
+        return TokenChunker(
+            embedding_model.tokenizer,
+            max_tokens=max_tokens,
+            overlap_tokens=min(settings.CHUNK_TOKEN_OVERLAP, max_tokens - 1)
+        )
+    return FixedSizeChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
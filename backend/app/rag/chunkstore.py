@@ -0,0 +1,275 @@
+import json
+import mmap
+import os
+import threading
+import numpy as np
+from pathlib import Path
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("chunk-store")
+
+# Fixed-width columns, one row per FAISS id
+COLUMNS = {
+    "doc_ids": "<i4",       # index into the interned document id table
+    "path_ids": "<i4",      # index into the interned file path table
+    "chunk_index": "<i4",   # position of the chunk within its document
+    "text_end": "<i8",      # end offset of the chunk in text.bin (start is the previous end)
+    "page": "<i4",          # 1-based source page, -1 when the format has no pages
+}
+# Columns added after the first release, back-filled for existing stores
+COLUMN_DEFAULTS = {
+    "page": -1,
+}
+TEXT_FILE = "text.bin"
+DOCUMENTS_FILE = "documents.json"
+PATHS_FILE = "paths.json"
+
+
+def _map_column(path: Path, dtype: str, rows: int) -> np.ndarray:
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+
+def _map_text(path: Path):
+    if not path.exists() or path.stat().st_size == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _write_json_atomic(path: Path, data):
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class _View:
+    """Immutable snapshot of the persisted columns plus rows not yet flushed"""
+
+    def __init__(self, rows: int, columns: dict, text, pending: list):
+        self.rows = rows
+        self.columns = columns
+        self.text = text
+        self.pending = pending
+        # (starts, ends, interned document id) of runs of equal doc_ids, built on first use
+        self.document_runs = None
+
+
+class ChunkStore:
+    """
+    Columnar, memory-mapped store for chunk metadata keyed by FAISS id.
+
+    Layout (one directory):
+    - doc_ids.i4 / path_ids.i4 / chunk_index.i4 / page.i4: fixed-width int32 columns
+    - text_end.i8: int64 end offset of each chunk's UTF-8 text in text.bin
+    - text.bin: all chunk texts concatenated
+    - documents.json / paths.json: interned document id and file path tables
+
+    Columns and text are mmapped read-only, so opening the store costs no
+    unpickling and resident memory is shared page cache. Lookups by id are
+    O(1). New rows are buffered in memory and appended to the files on
+    ``flush()``; existing bytes are never rewritten.
+
+    Appends and flushes must be serialised by the caller (VectorStore holds
+    its write/read lock); lookups are safe from any thread because they read
+    from a snapshot that ``flush()`` swaps atomically.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._flush_lock = threading.Lock()
+
+        self._documents = self._load_table(DOCUMENTS_FILE)
+        self._paths = self._load_table(PATHS_FILE)
+        self._document_lookup = {value: i for i, value in enumerate(self._documents)}
+        self._path_lookup = {value: i for i, value in enumerate(self._paths)}
+
+        rows = self._recover_rows()
+        self._view = self._open_view(rows)
+
+    def _column_path(self, name: str) -> Path:
+        return self.path / f"{name}.{COLUMNS[name][1:]}"
+
+    def _load_table(self, name: str) -> list:
+        table_path = self.path / name
+        if not table_path.exists():
+            return []
+        return json.loads(table_path.read_text(encoding="utf-8"))
+
+    def _backfill_columns(self):
+        """Create columns missing from stores written by an older version"""
+        text_end_path = self._column_path("text_end")
+        if not text_end_path.exists():
+            return
+        rows = text_end_path.stat().st_size // np.dtype(COLUMNS["text_end"]).itemsize
+        for name, default in COLUMN_DEFAULTS.items():
+            column_path = self._column_path(name)
+            if not column_path.exists():
+                np.full(rows, default, dtype=COLUMNS[name]).tofile(column_path)
+
+    def _recover_rows(self) -> int:
+        """Number of complete rows, trimming any partially appended tail"""
+        self._backfill_columns()
+        counts = []
+        for name, dtype in COLUMNS.items():
+            column_path = self._column_path(name)
+            size = column_path.stat().st_size if column_path.exists() else 0
+            counts.append(size // np.dtype(dtype).itemsize)
+        rows = min(counts)
+
+        # Rows referencing interned values that were never written are incomplete
+        while rows > 0:
+            doc_id = np.memmap(self._column_path("doc_ids"), dtype=COLUMNS["doc_ids"], mode="r")[rows - 1]
+            path_id = np.memmap(self._column_path("path_ids"), dtype=COLUMNS["path_ids"], mode="r")[rows - 1]
+            if doc_id < len(self._documents) and path_id < len(self._paths):
+                break
+            rows -= 1
+
+        if rows != max(counts, default=0):
+            logger.log("WARN", "chunk_store_truncated", path=str(self.path), rows=rows)
+        for name, dtype in COLUMNS.items():
+            column_path = self._column_path(name)
+            if column_path.exists():
+                with open(column_path, "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+
+        # Drop text written after the last committed row
+        text_path = self.path / TEXT_FILE
+        if text_path.exists():
+            text_size = 0
+            if rows:
+                text_size = int(np.memmap(self._column_path("text_end"), dtype=COLUMNS["text_end"], mode="r")[rows - 1])
+            with open(text_path, "r+b") as f:
+                f.truncate(text_size)
+        return rows
+
+    def _open_view(self, rows: int, pending: list = None) -> _View:
+        columns = {
+            name: _map_column(self._column_path(name), dtype, rows)
+            for name, dtype in COLUMNS.items()
+        }
+        return _View(rows, columns, _map_text(self.path / TEXT_FILE), pending or [])
+
+    def __len__(self) -> int:
+        view = self._view
+        return view.rows + len(view.pending)
+
+    def _intern(self, value: str, table: list, lookup: dict) -> int:
+        idx = lookup.get(value)
+        if idx is None:
+            idx = len(table)
+            table.append(value)
+            lookup[value] = idx
+        return idx
+
+    def append(self, metadatas: list[dict]):
+        """Buffer new rows; they are readable immediately and persisted on flush()"""
+        pending = self._view.pending
+        for meta in metadatas:
+            pending.append((
+                self._intern(str(meta.get("document_id")), self._documents, self._document_lookup),
+                self._intern(str(meta.get("file_path")), self._paths, self._path_lookup),
+                int(meta.get("chunk_index", 0)),
+                meta.get("content") or "",
+                -1 if meta.get("page") is None else int(meta["page"]),
+            ))
+
+    def get(self, idx: int) -> dict | None:
+        view = self._view
+        if idx < 0:
+            return None
+
+        if idx < view.rows:
+            columns = view.columns
+            start = int(columns["text_end"][idx - 1]) if idx > 0 else 0
+            end = int(columns["text_end"][idx])
+            doc_id = int(columns["doc_ids"][idx])
+            path_id = int(columns["path_ids"][idx])
+            chunk_index = int(columns["chunk_index"][idx])
+            page = int(columns["page"][idx])
+            content = view.text[start:end].decode("utf-8")
+        elif idx - view.rows < len(view.pending):
+            doc_id, path_id, chunk_index, content, page = view.pending[idx - view.rows]
+        else:
+            return None
+
+        return {
+            "document_id": self._documents[doc_id],
+            "content": content,
+            "chunk_index": chunk_index,
+            "file_path": self._paths[path_id],
+            "page": page if page >= 0 else None,
+        }
+
+    def row_ranges(self, document_ids) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Persisted rows belonging to ``document_ids`` as [starts, ends) ranges.
+
+        Ingestion appends a document's chunks contiguously, so each document
+        is one or a few runs of the doc_ids column; runs are computed once
+        per snapshot.
+        """
+        view = self._view
+        wanted = [self._document_lookup[d] for d in document_ids if d in self._document_lookup]
+        if not wanted or view.rows == 0:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="int64")
+
+        if view.document_runs is None:
+            doc_ids = np.asarray(view.columns["doc_ids"])
+            boundaries = np.flatnonzero(doc_ids[1:] != doc_ids[:-1]) + 1
+            starts = np.concatenate(([0], boundaries)).astype("int64")
+            ends = np.concatenate((boundaries, [view.rows])).astype("int64")
+            view.document_runs = (starts, ends, doc_ids[starts])
+
+        starts, ends, run_documents = view.document_runs
+        selected = np.isin(run_documents, wanted)
+        return starts[selected], ends[selected]
+
+    def flush(self):
+        """Append buffered rows to the column files and remap them"""
+        with self._flush_lock:
+            view = self._view
+            pending = list(view.pending)
+            if not pending:
+                return
+
+            text_path = self.path / TEXT_FILE
+            text_offset = text_path.stat().st_size if text_path.exists() else 0
+            encoded = [row[3].encode("utf-8") for row in pending]
+            text_end = text_offset + np.cumsum([len(b) for b in encoded], dtype="int64")
+
+            # Interned tables first, then text, then columns: a crash at any
+            # point leaves rows that recovery either keeps whole or trims
+            _write_json_atomic(self.path / DOCUMENTS_FILE, self._documents)
+            _write_json_atomic(self.path / PATHS_FILE, self._paths)
+
+            with open(text_path, "ab") as f:
+                f.write(b"".join(encoded))
+                f.flush()
+                os.fsync(f.fileno())
+
+            values = {
+                "doc_ids": [row[0] for row in pending],
+                "path_ids": [row[1] for row in pending],
+                "chunk_index": [row[2] for row in pending],
+                "text_end": text_end,
+                "page": [row[4] for row in pending],
+            }
+            for name, dtype in COLUMNS.items():
+                with open(self._column_path(name), "ab") as f:
+                    f.write(np.asarray(values[name], dtype=dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            # Rows appended while flushing stay pending in the new view
+            self._view = self._open_view(view.rows + len(pending), view.pending[len(pending):])
+
+    def import_rows(self, metadatas: list[dict]):
+        """Bulk-load rows (used to migrate the legacy pickled metadata list)"""
+        self.append(metadatas)
+        self.flush()
@@ -0,0 +1,169 @@
+import asyncio
+import math
+import numpy as np
+from app.core.config import settings
+from app.rag.embeddings import EmbeddingService
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("context-packer")
+
+# Rough LLM token estimate; the generation model's tokenizer is not available locally
+CHARS_PER_TOKEN = 4
+# Leading characters of a chunk searched for in its predecessor to find their overlap
+OVERLAP_PROBE_CHARS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _overlap(previous: str, following: str) -> int:
+    """Length of the longest suffix of ``previous`` that is a prefix of ``following``"""
+    probe = following[:OVERLAP_PROBE_CHARS]
+    if not probe:
+        return 0
+    start = max(0, len(previous) - len(following))
+    position = previous.find(probe, start)
+    while position != -1:
+        if following.startswith(previous[position:]):
+            return len(previous) - position
+        position = previous.find(probe, position + 1)
+    return 0
+
+
+def _merge_adjacent(contexts: list[dict]) -> list[tuple[int, dict]]:
+    """
+    Join consecutive chunks of the same document into one block, dropping
+    the text they overlap on.
+
+    Returns (rank, block) pairs, where rank is the best (lowest) input
+    position of the block's chunks.
+    """
+    by_document: dict = {}
+    for rank, context in enumerate(contexts):
+        by_document.setdefault(context.get("document_id"), []).append((rank, context))
+
+    blocks = []
+    for members in by_document.values():
+        members.sort(key=lambda member: -1 if member[1].get("chunk_index") is None else member[1]["chunk_index"])
+        run_rank, run, text = None, None, ""
+        for rank, context in members:
+            content = context["content"]
+            index = context.get("chunk_index")
+            if run is not None and index is not None and run.get("chunk_index") is not None and (
+                index == run["chunk_index"] + run["chunk_count"]
+            ):
+                overlap = _overlap(text, content)
+                text += content[overlap:] if overlap else "\n" + content
+                run["chunk_count"] += 1
+                run_rank = min(run_rank, rank)
+                continue
+            if run is not None:
+                blocks.append((run_rank, {**run, "content": text}))
+            run_rank, run, text = rank, {**context, "chunk_count": 1}, content
+        if run is not None:
+            blocks.append((run_rank, {**run, "content": text}))
+
+    blocks.sort(key=lambda block: block[0])
+    return blocks
+
+
+class ContextPacker:
+    """
+    Shrinks retrieved contexts to what the verifier prompt needs.
+
+    1. Repeated chunks (same document and chunk index) are dropped.
+    2. Consecutive chunks of a document are merged into one block, without
+       the text repeated by the chunk overlap.
+    3. Blocks whose embedding is within ``similarity_threshold`` (cosine) of
+       a more relevant block are dropped as near-duplicates.
+    4. Blocks are kept in relevance order while they fit ``token_budget``;
+       the most relevant block is truncated if it alone is too large.
+
+    Embeddings go through the shared ``embedding_service``, so unmerged
+    chunks are usually answered from its embedding cache.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        token_budget: int = None,
+        similarity_threshold: float = None
+    ):
+        self.embedding_service = embedding_service
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else settings.CONTEXT_DEDUP_SIMILARITY
+        )
+
+    async def pack(self, contexts: list[dict]) -> list[dict]:
+        """
+        Pack retrieved contexts into the token budget.
+
+        Args:
+            contexts: Retrieval results with a ``content`` field, most relevant first
+
+        Returns:
+            Packed contexts, most relevant first; merged blocks keep the
+            metadata of their first chunk plus ``chunk_count``
+        """
+        seen = set()
+        unique = []
+        for context in contexts or []:
+            content = context.get("content") or context.get("context", "")
+            key = (context.get("document_id"), context.get("chunk_index"))
+            if context.get("chunk_index") is None:
+                key += (content,)
+            if content and key not in seen:
+                seen.add(key)
+                unique.append({**context, "content": content})
+        if not unique:
+            return []
+
+        blocks = [block for _, block in _merge_adjacent(unique)]
+        blocks = await self._drop_near_duplicates(blocks)
+        packed = self._fit_budget(blocks)
+
+        logger.log(
+            "INFO",
+            "contexts_packed",
+            contexts_in=len(contexts),
+            contexts_out=len(packed),
+            tokens_in=sum(estimate_tokens(c["content"]) for c in unique),
+            tokens_out=sum(estimate_tokens(c["content"]) for c in packed),
+            token_budget=self.token_budget
+        )
+        return packed
+
+    async def _drop_near_duplicates(self, blocks: list[dict]) -> list[dict]:
+        if len(blocks) < 2 or self.similarity_threshold >= 1.0:
+            return blocks
+        try:
+            vectors = np.array(
+                await asyncio.gather(*(self.embedding_service.embed_query(b["content"]) for b in blocks)),
+                dtype="float32"
+            )
+        except Exception as e:
+            logger.log("ERROR", "context_dedup_failed", error=str(e))
+            return blocks
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        similarity = vectors @ vectors.T
+        kept = []
+        for i in range(len(blocks)):
+            if not kept or similarity[i, kept].max() < self.similarity_threshold:
+                kept.append(i)
+        return [blocks[i] for i in kept]
+
+    def _fit_budget(self, blocks: list[dict]) -> list[dict]:
+        packed = []
+        remaining = self.token_budget
+        for block in blocks:
+            tokens = estimate_tokens(block["content"])
+            if tokens <= remaining:
+                packed.append(block)
+                remaining -= tokens
+            elif not packed:
+                packed.append({**block, "content": block["content"][:remaining * CHARS_PER_TOKEN]})
+                remaining = 0
+        return packed
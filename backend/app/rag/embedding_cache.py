@@ -0,0 +1,163 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from app.core.config import settings
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("embedding-cache")
+
+# SQLite caps the number of bound parameters per statement
+MAX_KEYS_PER_QUERY = 500
+
+
+def content_hash(model: str, text: str) -> str:
+    """Content-addressed key of a text embedded by ``model``"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embeddings keyed by ``content_hash``.
+
+    Chunks that repeat across documents (headers, disclaimers, boilerplate)
+    are encoded once and their float32 vectors reused afterwards. Tier 1 is
+    an in-memory LRU of ``max_memory_entries`` vectors. Tier 2 is a SQLite
+    table on local disk that survives restarts and is trimmed to
+    ``max_disk_bytes`` of vector data, dropping the least recently used rows.
+    Disk hits are promoted to memory. Lookups and writes with ``disk=False``
+    stay in memory, for short-lived texts such as queries that are not worth
+    a SQLite round trip or a row on disk.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_memory_entries: int = None,
+        max_disk_bytes: int = None
+    ):
+        self.max_memory_entries = max(1, max_memory_entries or settings.EMBEDDING_CACHE_MEMORY_MAX_ENTRIES)
+        self.max_disk_bytes = max_disk_bytes or settings.EMBEDDING_CACHE_DISK_MAX_BYTES
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed_at)")
+            self._disk_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()[0]
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: list[str], disk: bool = True) -> dict[str, np.ndarray]:
+        """Cached vectors for whichever of ``keys`` are present, checking SQLite only with ``disk``"""
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+            from_disk = []
+            for start in range(0, len(missing) if disk else 0, MAX_KEYS_PER_QUERY):
+                batch = missing[start:start + MAX_KEYS_PER_QUERY]
+                from_disk.extend(self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall())
+            if from_disk:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                        [(now, key) for key, _ in from_disk]
+                    )
+                for key, blob in from_disk:
+                    vector = np.frombuffer(blob, dtype="float32")
+                    self._remember(key, vector)
+                    found[key] = vector
+
+            self.disk_hits += len(from_disk)
+            self.misses += len(missing) - len(from_disk)
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray], disk: bool = True):
+        if not items:
+            return
+        rows = [(key, np.asarray(vector, dtype="float32").tobytes()) for key, vector in items.items()]
+
+        with self._lock:
+            for key, blob in rows:
+                self._remember(key, np.frombuffer(blob, dtype="float32"))
+            if not disk:
+                return
+            now = time.time()
+            with self._conn:
+                added = 0
+                for key, blob in rows:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                        (key, blob, now)
+                    )
+                    added += cursor.rowcount * len(blob)
+                self._disk_bytes += added
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._trim_disk(len(rows[0][1]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _trim_disk(self, vector_bytes: int):
+        """Drop least recently used rows until the table is back under 90% of the limit"""
+        # Vectors of one model all have the same size, so the row count follows from the bytes
+        excess = self._disk_bytes - int(self.max_disk_bytes * 0.9)
+        rows = -(-excess // vector_bytes)
+        cursor = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+            (rows,)
+        )
+        self._disk_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        logger.log("INFO", "embedding_cache_trimmed", removed=cursor.rowcount, disk_bytes=self._disk_bytes)
@@ -1,7 +1,10 @@
-from sentence_transformers import SentenceTransformer
 from app.core.config import settings
+from app.rag.embedding_cache import EmbeddingCache, content_hash
 from app.observability.logger import JsonLogger
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import numpy as np
 
 # Suppress sentence-transformers info logs
 logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
@@ -9,21 +12,46 @@ logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
 logger = JsonLogger("embedding-model")
 
 
+def load_sentence_transformer(model_name: str):
+    """Load an embedding model; sentence-transformers (and torch) are only imported here"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
 class EmbeddingModel:
-    """Wrapper for sentence-transformers embedding model"""
+    """
+    Wrapper for sentence-transformers embedding model.
+
+    Identical texts within a call are encoded once. With a ``cache``, texts
+    embedded before (repeated boilerplate chunks, re-uploaded content) reuse
+    their stored vector instead of being re-encoded. Only ``persist`` calls
+    (ingestion) touch the cache's disk tier; queries are cached in memory.
+    """
 
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, cache: EmbeddingCache | None = None):
         self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.cache = cache
         logger.log("INFO", "loading_embedding_model", model=self.model_name)
-        self.model = SentenceTransformer(self.model_name)
+        self.model = load_sentence_transformer(self.model_name)
         logger.log("INFO", "embedding_model_loaded", model=self.model_name)
+
+    @property
+    def tokenizer(self):
+        """The model's (fast) tokenizer, used for token-budget chunking"""
+        return self.model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        """Tokens the model encodes per input, including special tokens; the rest is truncated"""
+        return self.model.max_seq_length
     
-    def embed(self, texts: list[str]) -> list[list[float]]:
+    def embed(self, texts: list[str], persist: bool = True) -> list[list[float]]:
         """
         Generate embeddings for a list of texts.
         
         Args:
             texts: List of text strings to embed
+            persist: Look up and store vectors in the on-disk cache as well as in memory
         
         Returns:
             List of embedding vectors (each is a list of floats)
@@ -32,12 +60,31 @@ class EmbeddingModel:
             return []
         
         try:
-            embeddings = self.model.encode(
-                texts,
-                show_progress_bar=False,
-                convert_to_numpy=True
-            )
-            return embeddings.tolist()
+            keys = [content_hash(self.model_name, text) for text in texts]
+            unique = dict(zip(keys, texts))
+            vectors = self._cached(list(unique), persist)
+
+            missing = [key for key in unique if key not in vectors]
+            if missing:
+                encoded = self.model.encode(
+                    [unique[key] for key in missing],
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                ).astype("float32", copy=False)
+                encoded_vectors = dict(zip(missing, encoded))
+                vectors.update(encoded_vectors)
+                self._store(encoded_vectors, persist)
+
+            if len(missing) < len(texts):
+                logger.log(
+                    "INFO",
+                    "embeddings_deduplicated",
+                    texts_count=len(texts),
+                    unique=len(unique),
+                    cache_hits=len(unique) - len(missing),
+                    encoded=len(missing)
+                )
+            return np.stack([vectors[key] for key in keys]).tolist()
         except Exception as e:
             logger.log(
                 "ERROR",
@@ -45,4 +92,128 @@ class EmbeddingModel:
                 texts_count=len(texts),
                 error=str(e)
             )
-            raise
\ No newline at end of file
+            raise
+
+    def _cached(self, keys: list[str], persist: bool) -> dict:
+        if self.cache is None:
+            return {}
+        try:
+            return self.cache.get_many(keys, disk=persist)
+        except Exception as e:
+            logger.log("ERROR", "embedding_cache_read_failed", error=str(e))
+            return {}
+
+    def _store(self, vectors: dict, persist: bool):
+        if self.cache is None:
+            return
+        try:
+            self.cache.put_many(vectors, disk=persist)
+        except Exception as e:
+            logger.log("ERROR", "embedding_cache_write_failed", error=str(e))
+
+class EmbeddingService:
+    """
+    Process-wide embedding front end shared by ingestion and retrieval.
+
+    Query embeddings requested concurrently are gathered for up to
+    ``max_wait_ms`` (or until ``max_batch_size`` is reached) and encoded in a
+    single ``model.encode`` call on a dedicated worker thread, instead of one
+    small forward pass per request on the default thread pool. Query-side
+    embeddings (questions, answers, packed blocks) are cached in memory only.
+    """
+
+    def __init__(
+        self,
+        model: EmbeddingModel,
+        max_batch_size: int = None,
+        max_wait_ms: float = None
+    ):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE)
+        self.max_wait = (
+            max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_MAX_WAIT_MS
+        ) / 1000.0
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+
+    async def start(self):
+        """Start the batching loop on the running event loop"""
+        if self._worker and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        """Stop the batching loop and fail any requests still waiting"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._queue:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Embedding service stopped"))
+
+        self._executor.shutdown(wait=False)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Synchronous batch embedding for callers already off the event loop"""
+        return self.model.embed(texts)
+
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several queries of one request in a single encode call on the embedding thread"""
+        if len(texts) == 1:
+            return [await self.embed_query(texts[0])]
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._embed_transient, texts)
+
+    async def embed_query(self, text: str) -> list[float]:
+        """Embed a single query, coalesced with other concurrent requests"""
+        if not self._worker or self._worker.done():
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _embed_transient(self, texts: list[str]) -> list[list[float]]:
+        return self.model.embed(texts, persist=False)
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Gather whatever else arrives within the wait window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await loop.run_in_executor(self._executor, self._embed_transient, texts)
+            except Exception as e:
+                logger.log("ERROR", "embedding_batch_failed", batch_size=len(batch), error=str(e))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+            if len(batch) > 1:
+                logger.log("INFO", "embedding_batch_completed", batch_size=len(batch))
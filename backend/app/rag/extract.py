@@ -0,0 +1,50 @@
+"""
+Streaming document → chunk metadata rows for ingestion.
+
+Pages and file blocks are chunked as soon as they are read, so memory stays
+bounded regardless of file size and the embedding stage can start on the first
+chunks while later PDF pages are still being parsed.
+"""
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Iterator
+from app.rag.loader import iter_document_pages
+from app.rag.chunker import Chunker
+
+
+def iter_document_chunks(
+    file_path: Path,
+    document_id: str,
+    chunker: Chunker,
+    executor: Executor | None = None,
+    workers: int | None = None
+) -> Iterator[dict]:
+    """
+    Load and chunk a document, yielding metadata rows ready for embedding.
+
+    Args:
+        file_path: Path to the stored document
+        document_id: Document the chunks belong to
+        chunker: Chunking strategy to apply
+        executor: Optional process pool for page-parallel PDF extraction
+        workers: Number of processes in ``executor``
+
+    Yields:
+        Chunk metadata dictionaries with 'content' and 'page'
+    """
+    pages = iter_document_pages(file_path, executor=executor, workers=workers)
+
+    if file_path.suffix.lower() == ".pdf":
+        chunks = chunker.chunk_pages(pages)
+    else:
+        blocks = (text for _, text in pages)
+        chunks = ((chunk, None) for chunk in chunker.chunk(blocks))
+
+    for idx, (chunk, page_number) in enumerate(chunks):
+        yield {
+            "document_id": document_id,
+            "content": chunk,
+            "chunk_index": idx,
+            "file_path": str(file_path),
+            "page": page_number
+        }
@@ -0,0 +1,358 @@
+import threading
+import faiss
+import numpy as np
+from app.core.config import settings
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# l2: squared euclidean distance; cosine: inner product over L2-normalised vectors
+METRICS = ("l2", "cosine")
+
+# Faiss k-means only benefits from up to ~256 points per centroid
+MAX_TRAINING_POINTS_PER_CENTROID = 256
+
+# Vectors are copied between indexes in slices of this many rows
+REBUILD_BATCH_SIZE = 65536
+
+# Building an IVF direct map mutates the index, which concurrent searches share
+_direct_map_lock = threading.Lock()
+
+
+def validate_index_type(index_type: str) -> str:
+    index_type = (index_type or "flat").lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported index type '{index_type}'. Supported: {', '.join(INDEX_TYPES)}")
+    return index_type
+
+
+def validate_metric(metric: str) -> str:
+    metric = (metric or "l2").lower()
+    if metric not in METRICS:
+        raise ValueError(f"Unsupported vector metric '{metric}'. Supported: {', '.join(METRICS)}")
+    return metric
+
+
+def faiss_metric(metric: str = None) -> int:
+    metric = validate_metric(metric or settings.VECTOR_METRIC)
+    return faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+
+def metric_of(index: faiss.Index) -> str:
+    """Return the configured-metric name matching an existing index"""
+    return "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+
+def normalize_vectors(vectors: np.ndarray, metric: str = None) -> np.ndarray:
+    """L2-normalise a float32 copy of ``vectors`` for cosine indexes; returned unchanged for l2"""
+    if validate_metric(metric or settings.VECTOR_METRIC) != "cosine":
+        return vectors
+    vectors = np.array(vectors, dtype="float32", order="C")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def similarity_scores(index: faiss.Index, distances: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of the hits of a search on ``index``.
+
+    Inner-product indexes hold normalised vectors, so their scores already
+    are cosines. For l2 indexes the squared distance of unit vectors (as
+    produced by the sentence-transformers models used here) is
+    ``2 - 2 * cos``. Either way the scores of indexes with different
+    metrics are comparable.
+    """
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return distances
+    return 1.0 - distances / 2.0
+
+
+def create_flat_index(dim: int, metric: str = None) -> faiss.Index:
+    """Exact index for ``metric``, as used by the memtable and small segments"""
+    if faiss_metric(metric) == faiss.METRIC_INNER_PRODUCT:
+        return faiss.IndexFlatIP(dim)
+    return faiss.IndexFlatL2(dim)
+
+
+def create_index(dim: int, index_type: str = None, metric: str = None) -> faiss.Index:
+    """
+    Create an empty FAISS index of the requested type and metric
+    (``VECTOR_METRIC`` by default).
+
+    Supported types:
+    - flat: exact brute-force search
+    - ivf_flat: inverted lists over full vectors (needs training)
+    - ivf_pq: inverted lists over product-quantised vectors (needs training)
+    - hnsw: graph-based search, no training
+    """
+    index_type = validate_index_type(index_type or settings.VECTOR_INDEX_TYPE)
+
+    if index_type == "flat":
+        index = create_flat_index(dim, metric)
+    elif index_type == "ivf_flat":
+        quantizer = create_flat_index(dim, metric)
+        index = faiss.IndexIVFFlat(quantizer, dim, settings.IVF_NLIST, faiss_metric(metric))
+    elif index_type == "ivf_pq":
+        if dim % settings.PQ_M != 0:
+            raise ValueError(f"PQ_M ({settings.PQ_M}) must divide the embedding dimension ({dim})")
+        quantizer = create_flat_index(dim, metric)
+        index = faiss.IndexIVFPQ(
+            quantizer, dim, settings.IVF_NLIST, settings.PQ_M, settings.PQ_NBITS, faiss_metric(metric)
+        )
+    else:
+        index = faiss.IndexHNSWFlat(dim, settings.HNSW_M, faiss_metric(metric))
+        index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+
+    configure_search(index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Return the configured-type name matching an existing index"""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def is_lossy(index_type: str) -> bool:
+    """Whether vectors read back from an index of this type only approximate the ones added"""
+    return validate_index_type(index_type) == "ivf_pq"
+
+
+def requires_training(index_type: str) -> bool:
+    return validate_index_type(index_type).startswith("ivf")
+
+
+def min_training_vectors(index_type: str) -> int:
+    """Number of vectors that must accumulate before an index of this type can be trained"""
+    if not requires_training(index_type):
+        return 0
+
+    minimum = max(settings.IVF_TRAIN_MIN_VECTORS, settings.IVF_NLIST)
+    if index_type == "ivf_pq":
+        # Each PQ sub-quantiser has 2^nbits centroids to fit
+        minimum = max(minimum, 2 ** settings.PQ_NBITS)
+    return minimum
+
+
+def configure_search(index: faiss.Index) -> faiss.Index:
+    """Apply search-time parameters (nprobe / efSearch) from settings"""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(settings.IVF_NPROBE, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.HNSW_EF_SEARCH
+    return index
+
+
+def ensure_direct_map(index: faiss.Index) -> faiss.Index:
+    """IVF indexes need a direct map from ids to list positions to reconstruct vectors"""
+    if isinstance(index, faiss.IndexIVF):
+        with _direct_map_lock:
+            if index.direct_map.type == faiss.DirectMap.NoMap:
+                index.make_direct_map()
+    return index
+
+
+def reconstruct_range(index: faiss.Index, start: int, count: int) -> np.ndarray:
+    """Read stored vectors back out of an index without re-embedding"""
+    return ensure_direct_map(index).reconstruct_n(start, count)
+
+
+def reconstruct_rows(index: faiss.Index, rows: np.ndarray) -> np.ndarray:
+    """Stored vectors of the given rows (approximate for ivf_pq)"""
+    return ensure_direct_map(index).reconstruct_batch(np.ascontiguousarray(rows, dtype="int64"))
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray) -> faiss.Index:
+    """Train ``index`` on (a sample of) ``vectors`` if its type requires it"""
+    if index.is_trained:
+        return index
+
+    sample_size = min(len(vectors), settings.IVF_NLIST * MAX_TRAINING_POINTS_PER_CENTROID)
+    if sample_size < len(vectors):
+        # Train on an evenly spaced sample rather than the whole corpus
+        positions = np.linspace(0, len(vectors) - 1, sample_size).astype("int64")
+        vectors = vectors[positions]
+    index.train(np.ascontiguousarray(vectors, dtype="float32"))
+    return index
+
+
+def build_index(vectors: np.ndarray, index_type: str = None, metric: str = None) -> faiss.Index:
+    """
+    Create, train and fill an index of ``index_type`` from an (n, d) array;
+    vectors are normalised first for cosine indexes
+    """
+    index_type = validate_index_type(index_type or settings.VECTOR_INDEX_TYPE)
+    index = create_index(vectors.shape[1], index_type, metric)
+    vectors = normalize_vectors(vectors, metric)
+
+    if requires_training(index_type):
+        if len(vectors) < min_training_vectors(index_type):
+            raise ValueError(
+                f"Index type '{index_type}' needs at least {min_training_vectors(index_type)} "
+                f"vectors to train, only {len(vectors)} available"
+            )
+        train_index(index, vectors)
+
+    if len(vectors):
+        index.add(np.ascontiguousarray(vectors, dtype="float32"))
+    return index
+
+
+def rebuild_index(
+    source: faiss.Index,
+    index_type: str = None,
+    metric: str = None,
+    vectors: np.ndarray | None = None
+) -> faiss.Index:
+    """
+    Rebuild ``source`` into a new index of ``index_type`` and ``metric``.
+
+    Vectors are reconstructed from the source index in batches, so nothing is
+    re-embedded and FAISS ids (row positions) are preserved. Lossy sources (ivf_pq) yield
+    their quantised approximations unless their exact rows are passed as
+    ``vectors`` (e.g. a memory-mapped segment column); cosine targets get
+    normalised vectors.
+    """
+    def read_rows(rows: np.ndarray) -> np.ndarray:
+        if vectors is not None:
+            return np.asarray(vectors[rows], dtype="float32")
+        return reconstruct_rows(source, rows)
+
+    def read_range(start: int, count: int) -> np.ndarray:
+        if vectors is not None:
+            return np.asarray(vectors[start:start + count], dtype="float32")
+        return reconstruct_range(source, start, count)
+
+    index_type = validate_index_type(index_type or settings.VECTOR_INDEX_TYPE)
+    target = create_index(source.d, index_type, metric)
+    ntotal = source.ntotal
+
+    if ntotal == 0:
+        return target
+
+    if requires_training(index_type):
+        if ntotal < min_training_vectors(index_type):
+            raise ValueError(
+                f"Index type '{index_type}' needs at least {min_training_vectors(index_type)} "
+                f"vectors to train, only {ntotal} available"
+            )
+        # Only the training sample is materialised, not the whole corpus
+        sample_size = min(ntotal, settings.IVF_NLIST * MAX_TRAINING_POINTS_PER_CENTROID)
+        if sample_size < ntotal:
+            positions = np.linspace(0, ntotal - 1, sample_size).astype("int64")
+            training = read_rows(positions)
+        else:
+            training = read_range(0, ntotal)
+        train_index(target, normalize_vectors(training, metric))
+
+    for start in range(0, ntotal, REBUILD_BATCH_SIZE):
+        count = min(REBUILD_BATCH_SIZE, ntotal - start)
+        batch = normalize_vectors(read_range(start, count), metric)
+        target.add(np.ascontiguousarray(batch, dtype="float32"))
+
+    return configure_search(target)
+
+
+def _bitmap_selector(mask: np.ndarray) -> faiss.IDSelector:
+    """Selector for the rows set in a boolean ``mask``"""
+    bits = np.packbits(mask, bitorder="little")
+    # The bitmap size is in bytes
+    selector = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))
+    # SWIG does not keep the buffer alive
+    selector.referenced_objects = [bits]
+    return selector
+
+
+def id_selector(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    ntotal: int,
+    deleted: np.ndarray | None = None
+) -> faiss.IDSelector:
+    """
+    Selector for the rows in [starts[i], ends[i]) ranges that are not marked
+    in ``deleted``.
+
+    Anything but a single live range becomes one bitmap over the ``ntotal``
+    rows, so no composite selector has to keep its operands alive.
+    """
+    if len(starts) == 1 and deleted is None:
+        return faiss.IDSelectorRange(int(starts[0]), int(ends[0]))
+    mask = np.zeros(ntotal, dtype=bool)
+    for start, end in zip(starts, ends):
+        mask[start:end] = True
+    if deleted is not None:
+        mask[:len(deleted)] &= ~deleted
+    return _bitmap_selector(mask)
+
+
+def live_selector(deleted: np.ndarray) -> faiss.IDSelector:
+    """Selector for the rows not marked in the ``deleted`` mask"""
+    return _bitmap_selector(~deleted)
+
+
+def search_params(index: faiss.Index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """Search parameters carrying ``selector`` and the index's own nprobe / efSearch"""
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def search_live(index: faiss.Index, query: np.ndarray, k: int, deleted: np.ndarray | None = None):
+    """Search all rows, skipping rows marked in ``deleted`` inside the index scan"""
+    k = min(k, index.ntotal)
+    if deleted is None:
+        return index.search(query, k)
+    selector = live_selector(deleted)
+    return index.search(query, k, params=search_params(index, selector))
+
+
+def search_ranges(
+    index: faiss.Index,
+    query: np.ndarray,
+    k: int,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    deleted: np.ndarray | None = None
+):
+    """
+    Search only rows in the [starts[i], ends[i]) ranges that are not marked
+    in ``deleted``.
+
+    Flat indexes store vectors contiguously, so the selected slices are
+    scanned directly and the cost is proportional to the rows selected, not
+    to the index size. Other index types push a FAISS ID selector into the
+    search, so results are restricted without over-fetching.
+
+    Returns:
+        ``(distances, ids)`` shaped (len(query), k'), with k' <= k and ids
+        being rows of ``index``
+    """
+    total = int((ends - starts).sum())
+    k = min(k, total)
+    if k <= 0:
+        return np.empty((len(query), 0), dtype="float32"), np.empty((len(query), 0), dtype="int64")
+
+    if isinstance(index, faiss.IndexFlat):
+        stored = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+        if len(starts) == 1 and deleted is None:
+            vectors = stored[starts[0]:ends[0]]
+            rows = np.arange(starts[0], ends[0], dtype="int64")
+        else:
+            rows = np.concatenate([np.arange(s, e, dtype="int64") for s, e in zip(starts, ends)])
+            if deleted is not None:
+                rows = rows[~deleted[rows]]
+            vectors = stored[rows]
+        k = min(k, len(rows))
+        if k <= 0:
+            return np.empty((len(query), 0), dtype="float32"), np.empty((len(query), 0), dtype="int64")
+        distances, positions = faiss.knn(query, vectors, k, metric=index.metric_type)
+        return distances, np.where(positions >= 0, rows[np.maximum(positions, 0)], -1)
+
+    selector = id_selector(starts, ends, index.ntotal, deleted)
+    return index.search(query, k, params=search_params(index, selector))
@@ -1,58 +1,120 @@
+from collections import deque
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import Iterator
 from pypdf import PdfReader
+from app.core.config import settings
 from app.observability.logger import JsonLogger
 
 logger = JsonLogger("document-loader")
 
+# Characters per read when streaming text and markdown files
+TEXT_READ_SIZE = 1 << 20
 
-def load_document(file_path: Path) -> str:
+
+def _extract_pages(reader: PdfReader, file_path: str, start: int, end: int) -> Iterator[str]:
+    """Yield the text of pages [start, end) of an open PDF one page at a time; failed pages yield ''"""
+    for i in range(start, min(end, len(reader.pages))):
+        try:
+            yield reader.pages[i].extract_text() or ""
+        except Exception as e:
+            logger.log(
+                "WARN",
+                "page_extraction_failed",
+                file_path=file_path,
+                page=i,
+                error=str(e)
+            )
+            yield ""
+
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> list[str]:
     """
-    Load text content from a document file.
-    
-    Supported formats:
-    - PDF (.pdf)
-    - Text files (.txt)
-    - Markdown (.md)
-    
-    Args:
-        file_path: Path to the document file
-    
-    Returns:
-        Extracted text content
-    
+    Extract the text of pages [start, end) of a PDF.
+
+    Top-level so it can run in a process pool; each call opens its own reader.
+    Pages that fail to extract yield an empty string.
+    """
+    return list(_extract_pages(PdfReader(file_path), file_path, start, end))
+
+
+def _iter_pdf_pages(file_path: Path, executor: Executor | None, workers: int) -> Iterator[tuple[int, str]]:
+    reader = PdfReader(str(file_path))
+    page_count = len(reader.pages)
+    if page_count == 0:
+        raise ValueError(f"PDF file has no pages: {file_path}")
+
+    pages_per_task = max(1, settings.PDF_PAGES_PER_TASK)
+    if executor is None or page_count < settings.PDF_PARALLEL_MIN_PAGES:
+        # Serially, each page is extracted from the open reader only when it is consumed
+        ranges = [(0, page_count)]
+        results = [_extract_pages(reader, str(file_path), 0, page_count)]
+    else:
+        ranges = [(start, start + pages_per_task) for start in range(0, page_count, pages_per_task)]
+        # Keep every worker busy with one range queued behind it
+        results = _ordered_results(executor, str(file_path), ranges, max(2, workers * 2))
+
+    has_text = False
+
+    for (start, _), page_texts in zip(ranges, results):
+        for offset, page_text in enumerate(page_texts):
+            has_text = has_text or bool(page_text.strip())
+            # Page numbers are 1-based for display in citations
+            yield start + offset + 1, page_text
+
+    if not has_text:
+        raise ValueError(f"PDF file contains no extractable text: {file_path}")
+
+
+def _ordered_results(executor: Executor, file_path: str, ranges: list[tuple[int, int]], window: int):
+    """Run page ranges on ``executor`` with at most ``window`` in flight, yielding in page order"""
+    pending = deque()
+    remaining = iter(ranges)
+
+    for start, end in remaining:
+        pending.append(executor.submit(extract_pdf_pages, file_path, start, end))
+        if len(pending) >= window:
+            break
+
+    while pending:
+        page_texts = pending.popleft().result()
+        next_range = next(remaining, None)
+        if next_range is not None:
+            pending.append(executor.submit(extract_pdf_pages, file_path, *next_range))
+        yield page_texts
+
+
+def iter_document_pages(
+    file_path: Path,
+    executor: Executor | None = None,
+    workers: int | None = None
+) -> Iterator[tuple[int | None, str]]:
+    """
+    Stream text content from a document file.
+
+    Yields ``(page_number, text)`` pairs as they are extracted, so chunking and
+    embedding can start before the whole document is parsed. PDF pages are
+    numbered from 1; text and markdown files are read in ``TEXT_READ_SIZE``
+    blocks, each yielded with a ``None`` page.
+
+    When ``executor`` is a process pool and the PDF has at least
+    ``PDF_PARALLEL_MIN_PAGES`` pages, page ranges of ``PDF_PAGES_PER_TASK``
+    are extracted in parallel and still yielded in page order. ``workers``
+    is the size of that pool (``INGESTION_PARSE_PROCESSES`` by default) and
+    bounds how many ranges are in flight.
+
     Raises:
         ValueError: If file format is not supported or file cannot be read
     """
     if not file_path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
-    
+
     file_ext = file_path.suffix.lower()
-    
+
     try:
         if file_ext == '.pdf':
             try:
-                reader = PdfReader(str(file_path))
-                if len(reader.pages) == 0:
-                    raise ValueError(f"PDF file has no pages: {file_path}")
-                
-                text = ""
-                for i, page in enumerate(reader.pages):
-                    try:
-                        page_text = page.extract_text() or ""
-                        text += page_text + "\n"
-                    except Exception as e:
-                        logger.log(
-                            "WARN",
-                            "page_extraction_failed",
-                            file_path=str(file_path),
-                            page=i,
-                            error=str(e)
-                        )
-                
-                if not text.strip():
-                    raise ValueError(f"PDF file contains no extractable text: {file_path}")
-                
-                return text.strip()
+                yield from _iter_pdf_pages(file_path, executor, workers or settings.INGESTION_PARSE_PROCESSES)
             except Exception as pdf_error:
                 logger.log(
                     "ERROR",
@@ -62,13 +124,15 @@ def load_document(file_path: Path) -> str:
                     error_type=type(pdf_error).__name__
                 )
                 raise
-        
+
         elif file_ext in ['.txt', '.md']:
-            return file_path.read_text(encoding="utf-8")
-        
+            with open(file_path, encoding="utf-8") as f:
+                while block := f.read(TEXT_READ_SIZE):
+                    yield None, block
+
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
-    
+
     except Exception as e:
         logger.log(
             "ERROR",
@@ -76,4 +140,28 @@ def load_document(file_path: Path) -> str:
             file_path=str(file_path),
             error=str(e)
         )
-        raise
\ No newline at end of file
+        raise
+
+
+def load_document(file_path: Path) -> str:
+    """
+    Load text content from a document file.
+
+    Supported formats:
+    - PDF (.pdf)
+    - Text files (.txt)
+    - Markdown (.md)
+
+    Args:
+        file_path: Path to the document file
+
+    Returns:
+        Extracted text content
+
+    Raises:
+        ValueError: If file format is not supported or file cannot be read
+    """
+    if file_path.suffix.lower() == '.pdf':
+        # Pages are joined once instead of concatenated one by one
+        return "\n".join(text for _, text in iter_document_pages(file_path)).strip()
+    return "".join(text for _, text in iter_document_pages(file_path))
@@ -0,0 +1,149 @@
+"""
+Rebuild the persisted FAISS segment indexes into another index type or metric without re-embedding.
+
+Usage:
+    python -m app.rag.migrate_index --index-type ivf_flat [--metric cosine]
+
+Stop the API before migrating; the running process keeps its own copies of the
+segment indexes. Set VECTOR_INDEX_TYPE and VECTOR_METRIC to the same values so
+that new segments and compactions keep producing them.
+"""
+import argparse
+import os
+import shutil
+import faiss
+import numpy as np
+from app.core.config import settings
+from app.rag.index_factory import (
+    INDEX_TYPES,
+    METRICS,
+    index_type_of,
+    is_lossy,
+    metric_of,
+    normalize_vectors,
+    rebuild_index,
+    reconstruct_range,
+    validate_metric,
+)
+from app.rag.segments import (
+    INDEX_FILE,
+    VECTORS_FILE,
+    fsync_dir,
+    fsync_file,
+    open_vectors,
+    read_manifest,
+    segment_index_type,
+    write_vectors,
+)
+from app.rag.vectorstore import SEGMENTS_PATH, STORE_PATH, VectorStore
+from app.observability.logger import JsonLogger
+from app.observability.timing import measure_latency
+
+logger = JsonLogger("index-migration")
+
+
+def migrate_segment(segment_path, index_type: str, keep_backup: bool = True, metric: str = None) -> dict:
+    """
+    Rebuild one segment's ``index.faiss`` in place as ``index_type`` and
+    ``metric`` (``VECTOR_METRIC`` by default).
+
+    FAISS ids are row positions and ``rebuild_index`` preserves them, so the
+    segment's chunk store does not change. Segments too small to train an IVF
+    index stay flat, exactly as new segments would. A segment's raw vector
+    column is used as the source when it has one, and is (re)written for
+    lossy targets and dropped for the others.
+    """
+    index_path = segment_path / INDEX_FILE
+    source = faiss.read_index(str(index_path))
+    source_type = index_type_of(source)
+    target_type = segment_index_type(source.ntotal, index_type)
+    metric = validate_metric(metric or settings.VECTOR_METRIC)
+
+    if source_type == target_type and metric_of(source) == metric:
+        return {
+            "segment": segment_path.name,
+            "source_type": source_type,
+            "target_type": target_type,
+            "metric": metric,
+            "skipped": True
+        }
+
+    raw_vectors = open_vectors(segment_path, source)
+    with measure_latency() as elapsed:
+        target = rebuild_index(source, target_type, metric, vectors=raw_vectors)
+
+    if keep_backup:
+        shutil.copy2(index_path, index_path.with_suffix(".faiss.bak"))
+
+    # Write next to the original and swap atomically so a crash never leaves a torn index
+    tmp_path = index_path.with_suffix(".faiss.tmp")
+    faiss.write_index(target, str(tmp_path))
+    fsync_file(tmp_path)
+    os.replace(tmp_path, index_path)
+    if is_lossy(target_type):
+        exact = raw_vectors if raw_vectors is not None else reconstruct_range(source, 0, source.ntotal)
+        write_vectors(segment_path, normalize_vectors(np.asarray(exact, dtype="float32"), metric))
+    elif raw_vectors is not None:
+        os.remove(segment_path / VECTORS_FILE)
+    fsync_dir(segment_path)
+
+    return {
+        "segment": segment_path.name,
+        "source_type": source_type,
+        "target_type": target_type,
+        "source_metric": metric_of(source),
+        "metric": metric,
+        "vectors": target.ntotal,
+        "latency_ms": round(elapsed() * 1000, 2)
+    }
+
+
+def migrate_index(index_type: str, keep_backup: bool = True, metric: str = None) -> list[dict]:
+    """Rebuild every live segment as ``index_type`` with ``metric``"""
+    metric = validate_metric(metric or settings.VECTOR_METRIC)
+    manifest = read_manifest(STORE_PATH)
+    if manifest is None:
+        # Converts a legacy single index.faiss into the segment layout
+        VectorStore(dim=settings.EMBEDDING_DIM)
+        manifest = read_manifest(STORE_PATH)
+
+    logger.log(
+        "INFO",
+        "index_migration_started",
+        target_type=index_type,
+        metric=metric,
+        segments=len(manifest["segments"])
+    )
+
+    results = []
+    for name in manifest["segments"]:
+        result = migrate_segment(SEGMENTS_PATH / name, index_type, keep_backup, metric)
+        logger.log("INFO", "segment_migrated", **result)
+        results.append(result)
+
+    logger.log("INFO", "index_migration_completed", target_type=index_type, segments=len(results))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the FAISS segment indexes into another index type or metric")
+    parser.add_argument(
+        "--index-type",
+        choices=INDEX_TYPES,
+        default=settings.VECTOR_INDEX_TYPE,
+        help="Target index type (defaults to VECTOR_INDEX_TYPE)"
+    )
+    parser.add_argument(
+        "--metric",
+        choices=METRICS,
+        default=settings.VECTOR_METRIC,
+        help="Target metric (defaults to VECTOR_METRIC)"
+    )
+    parser.add_argument("--no-backup", action="store_true", help="Do not keep index.faiss.bak files")
+    args = parser.parse_args()
+
+    migrate_index(args.index_type, keep_backup=not args.no_backup, metric=args.metric)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from app.core.config import settings
+from app.observability.logger import JsonLogger
+from app.observability.timing import measure_latency
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+logger = JsonLogger("reranker")
+
+
+def load_cross_encoder(model_name: str, max_length: int):
+    """Load a cross-encoder; sentence-transformers (and torch) are only imported here"""
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, max_length=max_length)
+
+
+class CrossEncoderReranker:
+    """
+    Reorders retrieval candidates with a small local cross-encoder.
+
+    All (query, chunk) pairs of a request are scored in one batched forward
+    pass on a dedicated worker thread. If scoring does not finish within
+    ``budget_ms`` (or the worker is still busy with an earlier request that
+    blew its budget), the candidates keep their retrieval order, so a slow
+    model never adds more than the budget to a query.
+    """
+
+    def __init__(self, model_name: str = None, budget_ms: float = None, max_length: int = None):
+        self.model_name = model_name or settings.RERANK_MODEL
+        self.budget = (budget_ms if budget_ms is not None else settings.RERANK_BUDGET_MS) / 1000.0
+        logger.log("INFO", "loading_rerank_model", model=self.model_name)
+        self.model = load_cross_encoder(self.model_name, max_length or settings.RERANK_MAX_LENGTH)
+        logger.log("INFO", "rerank_model_loaded", model=self.model_name)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        # Scoring that outlived its budget; later requests skip reranking until it finishes
+        self._overrun: asyncio.Future | None = None
+
+    def score(self, query: str, texts: list[str]) -> list[float]:
+        """Relevance of each text to ``query``, higher is better"""
+        scores = self.model.predict(
+            [(query, text) for text in texts],
+            batch_size=max(1, len(texts)),
+            show_progress_bar=False
+        )
+        return [float(score) for score in scores]
+
+    async def rerank(self, query: str, candidates: list[dict], k: int) -> list[dict]:
+        """
+        Return the ``k`` best candidates by cross-encoder score.
+
+        Falls back to the first ``k`` candidates in their given order when the
+        budget is exceeded or scoring fails.
+
+        Args:
+            query: Search query
+            candidates: Retrieval results with a ``content`` field, best first
+            k: Number of results to keep
+
+        Returns:
+            Up to ``k`` candidates, each with a ``rerank_score`` when reranked
+        """
+        if len(candidates) <= 1:
+            return candidates[:k]
+
+        if self._overrun is not None and not self._overrun.done():
+            logger.log("WARN", "rerank_skipped", reason="worker_busy", candidates=len(candidates))
+            return candidates[:k]
+
+        texts = [candidate.get("content") or "" for candidate in candidates]
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self.score, query, texts)
+        with measure_latency() as elapsed:
+            try:
+                scores = await asyncio.wait_for(asyncio.shield(future), timeout=self.budget)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    # The worker thread cannot be interrupted; its result is dropped
+                    self._overrun = future
+                    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                logger.log(
+                    "WARN",
+                    "rerank_skipped",
+                    reason="budget_exceeded" if isinstance(e, asyncio.TimeoutError) else str(e),
+                    candidates=len(candidates),
+                    budget_ms=round(self.budget * 1000, 2)
+                )
+                return candidates[:k]
+
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)[:k]
+        logger.log(
+            "INFO",
+            "rerank_completed",
+            candidates=len(candidates),
+            kept=len(order),
+            latency_ms=round(elapsed() * 1000, 2)
+        )
+        return [{**candidates[i], "rerank_score": scores[i]} for i in order]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
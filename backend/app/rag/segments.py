@@ -0,0 +1,231 @@
+import json
+import os
+import shutil
+import faiss
+import numpy as np
+from pathlib import Path
+from app.core.config import settings
+from app.rag.chunkstore import ChunkStore
+from app.rag.index_factory import (
+    build_index,
+    configure_search,
+    index_type_of,
+    is_lossy,
+    min_training_vectors,
+    reconstruct_range,
+    reconstruct_rows,
+    requires_training,
+)
+from app.rag.sparse import SPARSE_DIR, SparseIndex
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("segments")
+
+INDEX_FILE = "index.faiss"
+# Exact float32 rows of segments whose index only keeps quantised vectors (ivf_pq)
+VECTORS_FILE = "vectors.f32"
+CHUNKS_DIR = "chunks"
+# Bitmap of deleted rows; the only file of a segment that changes after it is written
+TOMBSTONES_FILE = "tombstones.bits"
+MANIFEST_FILE = "MANIFEST.json"
+TMP_SUFFIX = ".tmp"
+
+
+def fsync_dir(path: Path):
+    """Make renames inside ``path`` durable"""
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_file(path: Path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def segment_index_type(count: int, index_type: str = None) -> str:
+    """Configured index type, or flat while a segment is too small to train IVF"""
+    index_type = index_type or settings.VECTOR_INDEX_TYPE
+    if requires_training(index_type) and count < min_training_vectors(index_type):
+        return "flat"
+    return index_type
+
+
+class Segment:
+    """
+    Immutable on-disk unit of the vector store: a FAISS index, the
+    ChunkStore holding metadata for its rows (row i of the index is row i of
+    the chunk store) and a BM25 SparseIndex over the same rows.
+
+    Deleted rows are marked in ``deleted`` (None when there are none) and
+    skipped at search time until compaction rewrites the segment without
+    them.
+
+    Segments with a lossy index also keep their rows as added in a
+    memory-mapped ``VECTORS_FILE`` column, so compaction and rescoring never
+    work from (and retrain on) quantised reconstructions.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        index: faiss.Index,
+        chunks: ChunkStore,
+        sparse: SparseIndex,
+        deleted: np.ndarray | None = None,
+        raw_vectors: np.ndarray | None = None
+    ):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.index = index
+        self.chunks = chunks
+        self.sparse = sparse
+        self.deleted = deleted
+        self.raw_vectors = raw_vectors
+
+    @property
+    def count(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def index_type(self) -> str:
+        return index_type_of(self.index)
+
+    @property
+    def deleted_count(self) -> int:
+        return 0 if self.deleted is None else int(self.deleted.sum())
+
+    def live_rows(self) -> np.ndarray:
+        if self.deleted is None:
+            return np.arange(self.count, dtype="int64")
+        return np.flatnonzero(~self.deleted)
+
+    def write_tombstones(self, deleted: np.ndarray):
+        """Durably store a new deleted-rows mask; the caller swaps it in with ``self.deleted = deleted``"""
+        tmp_path = self.path / (TOMBSTONES_FILE + TMP_SUFFIX)
+        with open(tmp_path, "wb") as f:
+            f.write(np.packbits(deleted, bitorder="little").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path / TOMBSTONES_FILE)
+        fsync_dir(self.path)
+
+    @classmethod
+    def open(cls, path: Path) -> "Segment":
+        index = configure_search(faiss.read_index(str(path / INDEX_FILE)))
+        chunks = ChunkStore(path / CHUNKS_DIR)
+        if (path / SPARSE_DIR).exists():
+            sparse = SparseIndex(path / SPARSE_DIR)
+        else:
+            # Segments written before hybrid search: index their text once
+            sparse = SparseIndex.write(path / SPARSE_DIR, [chunks.get(i)["content"] for i in range(len(chunks))])
+            fsync_dir(path)
+            logger.log("INFO", "sparse_index_backfilled", segment=path.name, rows=sparse.rows)
+
+        deleted = None
+        if (path / TOMBSTONES_FILE).exists():
+            bits = np.fromfile(path / TOMBSTONES_FILE, dtype=np.uint8)
+            deleted = np.unpackbits(bits, count=index.ntotal, bitorder="little").astype(bool)
+        return cls(path, index, chunks, sparse, deleted, open_vectors(path, index))
+
+    @classmethod
+    def write(cls, path: Path, vectors: np.ndarray, metadatas: list[dict], index_type: str = None) -> "Segment":
+        """
+        Write a new segment durably.
+
+        Everything is written into ``<name>.tmp`` and fsynced, then the
+        directory is renamed into place, so a crash never exposes a partial
+        segment. The segment only becomes live once a manifest references it.
+        """
+        if len(vectors) != len(metadatas):
+            raise ValueError("Vectors and metadatas must have the same length")
+
+        tmp_path = path.with_name(path.name + TMP_SUFFIX)
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        index = build_index(vectors, segment_index_type(len(vectors), index_type))
+        faiss.write_index(index, str(tmp_path / INDEX_FILE))
+        fsync_file(tmp_path / INDEX_FILE)
+        if is_lossy(index_type_of(index)):
+            write_vectors(tmp_path, vectors)
+
+        chunks = ChunkStore(tmp_path / CHUNKS_DIR)
+        chunks.import_rows(metadatas)
+        fsync_dir(tmp_path / CHUNKS_DIR)
+        SparseIndex.write(tmp_path / SPARSE_DIR, [meta.get("content") or "" for meta in metadatas])
+        fsync_dir(tmp_path / SPARSE_DIR)
+        fsync_dir(tmp_path)
+
+        os.rename(tmp_path, path)
+        fsync_dir(path.parent)
+
+        return cls(
+            path,
+            configure_search(index),
+            ChunkStore(path / CHUNKS_DIR),
+            SparseIndex(path / SPARSE_DIR),
+            raw_vectors=open_vectors(path, index)
+        )
+
+    def vectors(self) -> np.ndarray:
+        """Stored vectors; approximate only for ivf_pq segments written before the raw vector column"""
+        if self.raw_vectors is not None:
+            return self.raw_vectors
+        if self.count == 0:
+            return np.empty((0, self.index.d), dtype="float32")
+        return reconstruct_range(self.index, 0, self.count)
+
+    def row_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Stored vectors of the given rows, read like ``vectors``"""
+        if self.raw_vectors is not None:
+            return np.asarray(self.raw_vectors[rows], dtype="float32")
+        return reconstruct_rows(self.index, rows)
+
+    def metadatas(self) -> list[dict]:
+        return [self.chunks.get(i) for i in range(len(self.chunks))]
+
+    def search(self, query: np.ndarray, k: int):
+        k = min(k, self.count)
+        if k <= 0:
+            return np.empty((len(query), 0), dtype="float32"), np.empty((len(query), 0), dtype="int64")
+        return self.index.search(query, k)
+
+
+def write_vectors(path: Path, vectors: np.ndarray):
+    """Durably write (or atomically replace) the raw float32 column of a segment directory"""
+    tmp_path = path / (VECTORS_FILE + TMP_SUFFIX)
+    with open(tmp_path, "wb") as f:
+        np.ascontiguousarray(vectors, dtype="float32").tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path / VECTORS_FILE)
+
+
+def open_vectors(path: Path, index: faiss.Index) -> np.ndarray | None:
+    """Memory-map a segment's raw vector column, if it has one"""
+    if index.ntotal == 0 or not (path / VECTORS_FILE).exists():
+        return None
+    return np.memmap(path / VECTORS_FILE, dtype="float32", mode="r", shape=(index.ntotal, index.d))
+
+
+def read_manifest(store_path: Path) -> dict | None:
+    manifest_path = store_path / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def write_manifest(store_path: Path, manifest: dict):
+    """Atomically replace the manifest (write temp file, fsync, rename, fsync dir)"""
+    manifest_path = store_path / MANIFEST_FILE
+    tmp_path = manifest_path.with_name(MANIFEST_FILE + TMP_SUFFIX)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+    fsync_dir(store_path)
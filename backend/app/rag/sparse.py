@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SPARSE_DIR = "sparse"
+STATS_FILE = "stats.json"
+# Fixed-width arrays of an on-disk sparse index
+ARRAYS = {
+    "terms": "<u8",     # sorted 64-bit term hashes
+    "offsets": "<i8",   # postings of terms[i] are rows/tfs[offsets[i]:offsets[i + 1]]
+    "rows": "<i4",      # row (FAISS id) of each posting
+    "tfs": "<u2",       # term frequency of each posting, saturated at 65535
+    "lengths": "<i4",   # token count of each row
+}
+
+# Query terms in more than this share of rows (and with long postings) are
+# skipped while rarer terms remain: they barely move the ranking but cost the
+# most to score
+COMMON_TERM_RATIO = 0.1
+COMMON_TERM_MIN_POSTINGS = 10_000
+
+# Identifiers such as ERR-1042, v2.3.1 or part_no/77 are kept whole, and
+# their parts are indexed as well
+TOKEN = re.compile(r"[a-z0-9]+(?:[\-_\./:][a-z0-9]+)*")
+COMPOUND_TOKEN = re.compile(r"[a-z0-9]+(?:[\-_\./:][a-z0-9]+)+")
+TOKEN_PART = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased search terms of ``text`` (order is not meaningful)"""
+    text = text.lower()
+    tokens = TOKEN.findall(text)
+    compounds = COMPOUND_TOKEN.findall(text)
+    if compounds:
+        tokens.extend(TOKEN_PART.findall(" ".join(compounds)))
+    return tokens
+
+
+@lru_cache(maxsize=1 << 16)
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a term; persisted, so it must not depend on the process"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def query_terms(query: str) -> np.ndarray:
+    """Distinct term hashes of a query"""
+    return np.array(sorted({term_hash(t) for t in tokenize(query)}), dtype=np.uint64)
+
+
+def _term_frequencies(text: str) -> tuple[Counter, int]:
+    tokens = tokenize(text)
+    return Counter(term_hash(t) for t in tokens), len(tokens)
+
+
+def analyze(texts: list[str]) -> list[tuple[Counter, int]]:
+    """(term hash frequencies, token count) of each text, for MemorySparseIndex.add"""
+    return [_term_frequencies(text) for text in texts]
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> list[tuple[float, int]]:
+    if rows.size == 0:
+        return []
+    if rows.size > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+    return [(float(scores[i]), int(rows[i])) for i in order]
+
+
+class CorpusStats:
+    """Collection-wide statistics BM25 needs, summed over every searched index"""
+
+    def __init__(self, rows: int, total_length: int, document_frequencies: np.ndarray):
+        self.rows = rows
+        self.average_length = total_length / rows if rows else 0.0
+        self.idf = np.log1p((rows - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+        # Query terms worth scoring: rare ones, or the rarest when all are common
+        present = document_frequencies > 0
+        common = (document_frequencies > COMMON_TERM_RATIO * rows) & (document_frequencies > COMMON_TERM_MIN_POSTINGS)
+        selective = present & ~common
+        if not selective.any() and present.any():
+            selective = document_frequencies == document_frequencies[present].min()
+        self.scored = selective
+
+
+def _bm25(tfs: np.ndarray, lengths: np.ndarray, idf: float, average_length: float) -> np.ndarray:
+    tfs = tfs.astype("float32")
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / max(average_length, 1e-9))
+    return idf * tfs * (BM25_K1 + 1.0) / (tfs + norm)
+
+
+def _in_ranges(rows: np.ndarray, ranges: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Mask of ``rows`` inside any of the sorted [starts, ends) ranges"""
+    starts, ends = ranges
+    if len(starts) == 0:
+        return np.zeros(len(rows), dtype=bool)
+    position = np.searchsorted(starts, rows, side="right") - 1
+    return (position >= 0) & (rows < ends[np.maximum(position, 0)])
+
+
+def _select(rows: np.ndarray, tfs: np.ndarray, ranges, deleted: np.ndarray | None):
+    """Postings restricted to ``ranges`` (if given) and without deleted rows"""
+    keep = None
+    if ranges is not None:
+        keep = _in_ranges(rows, ranges)
+    if deleted is not None:
+        live = ~deleted[rows]
+        keep = live if keep is None else keep & live
+    if keep is None:
+        return rows, tfs
+    return rows[keep], tfs[keep]
+
+
+def _accumulate(postings: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    """Sum per-term (rows, scores) into one score per row"""
+    if not postings:
+        return np.empty(0, dtype="int64"), np.empty(0, dtype="float32")
+    if len(postings) == 1:
+        return postings[0]
+    rows = np.concatenate([p[0] for p in postings])
+    scores = np.concatenate([p[1] for p in postings])
+    order = np.argsort(rows, kind="stable")
+    rows, scores = rows[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    return rows[starts], np.add.reduceat(scores, starts)
+
+
+class SparseIndex:
+    """
+    Immutable BM25 inverted index of one segment, stored in ``sparse/`` next
+    to the segment's ``index.faiss``.
+
+    Terms are 64-bit hashes in a sorted ``terms`` array; postings are
+    contiguous int32 row / uint16 tf arrays addressed by ``offsets``. All
+    arrays are memory-mapped, so opening costs nothing and a lookup is one
+    binary search per query term plus a slice of its postings, proportional
+    to how common the term is rather than to the corpus size.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        stats = json.loads((self.path / STATS_FILE).read_text(encoding="utf-8"))
+        self.rows = stats["rows"]
+        self.total_length = stats["total_length"]
+        self._arrays = {}
+        for name, dtype in ARRAYS.items():
+            array_path = self.path / f"{name}.{dtype[1:]}"
+            size = array_path.stat().st_size
+            self._arrays[name] = (
+                np.memmap(array_path, dtype=dtype, mode="r") if size else np.empty(0, dtype=dtype)
+            )
+
+    @classmethod
+    def write(cls, path: Path, texts: list[str]) -> "SparseIndex":
+        """Build the index for ``texts`` (row i is texts[i]) and write it durably"""
+        # Number distinct terms once, then count (term, row) pairs with NumPy
+        tokens = []
+        lengths = np.zeros(len(texts), dtype=ARRAYS["lengths"])
+        for row, text in enumerate(texts):
+            text_tokens = tokenize(text)
+            lengths[row] = len(text_tokens)
+            tokens.extend(text_tokens)
+
+        vocabulary = {term: i for i, term in enumerate(dict.fromkeys(tokens))}
+        token_ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype="int64", count=len(tokens))
+        del tokens
+        vocabulary_hashes = np.fromiter(
+            (term_hash(term) for term in vocabulary), dtype=np.uint64, count=len(vocabulary)
+        )
+        token_hashes = vocabulary_hashes[token_ids]
+        token_rows = np.repeat(np.arange(len(texts), dtype=ARRAYS["rows"]), lengths)
+
+        order = np.lexsort((token_rows, token_hashes))
+        token_hashes, token_rows = token_hashes[order], token_rows[order]
+        pair_starts = np.flatnonzero(np.r_[
+            True, (token_hashes[1:] != token_hashes[:-1]) | (token_rows[1:] != token_rows[:-1])
+        ]) if len(token_hashes) else np.empty(0, dtype="int64")
+        hashes, rows = token_hashes[pair_starts], token_rows[pair_starts]
+        tfs = np.minimum(np.diff(np.append(pair_starts, len(token_hashes))), np.iinfo(np.uint16).max)
+        terms, starts = np.unique(hashes, return_index=True)
+        offsets = np.append(starts, len(hashes)).astype(ARRAYS["offsets"])
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        arrays = {"terms": terms, "offsets": offsets, "rows": rows, "tfs": tfs, "lengths": lengths}
+        for name, dtype in ARRAYS.items():
+            with open(tmp_path / f"{name}.{dtype[1:]}", "wb") as f:
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        with open(tmp_path / STATS_FILE, "w", encoding="utf-8") as f:
+            json.dump({"rows": len(texts), "total_length": int(lengths.sum())}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def _locate(self, hashes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        terms = self._arrays["terms"]
+        positions = np.searchsorted(terms, hashes)
+        positions = np.minimum(positions, max(len(terms) - 1, 0))
+        found = (terms[positions] == hashes) if len(terms) else np.zeros(len(hashes), dtype=bool)
+        return positions, found
+
+    def document_frequencies(self, hashes: np.ndarray) -> np.ndarray:
+        positions, found = self._locate(hashes)
+        offsets = self._arrays["offsets"]
+        if not len(self._arrays["terms"]):
+            return np.zeros(len(hashes), dtype="int64")
+        return np.where(found, offsets[positions + 1] - offsets[positions], 0)
+
+    def search(
+        self,
+        hashes: np.ndarray,
+        stats: CorpusStats,
+        k: int,
+        ranges: tuple[np.ndarray, np.ndarray] | None = None,
+        deleted: np.ndarray | None = None
+    ) -> list[tuple[float, int]]:
+        """
+        Top ``k`` (score, row) pairs for the query term hashes, optionally
+        only rows in ``ranges`` and not marked in ``deleted``
+        """
+        positions, found = self._locate(hashes)
+        offsets, lengths = self._arrays["offsets"], self._arrays["lengths"]
+        postings = []
+        for i in np.flatnonzero(found & stats.scored):
+            start, end = int(offsets[positions[i]]), int(offsets[positions[i] + 1])
+            rows = np.asarray(self._arrays["rows"][start:end], dtype="int64")
+            tfs = np.asarray(self._arrays["tfs"][start:end])
+            rows, tfs = _select(rows, tfs, ranges, deleted)
+            postings.append((rows, _bm25(tfs, lengths[rows], stats.idf[i], stats.average_length)))
+        return _top_k(*_accumulate(postings), k)
+
+
+class MemorySparseIndex:
+    """
+    Append-only BM25 postings for the vector store memtable.
+
+    Texts are tokenized with ``analyze`` before the caller takes its write
+    lock; ``add`` only appends postings.
+    """
+
+    def __init__(self):
+        self._postings: dict[int, tuple[list[int], list[int]]] = {}
+        self._analyzed: list[tuple[Counter, int]] = []
+        self.total_length = 0
+
+    @property
+    def rows(self) -> int:
+        return len(self._analyzed)
+
+    def add(self, analyzed: list[tuple[Counter, int]]):
+        for frequencies, length in analyzed:
+            row = len(self._analyzed)
+            for term, tf in frequencies.items():
+                rows, tfs = self._postings.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+            self._analyzed.append((frequencies, length))
+            self.total_length += length
+
+    def since(self, row: int) -> "MemorySparseIndex":
+        """New index holding rows ``row`` onwards, renumbered from 0"""
+        index = MemorySparseIndex()
+        index.add(self._analyzed[row:])
+        return index
+
+    def document_frequencies(self, hashes: np.ndarray) -> np.ndarray:
+        return np.array(
+            [len(self._postings[int(h)][0]) if int(h) in self._postings else 0 for h in hashes],
+            dtype="int64"
+        )
+
+    def search(
+        self,
+        hashes: np.ndarray,
+        stats: CorpusStats,
+        k: int,
+        ranges: tuple[np.ndarray, np.ndarray] | None = None,
+        deleted: np.ndarray | None = None
+    ) -> list[tuple[float, int]]:
+        lengths = np.array([length for _, length in self._analyzed], dtype="float32")
+        postings = []
+        for i in np.flatnonzero(stats.scored):
+            entry = self._postings.get(int(hashes[i]))
+            if entry:
+                rows, tfs = _select(np.array(entry[0], dtype="int64"), np.array(entry[1]), ranges, deleted)
+                postings.append((rows, _bm25(tfs, lengths[rows], stats.idf[i], stats.average_length)))
+        return _top_k(*_accumulate(postings), k)
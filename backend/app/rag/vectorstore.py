@@ -1,76 +1,686 @@
-import faiss
 from pathlib import Path
+import json
+import math
+import os
 import pickle
+import shutil
+import threading
 import numpy as np
 from app.core.config import settings
+from app.rag.locking import ReadWriteLock
+from app.rag.chunkstore import ChunkStore
+from app.rag.index_factory import (
+    create_flat_index,
+    normalize_vectors,
+    reconstruct_rows,
+    search_live,
+    search_ranges,
+    similarity_scores,
+    validate_index_type,
+    validate_metric,
+)
+from app.rag.sparse import CorpusStats, MemorySparseIndex, analyze, query_terms
+from app.rag.segments import (
+    CHUNKS_DIR,
+    INDEX_FILE,
+    TMP_SUFFIX,
+    Segment,
+    fsync_dir,
+    read_manifest,
+    write_manifest,
+)
+from app.observability.logger import JsonLogger
+from app.observability.timing import measure_latency
+
+logger = JsonLogger("vector-store")
+
+STORE_PATH = Path(settings.VECTOR_STORE_PATH)
+SEGMENTS_PATH = STORE_PATH / "segments"
+# document_id -> tags, set at upload and used to resolve tag filters
+TAGS_PATH = STORE_PATH / "document_tags.json"
+# Single-index layout used before the segment log, migrated on first load
+LEGACY_INDEX_PATH = STORE_PATH / "index.faiss"
+LEGACY_CHUNKS_PATH = STORE_PATH / "chunks"
+LEGACY_META_PATH = STORE_PATH / "meta.pkl"
+
+
+def _row_ranges(rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted row ids compressed into [starts, ends) ranges"""
+    if len(rows) == 0:
+        return rows, rows
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    return rows[np.r_[0, breaks]], rows[np.r_[breaks - 1, len(rows) - 1]] + 1
 
-VECTOR_STORE_PATH = Path(settings.VECTOR_STORE_PATH) / "index.faiss"
-META_PATH = Path(settings.VECTOR_STORE_PATH) / "meta.pkl"
 
 class VectorStore:
-    def __init__(self, dim: int):
+    """
+    Process-wide vector store backed by an append-only segment log.
+
+    A single instance is created in the application lifespan and shared by the
+    ingestion path and the retrieval tool. Newly added vectors go into an
+    in-memory flat memtable and are searchable as soon as ``add()`` returns.
+    ``persist()`` seals the memtable into a new immutable segment (FAISS index
+    plus a memory-mapped ``ChunkStore``) and atomically swaps the manifest, so
+    the cost of an ingest is proportional to the document, not the corpus.
+
+    Searches query every segment and the memtable and merge the results by
+    cosine similarity (``score``), which is comparable across segments
+    whatever their index type or metric. With ``VECTOR_METRIC=cosine`` vectors
+    are normalised on the way in and searched by inner product.
+    Each segment (and the memtable) also carries a BM25 inverted index over
+    the same rows for ``sparse_search``.
+
+    Both searches accept ``document_ids`` to restrict results to those
+    documents (see ``resolve_filters`` for tag and document filters). The
+    restriction is pushed into each segment as row ranges, so a filtered
+    search costs about as much as searching the selected documents alone.
+
+    ``delete_document`` marks a document's rows in per-segment tombstone
+    bitmaps that searches skip inside the index scan. Compaction rewrites a
+    segment without its deleted rows once ``TOMBSTONE_COMPACTION_RATIO`` of
+    it is dead, and merges drop deleted rows as well.
+    A background compaction thread merges segments of similar size
+    (size-tiered, ``SEGMENT_MERGE_FACTOR`` at a time) to keep the number of
+    segments logarithmic in the corpus size; merged segments large enough to
+    train use the configured ``VECTOR_INDEX_TYPE``.
+
+    Searches take a shared read lock; writers only hold the exclusive lock
+    while swapping in-memory state, never while doing disk I/O or training.
+    """
+
+    def __init__(self, dim: int, index_type: str = None):
         self.dim = dim
-        # Ensure storage directory exists
-        VECTOR_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self.index_type = validate_index_type(index_type or settings.VECTOR_INDEX_TYPE)
+        self.metric = validate_metric(settings.VECTOR_METRIC)
+        self._lock = ReadWriteLock()
+        # Serialises manifest changes (commits, deletes and compaction publishes)
+        self._manifest_lock = threading.Lock()
+        # One compaction at a time; held while a merged segment is built
+        self._compaction_lock = threading.Lock()
+        self._compaction_wakeup = threading.Event()
+        self._compaction_stop = threading.Event()
+        self._compaction_thread: threading.Thread | None = None
+
+        SEGMENTS_PATH.mkdir(parents=True, exist_ok=True)
+
+        manifest = read_manifest(STORE_PATH)
+        if manifest is None:
+            manifest = self._migrate_legacy_layout()
+
+        self._next_segment = manifest.get("next_segment", 0)
+        self.segments: list[Segment] = [
+            Segment.open(SEGMENTS_PATH / name) for name in manifest.get("segments", [])
+        ]
+        self._remove_orphans()
 
-        if VECTOR_STORE_PATH.exists() and META_PATH.exists():
+        self._memtable = create_flat_index(dim, self.metric)
+        self._memtable_metadata: list[dict] = []
+        self._memtable_sparse = MemorySparseIndex()
+        # Deleted memtable rows, None while there are none
+        self._memtable_deleted: np.ndarray | None = None
+
+        # Bumped on every change; per-document values let caches tell whether
+        # the documents behind a result changed (process-local, not persisted)
+        self._generation = 0
+        self._document_generations: dict[str, int] = {}
+
+        # Guards _document_tags and its file; never held across index or segment work
+        self._tags_lock = threading.Lock()
+        self._document_tags: dict[str, list[str]] = (
+            json.loads(TAGS_PATH.read_text(encoding="utf-8")) if TAGS_PATH.exists() else {}
+        )
+
+        logger.log(
+            "INFO",
+            "vector_store_loaded",
+            segments=len(self.segments),
+            vectors=sum(s.count for s in self.segments)
+        )
+
+    # ----- startup -----
+
+    def _migrate_legacy_layout(self) -> dict:
+        """Turn a pre-segment index.faiss + chunks/ (or meta.pkl) into segment 0"""
+        manifest = {"next_segment": 0, "segments": []}
+
+        if LEGACY_INDEX_PATH.exists():
             try:
-                self.index = faiss.read_index(str(VECTOR_STORE_PATH))
-                self.metadata = pickle.loads(META_PATH.read_bytes())
-            except Exception:
-                # If loading fails, create new index
-                self.index = faiss.IndexFlatL2(dim)
-                self.metadata = []
-        else:
-            self.index = faiss.IndexFlatL2(dim)
-            self.metadata = []
+                name = self._segment_name(0)
+                segment_path = SEGMENTS_PATH / name
+                segment_path.mkdir(parents=True, exist_ok=True)
+
+                if LEGACY_CHUNKS_PATH.exists():
+                    shutil.move(str(LEGACY_CHUNKS_PATH), str(segment_path / CHUNKS_DIR))
+                elif LEGACY_META_PATH.exists():
+                    ChunkStore(segment_path / CHUNKS_DIR).import_rows(pickle.loads(LEGACY_META_PATH.read_bytes()))
+                    LEGACY_META_PATH.rename(LEGACY_META_PATH.with_suffix(".pkl.migrated"))
+                shutil.move(str(LEGACY_INDEX_PATH), str(segment_path / INDEX_FILE))
+                fsync_dir(segment_path)
+
+                manifest = {"next_segment": 1, "segments": [name]}
+                logger.log("INFO", "legacy_store_migrated", segment=name)
+            except Exception as e:
+                logger.log("ERROR", "legacy_store_migration_failed", error=str(e))
+                raise
+
+        write_manifest(STORE_PATH, manifest)
+        return manifest
+
+    def _remove_orphans(self):
+        """Delete segment directories left behind by an interrupted commit or compaction"""
+        live = {segment.name for segment in self.segments}
+        for path in SEGMENTS_PATH.iterdir():
+            if path.name not in live or path.name.endswith(TMP_SUFFIX):
+                shutil.rmtree(path, ignore_errors=True)
+                logger.log("INFO", "orphan_segment_removed", segment=path.name)
+
+    @staticmethod
+    def _segment_name(number: int) -> str:
+        return f"seg-{number:08d}"
+
+    def _allocate_segment_path(self) -> Path:
+        path = SEGMENTS_PATH / self._segment_name(self._next_segment)
+        self._next_segment += 1
+        return path
+
+    def _write_manifest(self, segments: list[Segment]):
+        write_manifest(STORE_PATH, {
+            "next_segment": self._next_segment,
+            "segments": [segment.name for segment in segments]
+        })
+
+    # ----- writes -----
+
+    @property
+    def ntotal(self) -> int:
+        with self._lock.read():
+            return sum(s.count for s in self.segments) + self._memtable.ntotal
+
+    @property
+    def generation(self) -> int:
+        """Monotonic counter of changes to the store"""
+        return self._generation
+
+    def documents_changed_since(self, document_ids, generation: int) -> bool:
+        """Whether any of ``document_ids`` was added to or changed after ``generation``"""
+        return any(self._document_generations.get(doc_id, 0) > generation for doc_id in document_ids)
+
+    def set_document_tags(self, document_id: str, tags: list[str]):
+        """Record (and persist) the tags of a document for tag-filtered search; fsyncs, so call it off the event loop"""
+        tags = sorted({tag.strip().lower() for tag in tags if tag and tag.strip()})
+        with self._tags_lock:
+            if tags:
+                self._document_tags[document_id] = tags
+            else:
+                self._document_tags.pop(document_id, None)
+            self._write_tags()
+
+    def _write_tags(self):
+        tmp_path = TAGS_PATH.with_name(TAGS_PATH.name + TMP_SUFFIX)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._document_tags, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, TAGS_PATH)
+
+    def document_tags(self, document_id: str) -> list[str]:
+        with self._tags_lock:
+            return list(self._document_tags.get(document_id, []))
+
+    def resolve_filters(self, filters: dict | None) -> set[str] | None:
+        """
+        Turn a query filter into the set of document ids to search.
+
+        ``filters`` may hold ``document_ids`` (or a single ``document_id``)
+        and ``tags``; a document matches a tag list if it has any of the
+        tags, and both keys together must both match. Returns None when
+        nothing is filtered, and an empty set when nothing can match.
+        """
+        if not filters:
+            return None
+
+        document_ids = None
+        requested = filters.get("document_ids") or filters.get("document_id")
+        if requested:
+            document_ids = {requested} if isinstance(requested, str) else {str(d) for d in requested}
+
+        tags = filters.get("tags")
+        if tags:
+            tags = {tags.lower()} if isinstance(tags, str) else {str(t).strip().lower() for t in tags}
+            with self._tags_lock:
+                document_tags = list(self._document_tags.items())
+            tagged = {doc_id for doc_id, doc_tags in document_tags if tags.intersection(doc_tags)}
+            document_ids = tagged if document_ids is None else document_ids & tagged
+
+        return document_ids
 
     def add(self, vectors: list[list[float]], metadatas: list[dict], persist: bool = False):
-        if not vectors or not metadatas:
+        if vectors is None or len(vectors) == 0 or not metadatas:
             raise ValueError("Vectors and metadatas must not be empty")
-        
+
         if len(vectors) != len(metadatas):
             raise ValueError("Vectors and metadatas must have the same length")
-        
+
         vectors_np = np.array(vectors, dtype="float32")
         # Ensure correct shape
         if vectors_np.ndim != 2 or vectors_np.shape[1] != self.dim:
             raise ValueError(f"Vectors must be 2D array with shape (n, {self.dim})")
-        
-        self.index.add(vectors_np)
-        self.metadata.extend(metadatas)
+        vectors_np = normalize_vectors(vectors_np, self.metric)
+
+        analyzed = analyze([meta.get("content") or "" for meta in metadatas])
+
+        # Index and metadata are extended together so readers never see an
+        # id without its metadata
+        with self._lock.write():
+            self._memtable.add(vectors_np)
+            self._memtable_metadata.extend(metadatas)
+            self._memtable_sparse.add(analyzed)
+            if self._memtable_deleted is not None:
+                self._memtable_deleted = np.concatenate((self._memtable_deleted, np.zeros(len(metadatas), dtype=bool)))
+            self._generation += 1
+            for meta in metadatas:
+                self._document_generations[meta.get("document_id")] = self._generation
 
         if persist:
-            self._persist()
+            self.persist()
 
-    def search(self, vector: list[float], k: int = 5):
-        if not vector or len(vector) != self.dim:
-            raise ValueError(f"Vector must have dimension {self.dim}")
-        
-        if self.index.ntotal == 0:
-            return []
-        
-        # Ensure k doesn't exceed available vectors
-        k = min(k, self.index.ntotal)
-        
-        query_vector = np.array([vector], dtype="float32")
-        distances, indices = self.index.search(query_vector, k)
-
-        results = []
-        for idx in indices[0]:
-            if 0 <= idx < len(self.metadata):
-                results.append(self.metadata[idx])
+    def delete_document(self, document_id: str, keep_tags: bool = False) -> int:
+        """
+        Tombstone every row of ``document_id``; returns the number of rows deleted.
 
-        return results
-    
-    def _persist(self):
-        """Persist index and metadata to disk"""
+        Tombstones are persisted per segment before they become visible, and
+        the document's generation is bumped so cached answers built from it
+        are invalidated. Its tags are dropped unless ``keep_tags`` (used when
+        the document is replaced).
+        """
+        deleted_rows = 0
+        with self._manifest_lock:
+            updates = []
+            for segment in self.segments:
+                starts, ends = segment.chunks.row_ranges({document_id})
+                if not len(starts):
+                    continue
+                deleted = np.zeros(segment.count, dtype=bool) if segment.deleted is None else segment.deleted.copy()
+                for start, end in zip(starts, ends):
+                    deleted[start:end] = True
+                newly_deleted = int(deleted.sum()) - segment.deleted_count
+                if newly_deleted:
+                    segment.write_tombstones(deleted)
+                    updates.append((segment, deleted))
+                    deleted_rows += newly_deleted
+
+            with self._lock.write():
+                for segment, deleted in updates:
+                    segment.deleted = deleted
+
+                rows = [i for i, meta in enumerate(self._memtable_metadata) if meta.get("document_id") == document_id]
+                if rows:
+                    if self._memtable_deleted is None:
+                        self._memtable_deleted = np.zeros(len(self._memtable_metadata), dtype=bool)
+                    deleted_rows += int((~self._memtable_deleted[rows]).sum())
+                    self._memtable_deleted[rows] = True
+
+                self._generation += 1
+                self._document_generations[document_id] = self._generation
+
+            if not keep_tags:
+                with self._tags_lock:
+                    if self._document_tags.pop(document_id, None) is not None:
+                        self._write_tags()
+
+        logger.log("INFO", "document_deleted", document_id=document_id, rows=deleted_rows)
+        if deleted_rows:
+            self._compaction_wakeup.set()
+        return deleted_rows
+
+    def persist(self):
+        """Seal the memtable into a new immutable segment and publish it in the manifest"""
         try:
-            VECTOR_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
-            faiss.write_index(self.index, str(VECTOR_STORE_PATH))
-            META_PATH.write_bytes(pickle.dumps(self.metadata))
+            with self._manifest_lock:
+                with self._lock.read():
+                    count = self._memtable.ntotal
+                    if count == 0:
+                        return
+                    vectors = self._memtable.reconstruct_n(0, count)
+                    metadatas = list(self._memtable_metadata[:count])
+                    if self._memtable_deleted is not None:
+                        # Deleted rows are dropped rather than sealed
+                        live = np.flatnonzero(~self._memtable_deleted[:count])
+                        vectors = vectors[live]
+                        metadatas = [metadatas[i] for i in live]
+
+                segment = None
+                with measure_latency() as elapsed:
+                    if metadatas:
+                        segment = Segment.write(self._allocate_segment_path(), vectors, metadatas, self.index_type)
+                        self._write_manifest(self.segments + [segment])
+
+                with self._lock.write():
+                    if segment is not None:
+                        self.segments = self.segments + [segment]
+                    # Keep rows added while the segment was being written
+                    remaining = self._memtable.ntotal - count
+                    memtable = create_flat_index(self.dim, self.metric)
+                    if remaining:
+                        memtable.add(self._memtable.reconstruct_n(count, remaining))
+                    self._memtable = memtable
+                    self._memtable_metadata = self._memtable_metadata[count:]
+                    self._memtable_sparse = self._memtable_sparse.since(count)
+                    if self._memtable_deleted is not None:
+                        remaining_deleted = self._memtable_deleted[count:]
+                        self._memtable_deleted = remaining_deleted if remaining_deleted.any() else None
+
+            if segment is None:
+                logger.log("INFO", "memtable_discarded", rows=count)
+                return
+            logger.log(
+                "INFO",
+                "segment_committed",
+                segment=segment.name,
+                vectors=segment.count,
+                index_type=segment.index_type,
+                latency_ms=round(elapsed() * 1000, 2)
+            )
+            self._compaction_wakeup.set()
         except Exception as e:
-            # Log error but don't fail the operation
-            import logging
+            # Log error but don't fail the operation; rows stay in the memtable
             import traceback
-            logging.error(f"Failed to persist vector store: {e}\n{traceback.format_exc()}")
\ No newline at end of file
+            logger.log("ERROR", "vector_store_persist_failed", error=str(e), traceback=traceback.format_exc())
+
+    # ----- compaction -----
+
+    def _compaction_candidates(self) -> list[Segment]:
+        """Lowest size tier holding at least SEGMENT_MERGE_FACTOR segments"""
+        factor = max(2, settings.SEGMENT_MERGE_FACTOR)
+        tiers: dict[int, list[Segment]] = {}
+        for segment in self.segments:
+            if segment.count >= settings.SEGMENT_MAX_ROWS:
+                continue
+            tiers.setdefault(int(math.log(max(segment.count, 1), factor)), []).append(segment)
+
+        for tier in sorted(tiers):
+            candidates = sorted(tiers[tier], key=lambda s: s.count)[:factor]
+            if len(candidates) >= factor:
+                return candidates
+        return []
+
+    def _purge_candidate(self) -> Segment | None:
+        """Segment with the largest share of deleted rows, if it crossed TOMBSTONE_COMPACTION_RATIO"""
+        worst = max(self.segments, key=lambda s: s.deleted_count / max(s.count, 1), default=None)
+        if worst is not None and worst.deleted_count and (
+            worst.deleted_count >= settings.TOMBSTONE_COMPACTION_RATIO * worst.count
+        ):
+            return worst
+        return None
+
+    def compact(self) -> bool:
+        """
+        Rewrite one segment without its deleted rows, or merge one tier of
+        small segments; returns True if anything was rewritten.
+
+        The merged segment is built and written without the manifest lock, so
+        commits and deletes carry on meanwhile. Rows deleted while it was
+        being written are tombstoned in it before it replaces its sources.
+        """
+        with self._compaction_lock:
+            with self._manifest_lock:
+                purge = self._purge_candidate()
+                candidates = [purge] if purge is not None else self._compaction_candidates()
+                if not candidates:
+                    return False
+                # Tombstone masks are replaced, never modified, so these stay as of now
+                sources = [(segment, segment.live_rows()) for segment in candidates]
+                path = self._allocate_segment_path()
+
+            with measure_latency() as elapsed:
+                vectors = np.vstack([segment.vectors()[rows] for segment, rows in sources])
+                metadatas = [segment.chunks.get(int(i)) for segment, rows in sources for i in rows]
+                merged = Segment.write(path, vectors, metadatas, self.index_type) if metadatas else None
+
+                with self._manifest_lock:
+                    if merged is not None:
+                        self._carry_over_tombstones(merged, sources)
+                    merged_names = {segment.name for segment in candidates}
+                    segments = [s for s in self.segments if s.name not in merged_names] + ([merged] if merged else [])
+                    self._write_manifest(segments)
+
+                    with self._lock.write():
+                        self.segments = segments
+
+        # In-flight searches keep their references; mmaps stay valid after unlink
+        for segment in candidates:
+            shutil.rmtree(segment.path, ignore_errors=True)
+
+        logger.log(
+            "INFO",
+            "segments_purged" if purge is not None else "segments_compacted",
+            merged=sorted(merged_names),
+            segment=merged.name if merged else None,
+            vectors=merged.count if merged else 0,
+            deleted_removed=sum(segment.count - len(rows) for segment, rows in sources),
+            index_type=merged.index_type if merged else None,
+            latency_ms=round(elapsed() * 1000, 2)
+        )
+        return True
+
+    @staticmethod
+    def _carry_over_tombstones(merged: Segment, sources: list[tuple[Segment, np.ndarray]]):
+        """Tombstone rows of ``merged`` whose source rows were deleted after the merge read them"""
+        deleted = []
+        for segment, rows in sources:
+            if segment.deleted is None:
+                deleted.append(np.zeros(len(rows), dtype=bool))
+            else:
+                deleted.append(segment.deleted[rows])
+        deleted = np.concatenate(deleted)
+        if deleted.any():
+            merged.write_tombstones(deleted)
+            merged.deleted = deleted
+
+    def _compaction_loop(self):
+        while not self._compaction_stop.is_set():
+            self._compaction_wakeup.wait(settings.SEGMENT_COMPACTION_INTERVAL_SECONDS)
+            self._compaction_wakeup.clear()
+            try:
+                while not self._compaction_stop.is_set() and self.compact():
+                    pass
+            except Exception as e:
+                logger.log("ERROR", "segment_compaction_failed", error=str(e))
+
+    def start_compaction(self):
+        """Start the background compaction thread"""
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._compaction_stop.clear()
+        self._compaction_thread = threading.Thread(
+            target=self._compaction_loop,
+            name="segment-compaction",
+            daemon=True
+        )
+        self._compaction_thread.start()
+
+    def stop_compaction(self):
+        self._compaction_stop.set()
+        self._compaction_wakeup.set()
+        if self._compaction_thread:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
+    # ----- reads -----
+
+    def _sources(self, document_ids: set[str] | None) -> list[tuple]:
+        """
+        (segment or None for the memtable, row lookup, row ranges, deleted mask) to search.
+
+        Ranges are None when unfiltered; sources with no selected rows are
+        left out. Must be called under the read lock.
+        """
+        sources = []
+        for segment in self.segments:
+            ranges = None if document_ids is None else segment.chunks.row_ranges(document_ids)
+            if ranges is None or len(ranges[0]):
+                sources.append((segment, segment.chunks.get, ranges, segment.deleted))
+
+        ranges = None
+        if document_ids is not None:
+            ranges = _row_ranges(np.array(
+                [i for i, meta in enumerate(self._memtable_metadata) if meta.get("document_id") in document_ids],
+                dtype="int64"
+            ))
+        if ranges is None or len(ranges[0]):
+            sources.append((None, self._memtable_row, ranges, self._memtable_deleted))
+        return sources
+
+    def search(
+        self,
+        vector: list[float],
+        k: int = 5,
+        document_ids: set[str] | None = None,
+        min_score: float | None = None
+    ):
+        """Top-``k`` chunks nearest to ``vector``, each with its ``distance`` and ``score``"""
+        if vector is None or len(vector) != self.dim:
+            raise ValueError(f"Vector must have dimension {self.dim}")
+        return self.search_batch([vector], k, document_ids, min_score)[0]
+
+    def search_batch(
+        self,
+        vectors: list[list[float]] | np.ndarray,
+        k: int = 5,
+        document_ids: set[str] | None = None,
+        min_score: float | None = None
+    ) -> list[list[dict]]:
+        """
+        Search several query vectors at once.
+
+        Each segment and the memtable is searched once with the whole (n, d)
+        query matrix, so n queries cost about one FAISS call per source
+        instead of n.
+
+        Args:
+            vectors: Query vectors, shaped (n, dim)
+            k: Results per query
+            document_ids: Optional restriction to these documents
+            min_score: Optional cosine similarity below which hits are dropped,
+                so a query may get fewer than ``k`` results
+
+        Returns:
+            One list per query of up to ``k`` chunk metadata dicts, most
+            similar first, each with the raw index ``distance`` and its
+            cosine similarity ``score``
+        """
+        query_vectors = np.ascontiguousarray(np.asarray(vectors, dtype="float32").reshape(-1, self.dim))
+        query_vectors = normalize_vectors(query_vectors, self.metric)
+        if len(query_vectors) == 0:
+            return []
+        if document_ids is not None and not document_ids:
+            return [[] for _ in range(len(query_vectors))]
+
+        with self._lock.read():
+            distances, scores, indices, lookups = [], [], [], []
+            for segment, lookup, ranges, deleted in self._sources(document_ids):
+                index = segment.index if segment is not None else self._memtable
+                if index.ntotal == 0:
+                    continue
+                if ranges is None:
+                    source_distances, source_indices = search_live(index, query_vectors, k, deleted)
+                else:
+                    source_distances, source_indices = search_ranges(index, query_vectors, k, *ranges, deleted=deleted)
+                distances.append(source_distances)
+                scores.append(similarity_scores(index, source_distances))
+                indices.append(source_indices)
+                lookups.extend([lookup] * source_indices.shape[1])
+
+            if not lookups:
+                return [[] for _ in range(len(query_vectors))]
+
+            # Merge per-source top-k lists into each query's global top-k
+            distances = np.hstack(distances)
+            scores = np.hstack(scores)
+            indices = np.hstack(indices)
+            scores[indices < 0] = -np.inf
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+            results = []
+            for row, columns in enumerate(order):
+                query_results = []
+                for column in columns:
+                    idx = int(indices[row, column])
+                    if idx < 0 or (min_score is not None and scores[row, column] < min_score):
+                        break
+                    meta = lookups[column](idx)
+                    if meta is not None:
+                        query_results.append({
+                            **meta,
+                            "distance": float(distances[row, column]),
+                            "score": float(scores[row, column])
+                        })
+                results.append(query_results)
+
+        return results
+
+    def sparse_search(
+        self,
+        query: str,
+        k: int = 5,
+        document_ids: set[str] | None = None,
+        vector: list[float] | np.ndarray | None = None
+    ) -> list[dict]:
+        """
+        BM25 keyword search over every segment and the memtable.
+
+        Document frequencies and lengths are summed across all of them first
+        (unfiltered, so scores match the unfiltered search), so scores from
+        different segments are comparable.
+
+        With the query's embedding as ``vector``, every hit also gets the
+        cosine similarity ``score`` of ``search``, computed from the vector
+        stored for its row rather than by re-embedding the chunk.
+        """
+        hashes = query_terms(query)
+        if hashes.size == 0 or (document_ids is not None and not document_ids):
+            return []
+
+        with self._lock.read():
+            indexes = [s.sparse for s in self.segments] + [self._memtable_sparse]
+            stats = CorpusStats(
+                sum(index.rows for index in indexes),
+                sum(index.total_length for index in indexes),
+                sum(index.document_frequencies(hashes) for index in indexes)
+            )
+
+            candidates = []
+            for segment, lookup, ranges, deleted in self._sources(document_ids):
+                index = segment.sparse if segment is not None else self._memtable_sparse
+                if index.rows == 0:
+                    continue
+                row_vectors = segment.row_vectors if segment is not None else self._memtable_vectors
+                for score, idx in index.search(hashes, stats, k, ranges, deleted):
+                    candidates.append((score, idx, lookup, row_vectors))
+
+            candidates.sort(key=lambda c: -c[0])
+            query_vector = None
+            if vector is not None:
+                query_vector = np.asarray(vector, dtype="float32").reshape(self.dim)
+                query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+
+            results = []
+            for _, idx, lookup, row_vectors in candidates[:k]:
+                meta = lookup(idx)
+                if meta is None:
+                    continue
+                if query_vector is not None:
+                    stored = row_vectors(np.array([idx]))[0]
+                    similarity = float(stored @ query_vector) / max(float(np.linalg.norm(stored)), 1e-12)
+                    meta = {**meta, "score": similarity}
+                results.append(meta)
+
+        return results
+
+    def _memtable_vectors(self, rows: np.ndarray) -> np.ndarray:
+        return reconstruct_rows(self._memtable, rows)
+
+    def _memtable_row(self, idx: int) -> dict | None:
+        if 0 <= idx < len(self._memtable_metadata):
+            return self._memtable_metadata[idx]
+        return None
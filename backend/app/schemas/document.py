@@ -1,7 +1,25 @@
 from pydantic import BaseModel
+from typing import Optional, List
 
 
 class DocumentResponse(BaseModel):
     document_id: str 
     title: str
     status: str
+    queue_position: Optional[int] = None
+    tags: List[str] = []
+    # True when the upload matched a document already ingested or queued
+    duplicate: bool = False
+
+
+class DocumentDeleteResponse(BaseModel):
+    document_id: str
+    status: str
+    deleted_chunks: int
+
+
+class DocumentStatusResponse(BaseModel):
+    document_id: str
+    status: str
+    queue_position: Optional[int] = None
+    error: Optional[str] = None
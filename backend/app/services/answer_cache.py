@@ -0,0 +1,156 @@
+import time
+from collections import OrderedDict
+import faiss
+import numpy as np
+from app.agents.orchestrator import MIN_QUALITY_THRESHOLD
+from app.agents.verifier import is_fallback_answer
+from app.core.config import settings
+from app.rag.embeddings import EmbeddingService
+from app.rag.vectorstore import VectorStore
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("answer-cache")
+
+# Nearest cached questions checked per lookup
+LOOKUP_CANDIDATES = 4
+
+
+class _CachedAnswer:
+    def __init__(self, question: str, response: dict, document_ids: set[str], generation: int):
+        self.question = question
+        self.response = response
+        self.document_ids = document_ids
+        self.generation = generation
+        self.created_at = time.time()
+
+
+class SemanticAnswerCache:
+    """
+    Answers to previous questions, looked up by question-embedding similarity.
+
+    Question embeddings are L2-normalised and kept in a small
+    ``IndexIDMap2(IndexFlatIP)``, so inner product is cosine similarity. A
+    cached answer is returned when a prior question is at least
+    ``similarity_threshold`` similar, younger than ``ttl_seconds``, and none
+    of the documents its contexts came from have changed in the vector store
+    since it was computed. At most ``max_entries`` answers are kept, evicting
+    the least recently used.
+
+    Used from the event loop only, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        vector_store: VectorStore,
+        max_entries: int = None,
+        ttl_seconds: float = None,
+        similarity_threshold: float = None
+    ):
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.max_entries = max(1, max_entries or settings.ANSWER_CACHE_MAX_ENTRIES)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ANSWER_CACHE_TTL_SECONDS
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+        )
+
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector_store.dim))
+        # Least recently used first
+        self._entries: OrderedDict[int, _CachedAnswer] = OrderedDict()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Vector store generation; capture it before computing an answer to store"""
+        return self.vector_store.generation
+
+    async def embed(self, question: str) -> np.ndarray:
+        """Normalised question embedding, shaped (1, dim) for FAISS"""
+        vector = np.array([await self.embedding_service.embed_query(question)], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(self, question_vector: np.ndarray) -> dict | None:
+        """Return the cached response for the most similar valid question, if any"""
+        if self._index.ntotal > 0:
+            similarities, ids = self._index.search(question_vector, min(LOOKUP_CANDIDATES, self._index.ntotal))
+            for similarity, entry_id in zip(similarities[0], ids[0]):
+                if entry_id < 0 or similarity < self.similarity_threshold:
+                    break
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if not self._is_valid(entry):
+                    self._remove(int(entry_id))
+                    self.invalidations += 1
+                    continue
+
+                self._entries.move_to_end(int(entry_id))
+                self.hits += 1
+                logger.log(
+                    "INFO",
+                    "answer_cache_hit",
+                    similarity=round(float(similarity), 4),
+                    cached_question=entry.question[:100],
+                    age_seconds=round(time.time() - entry.created_at, 1)
+                )
+                return dict(entry.response)
+
+        self.misses += 1
+        return None
+
+    def store(self, question: str, question_vector: np.ndarray, response: dict, generation: int):
+        """
+        Cache ``response`` for ``question``.
+
+        ``generation`` is the vector store generation observed before the
+        answer was computed, so documents changed while it ran invalidate it.
+        Answers without contexts are not cached: they would hide documents
+        uploaded later. Neither are refusals, error messages and answers
+        scoring below ``MIN_QUALITY_THRESHOLD``, which would otherwise be
+        repeated for every similar question until they expire.
+        """
+        contexts = response.get("contexts") or []
+        if not contexts:
+            return
+        quality_score = response.get("quality_score") or 0.0
+        if quality_score < MIN_QUALITY_THRESHOLD or is_fallback_answer(response.get("answer")):
+            logger.log("INFO", "answer_cache_store_skipped", quality_score=quality_score, question=question[:100])
+            return
+
+        document_ids = {c.get("document_id") for c in contexts if c.get("document_id")}
+        while len(self._entries) >= self.max_entries:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self.evictions += 1
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(question_vector, np.array([entry_id], dtype="int64"))
+        self._entries[entry_id] = _CachedAnswer(question, dict(response), document_ids, generation)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+    def _is_valid(self, entry: _CachedAnswer) -> bool:
+        if self.ttl_seconds and time.time() - entry.created_at > self.ttl_seconds:
+            return False
+        return not self.vector_store.documents_changed_since(entry.document_ids, entry.generation)
+
+    def _remove(self, entry_id: int):
+        self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array([entry_id], dtype="int64"))
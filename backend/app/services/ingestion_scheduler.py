@@ -0,0 +1,472 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from app.core.config import settings
+from app.rag.embeddings import EmbeddingModel
+from app.rag.chunker import create_chunker
+from app.rag.extract import iter_document_chunks
+from app.rag.vectorstore import VectorStore
+from app.observability.logger import JsonLogger
+from app.observability.timing import measure_latency
+
+logger = JsonLogger("ingestion-scheduler")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_DELETED = "deleted"
+
+# Chunks encoded per embedding call
+EMBED_BATCH_SIZE = 512
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue is at capacity"""
+
+
+class DuplicateDocumentError(Exception):
+    """Raised when a file with the same content hash is already ingested or queued"""
+
+    def __init__(self, document_id: str):
+        super().__init__(f"Identical content already ingested as document {document_id}")
+        self.document_id = document_id
+
+
+class JobQueue:
+    """
+    Persistent ingestion job queue backed by SQLite.
+
+    Jobs survive restarts: anything still ``running`` when the process stopped
+    is put back to ``queued`` on startup. Each job records the SHA-256 of its
+    file so identical uploads can be mapped to the document already holding
+    that content.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    document_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "content_hash" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_content_hash ON jobs (content_hash)")
+
+    def recover(self) -> int:
+        """Requeue jobs interrupted by a restart"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (STATUS_QUEUED, time.time(), STATUS_RUNNING)
+            )
+            return cursor.rowcount
+
+    def pending_count(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+                (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchone()
+        return row[0]
+
+    def _find_document(self, content_hash: str, document_id: str | None = None) -> dict | None:
+        # Only a document's latest job counts, and only if it was not deleted or failed
+        row = self._conn.execute(
+            "SELECT document_id, status FROM jobs AS j WHERE content_hash = ? AND status IN (?, ?, ?) "
+            "AND (? IS NULL OR document_id = ?) "
+            "AND id = (SELECT MAX(id) FROM jobs WHERE document_id = j.document_id) "
+            "ORDER BY id DESC LIMIT 1",
+            (content_hash, STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, document_id, document_id)
+        ).fetchone()
+        return {"document_id": row[0], "status": row[1]} if row else None
+
+    def find_document(self, content_hash: str, document_id: str | None = None) -> dict | None:
+        """Live document (queued, running or done) whose latest job has ``content_hash``"""
+        with self._lock:
+            return self._find_document(content_hash, document_id)
+
+    def enqueue(
+        self,
+        document_id: str,
+        file_path: str,
+        max_size: int,
+        content_hash: str | None = None,
+        deduplicate: bool = False
+    ) -> tuple[int, int]:
+        """
+        Add a job if there is room; returns (job_id, queue_position).
+
+        With ``deduplicate``, raises ``DuplicateDocumentError`` if another live
+        document already has ``content_hash``; the check and the insert are
+        one transaction, so concurrent identical uploads cannot both pass.
+        """
+        with self._lock, self._conn:
+            if deduplicate and content_hash:
+                existing = self._find_document(content_hash)
+                if existing is not None and existing["document_id"] != document_id:
+                    raise DuplicateDocumentError(existing["document_id"])
+
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+                (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchone()[0]
+            if pending >= max_size:
+                raise QueueFullError(f"Ingestion queue is full ({pending}/{max_size} jobs)")
+
+            now = time.time()
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (document_id, file_path, status, created_at, updated_at, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (document_id, file_path, STATUS_QUEUED, now, now, content_hash)
+            )
+            queued_ahead = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND id < ?",
+                (STATUS_QUEUED, cursor.lastrowid)
+            ).fetchone()[0]
+        return cursor.lastrowid, queued_ahead + 1
+
+    def claim_next(self) -> dict | None:
+        """Mark the oldest queued job as running and return it"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, document_id, file_path FROM jobs WHERE status = ? ORDER BY id LIMIT 1",
+                (STATUS_QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (STATUS_RUNNING, time.time(), row[0])
+            )
+        return {"id": row[0], "document_id": row[1], "file_path": row[2]}
+
+    def finish(self, job_id: int, error: str | None = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (STATUS_FAILED if error else STATUS_DONE, error, time.time(), job_id)
+            )
+
+    def mark_deleted(self, document_id: str):
+        """Record that a document was deleted, so its status no longer reports the old job"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = "
+                "(SELECT id FROM jobs WHERE document_id = ? ORDER BY id DESC LIMIT 1)",
+                (STATUS_DELETED, time.time(), document_id)
+            )
+
+    def status(self, document_id: str) -> dict | None:
+        """Latest job for a document, with its position among queued jobs"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, error FROM jobs WHERE document_id = ? ORDER BY id DESC LIMIT 1",
+                (document_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            position = None
+            if row[1] == STATUS_QUEUED:
+                position = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND id <= ?",
+                    (STATUS_QUEUED, row[0])
+                ).fetchone()[0]
+        return {"document_id": document_id, "status": row[1], "error": row[2], "queue_position": position}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _ParsedJob:
+    """A document being streamed from the parse stage into the embedding stage"""
+
+    def __init__(self, job: dict):
+        self.job = job
+        self.total_chunks = 0
+        self.error: str | None = None
+
+
+class _ChunkBatch:
+    """Chunks of one document handed to the embedding stage; ``last`` closes the job"""
+
+    def __init__(self, parsed: _ParsedJob, chunks: list[dict], last: bool = False):
+        self.parsed = parsed
+        self.chunks = chunks
+        self.last = last
+        self.offset = 0
+
+
+class IngestionScheduler:
+    """
+    Bounded, persistent ingestion pipeline.
+
+    Stages:
+    1. ``INGESTION_WORKERS`` workers claim jobs from the persistent queue and
+       stream chunks as pages are extracted. Large PDFs are split into page
+       ranges parsed in parallel in a process pool (off the GIL).
+    2. A single embedding consumer packs chunks from one or more documents into
+       ``EMBED_BATCH_SIZE`` batches, encodes them with the shared model and adds
+       them to the shared vector store while later pages are still parsing.
+       A document's segment is committed once all its chunks are added.
+
+    ``submit()`` raises ``QueueFullError`` when ``INGESTION_QUEUE_MAX_SIZE``
+    jobs are pending, so callers can push back instead of spawning threads.
+    Every queue read and write (each commit fsyncs) runs in a worker thread so
+    uploads, status polls and job transitions never stall the event loop.
+
+    Chunks become searchable before their document finishes, so a job
+    interrupted by shutdown (and requeued by ``recover()``) or one that fails
+    leaves partial rows behind. Those are tombstoned before a job runs and
+    when it fails, so a document is never indexed twice or half.
+    """
+
+    def __init__(self, vector_store: VectorStore, embedding_model: EmbeddingModel):
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model
+        self.chunker = create_chunker(settings.CHUNK_STRATEGY, embedding_model)
+        self.queue = JobQueue(Path(settings.INGESTION_QUEUE_PATH))
+        self._job_available = asyncio.Event()
+        self._parsed: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._process_pool: ProcessPoolExecutor | None = None
+        # Lets parse threads blocked on a full queue give up during shutdown
+        self._stopping = threading.Event()
+
+    async def start(self):
+        requeued = await asyncio.to_thread(self.queue.recover)
+        self._stopping.clear()
+        # Spawn rather than fork: the parent holds FAISS/torch threads
+        self._process_pool = ProcessPoolExecutor(
+            max_workers=settings.INGESTION_PARSE_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        # Bounded (in chunk batches) so parse workers cannot run far ahead of embedding
+        self._parsed = asyncio.Queue(maxsize=max(2, settings.INGESTION_WORKERS * 2))
+        self._tasks = [
+            asyncio.create_task(self._parse_worker(i)) for i in range(settings.INGESTION_WORKERS)
+        ]
+        self._tasks.append(asyncio.create_task(self._embedding_consumer()))
+        self._job_available.set()
+
+        logger.log(
+            "INFO",
+            "ingestion_scheduler_started",
+            workers=settings.INGESTION_WORKERS,
+            parse_processes=settings.INGESTION_PARSE_PROCESSES,
+            chunk_strategy=self.chunker.name,
+            requeued_jobs=requeued
+        )
+
+    async def stop(self):
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        await asyncio.to_thread(self.queue.close)
+
+    async def has_capacity(self) -> bool:
+        return await asyncio.to_thread(self.queue.pending_count) < settings.INGESTION_QUEUE_MAX_SIZE
+
+    async def submit(
+        self,
+        document_id: str,
+        file_path: Path,
+        content_hash: str | None = None,
+        deduplicate: bool = False
+    ) -> int:
+        """
+        Persist a job and wake a worker; returns the queue position.
+
+        With ``deduplicate``, raises ``DuplicateDocumentError`` when another
+        live document already holds ``content_hash``.
+        """
+        job_id, position = await asyncio.to_thread(
+            self.queue.enqueue,
+            document_id,
+            str(file_path),
+            settings.INGESTION_QUEUE_MAX_SIZE,
+            content_hash=content_hash,
+            deduplicate=deduplicate
+        )
+        self._job_available.set()
+        logger.log("INFO", "ingestion_job_queued", job_id=job_id, document_id=document_id, queue_position=position)
+        return position
+
+    async def status(self, document_id: str) -> dict | None:
+        return await asyncio.to_thread(self.queue.status, document_id)
+
+    async def find_document(self, content_hash: str, document_id: str | None = None) -> dict | None:
+        return await asyncio.to_thread(self.queue.find_document, content_hash, document_id)
+
+    async def is_active(self, document_id: str) -> bool:
+        """Whether the document is queued or being ingested"""
+        job_status = await self.status(document_id)
+        return job_status is not None and job_status["status"] in (STATUS_QUEUED, STATUS_RUNNING)
+
+    async def mark_deleted(self, document_id: str):
+        await asyncio.to_thread(self.queue.mark_deleted, document_id)
+
+    async def _parse_worker(self, worker_id: int):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # Clear before claiming so a submit() racing with an empty claim is not lost
+            self._job_available.clear()
+            job = await asyncio.to_thread(self.queue.claim_next)
+            if job is None:
+                await self._job_available.wait()
+                continue
+
+            logger.log("INFO", "ingestion_started", job_id=job["id"], document_id=job["document_id"], worker=worker_id)
+
+            parsed = _ParsedJob(job)
+            try:
+                # Drop rows a previous, interrupted run of this job already added; tags stay
+                await asyncio.to_thread(self.vector_store.delete_document, job["document_id"], True)
+                with measure_latency() as elapsed:
+                    await asyncio.to_thread(self._stream_chunks, parsed, loop)
+                logger.log(
+                    "INFO",
+                    "document_parsed",
+                    job_id=job["id"],
+                    document_id=job["document_id"],
+                    chunks=parsed.total_chunks,
+                    latency_ms=round(elapsed() * 1000, 2)
+                )
+            except Exception as e:
+                # The job is reported failed and its chunks already handed over are deleted
+                parsed.error = parsed.error or str(e)
+                await self._parsed.put(_ChunkBatch(parsed, [], last=True))
+
+    def _stream_chunks(self, parsed: _ParsedJob, loop: asyncio.AbstractEventLoop):
+        """Parse a document in a worker thread, handing chunks over in embedding-sized batches"""
+        job = parsed.job
+        batch: list[dict] = []
+        for chunk in iter_document_chunks(
+            Path(job["file_path"]),
+            job["document_id"],
+            self.chunker,
+            executor=self._process_pool,
+            workers=settings.INGESTION_PARSE_PROCESSES
+        ):
+            if parsed.error:
+                # The embedding stage already failed this document
+                break
+            batch.append(chunk)
+            parsed.total_chunks += 1
+            if len(batch) >= EMBED_BATCH_SIZE:
+                self._hand_over(_ChunkBatch(parsed, batch), loop)
+                batch = []
+
+        if parsed.total_chunks == 0 and not parsed.error:
+            raise ValueError(f"Document {job['file_path']} is empty or could not be loaded")
+        self._hand_over(_ChunkBatch(parsed, batch, last=True), loop)
+
+    def _hand_over(self, item: _ChunkBatch, loop: asyncio.AbstractEventLoop):
+        """Put ``item`` on the bounded embedding queue from a worker thread, blocking while it is full"""
+        future = asyncio.run_coroutine_threadsafe(self._parsed.put(item), loop)
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except TimeoutError:
+                if self._stopping.is_set():
+                    future.cancel()
+                    raise RuntimeError("Ingestion scheduler is stopping")
+
+    async def _embedding_consumer(self):
+        pending: deque[_ChunkBatch] = deque()
+
+        while True:
+            if not pending:
+                pending.append(await self._parsed.get())
+            while not self._parsed.empty():
+                pending.append(self._parsed.get_nowait())
+
+            # Pack chunks from as many documents as fit into one batch
+            batch: list[dict] = []
+            batch_jobs: list[_ParsedJob] = []
+            completed: list[_ParsedJob] = []
+            while pending and len(batch) < EMBED_BATCH_SIZE:
+                item = pending[0]
+                if item.parsed.error:
+                    # Skip the rest of a failed document
+                    take = []
+                    item.offset = len(item.chunks)
+                else:
+                    take = item.chunks[item.offset:item.offset + EMBED_BATCH_SIZE - len(batch)]
+                    item.offset += len(take)
+                if take:
+                    batch.extend(take)
+                    if item.parsed not in batch_jobs:
+                        batch_jobs.append(item.parsed)
+                if item.offset >= len(item.chunks):
+                    pending.popleft()
+                    if item.last:
+                        completed.append(item.parsed)
+
+            try:
+                if batch:
+                    embeddings = await asyncio.to_thread(
+                        self.embedding_model.embed,
+                        [chunk["content"] for chunk in batch]
+                    )
+                    await asyncio.to_thread(self.vector_store.add, embeddings, batch)
+            except Exception as e:
+                # Fail every document touched by the batch; their remaining chunks are skipped
+                for parsed in batch_jobs:
+                    parsed.error = str(e)
+
+            if any(not parsed.error for parsed in completed):
+                await asyncio.to_thread(self.vector_store.persist)
+            for parsed in completed:
+                if parsed.error:
+                    await self._fail(parsed.job, RuntimeError(parsed.error))
+                else:
+                    await asyncio.to_thread(self.queue.finish, parsed.job["id"])
+                    logger.log(
+                        "INFO",
+                        "ingestion_completed",
+                        job_id=parsed.job["id"],
+                        document_id=parsed.job["document_id"],
+                        total_chunks=parsed.total_chunks
+                    )
+
+    async def _fail(self, job: dict, error: Exception):
+        try:
+            # Partial chunks of a failed document must not stay searchable
+            await asyncio.to_thread(self.vector_store.delete_document, job["document_id"], True)
+        except Exception as e:
+            logger.log("ERROR", "failed_document_cleanup_failed", document_id=job["document_id"], error=str(e))
+        await asyncio.to_thread(self.queue.finish, job["id"], str(error))
+        logger.log(
+            "ERROR",
+            "ingestion_failed",
+            job_id=job["id"],
+            document_id=job["document_id"],
+            error=str(error),
+            error_type=type(error).__name__
+        )
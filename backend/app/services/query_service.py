@@ -1,10 +1,10 @@
 from app.agents.orchestrator import AgentOrchestrator
+from app.services.answer_cache import SemanticAnswerCache
 from app.observability.logger import JsonLogger
 from app.schemas.query import QueryResponse
 from typing import Callable, Optional
 import asyncio
 
-orchestrator = AgentOrchestrator()
 logger = JsonLogger("query-service")
 
 # Query timeout in seconds (5 minutes)
@@ -12,13 +12,24 @@ QUERY_TIMEOUT = 1000
 
 
 class QueryService:
-    """Service for processing user queries through the agent workflow"""
+    """
+    Service for processing user queries through the agent workflow.
+
+    When an ``answer_cache`` is given, questions semantically close to a
+    recently answered one are served from it without running the agents.
+    """
+
+    def __init__(self, orchestrator: AgentOrchestrator, answer_cache: SemanticAnswerCache | None = None):
+        self.orchestrator = orchestrator
+        self.answer_cache = answer_cache
 
     async def process_query(
         self, 
         question: str, 
         trace_id: str | None = None,
-        progress_callback: Optional[Callable[[str, str, dict], None]] = None
+        progress_callback: Optional[Callable[[str, str, dict], None]] = None,
+        token_callback: Optional[Callable[[str, dict], None]] = None,
+        filters: dict | None = None
     ) -> QueryResponse:
         """
         Process a query through the multi-agent workflow.
@@ -27,6 +38,9 @@ class QueryService:
             question: User's question
             trace_id: Optional trace ID for request tracking
             progress_callback: Optional callback for progress updates (stage, message, data)
+            token_callback: Optional callback for streamed answer fragments (fragment, data)
+            filters: Optional metadata filter restricting retrieval; filtered
+                queries bypass the answer cache
         
         Returns:
             QueryResponse with answer, contexts, and confidence
@@ -42,15 +56,46 @@ class QueryService:
             question_length=len(question)
         )
 
+        cache_vector = None
+        generation = None
+        if self.answer_cache and not filters:
+            try:
+                generation = self.answer_cache.generation
+                cache_vector = await self.answer_cache.embed(question)
+                cached = self.answer_cache.lookup(cache_vector)
+            except Exception as e:
+                logger.log("ERROR", "answer_cache_lookup_failed", trace_id=trace_id, error=str(e))
+                cache_vector = cached = None
+
+            if cached:
+                if progress_callback:
+                    progress_callback("cached", "Found a recent answer to a similar question", {})
+                if token_callback:
+                    token_callback(cached["answer"], {"iteration": 1})
+                if progress_callback:
+                    progress_callback(
+                        "complete",
+                        "Answer ready!",
+                        {
+                            "confidence": cached.get("confidence"),
+                            "quality_score": cached.get("quality_score"),
+                            "contexts_count": len(cached.get("contexts") or [])
+                        }
+                    )
+                logger.log("INFO", "query_served_from_cache", trace_id=trace_id, **self.answer_cache.stats())
+                return QueryResponse(**cached)
+
         try:
             # Run orchestrator with timeout and progress callback
             result = await asyncio.wait_for(
-                orchestrator.run(question, trace_id, progress_callback),
+                self.orchestrator.run(question, trace_id, progress_callback, token_callback, filters),
                 timeout=QUERY_TIMEOUT
             )
 
             # Ensure result is properly formatted
             if isinstance(result, dict):
+                if cache_vector is not None:
+                    self.answer_cache.store(question, cache_vector, result, generation)
                 response = QueryResponse(**result)
             else:
                 response = result
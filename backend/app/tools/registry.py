@@ -1,8 +1,25 @@
+from app.tools.base import Tool
 from app.tools.retrieval import RetrievalTool
+from app.rag.vectorstore import VectorStore
+from app.rag.embeddings import EmbeddingService
+from app.rag.reranker import CrossEncoderReranker
+
+TOOLS: dict[str, Tool] = {}
+
+
+def register_tools(
+    vector_store: VectorStore,
+    embedding_service: EmbeddingService,
+    reranker: CrossEncoderReranker | None = None
+):
+    """Instantiate the agent tools against the shared application resources"""
+    TOOLS.clear()
+    TOOLS[RetrievalTool.name] = RetrievalTool(vector_store, embedding_service, reranker)
 
-TOOLS = {
-    RetrievalTool.name : RetrievalTool()
-}
 
 def get_tool(name: str):
-    return TOOLS.get(name)
\ No newline at end of file
+    return TOOLS.get(name)
+
+
+def list_tools() -> list[Tool]:
+    return list(TOOLS.values())
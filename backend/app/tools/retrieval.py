@@ -1,39 +1,115 @@
 from app.tools.base import Tool
-from app.rag.embeddings import EmbeddingModel
+from app.rag.embeddings import EmbeddingService
 from app.rag.vectorstore import VectorStore
+from app.rag.reranker import CrossEncoderReranker
 from app.core.config import settings
 from app.observability.logger import JsonLogger
 
 logger = JsonLogger("retrieval-tool")
 
-embedding_model = EmbeddingModel(model_name=settings.EMBEDDING_MODEL)
-vector_store = VectorStore(dim=settings.EMBEDDING_DIM)
+
+def reciprocal_rank_fusion(rankings: list[list[dict]], k: int, rrf_k: int = None) -> list[dict]:
+    """
+    Fuse ranked result lists by summing 1 / (rrf_k + rank) per chunk.
+
+    Chunks are identified by (document_id, chunk_index); the first list a
+    chunk appears in supplies its metadata.
+    """
+    rrf_k = rrf_k or settings.RRF_K
+    scores: dict[tuple, float] = {}
+    results: dict[tuple, dict] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            key = (result.get("document_id"), result.get("chunk_index"))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            results.setdefault(key, result)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [results[key] for key in ranked[:k]]
 
 
 class RetrievalTool(Tool):
-    """Tool for retrieving relevant document chunks from the vector store"""
+    """
+    Tool for retrieving relevant document chunks from the vector store.
+
+    With ``HYBRID_SEARCH_ENABLED`` the dense (FAISS) and sparse (BM25)
+    searches run concurrently for ``HYBRID_CANDIDATES`` each and are fused
+    with reciprocal-rank fusion, so exact identifiers the embedding model
+    blurs still surface.
+
+    ``filters`` (``document_ids`` and/or ``tags``) restrict both searches to
+    the matching documents inside the index.
+
+    With a ``reranker``, ``RERANK_CANDIDATES`` results are fetched and the
+    cross-encoder keeps the best ``top_k`` (vector order past its budget).
+
+    Extra ``queries`` (expansions, rephrasings) are embedded in one batch and
+    searched with a single batched FAISS call; every per-query ranking is
+    fused with reciprocal-rank fusion.
+
+    Results carry their cosine similarity to the query as ``score``. Chunks
+    scoring below ``RETRIEVAL_MIN_SCORE`` are dropped, so a question the
+    corpus does not cover retrieves nothing instead of the least bad chunks.
+    """
     
     name = "retrieve_documents"
     description = "Search relevant documents from vector store"
     input_schema = {
         "query": "string",
-        "top_k": "integer"
+        "queries": "array",
+        "top_k": "integer",
+        "filters": "object"
     }
 
-    async def run(self, query: str, top_k: int = None):
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        embedding_service: EmbeddingService,
+        reranker: CrossEncoderReranker | None = None
+    ):
+        # Shared resources owned by the application lifespan
+        self.vector_store = vector_store
+        self.embedding_service = embedding_service
+        self.reranker = reranker
+
+    def _sparse_search_all(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]],
+        k: int,
+        document_ids: set[str] | None
+    ) -> list[list[dict]]:
+        # Each query's embedding scores its keyword hits from the stored vectors
+        return [
+            self.vector_store.sparse_search(text, k=k, document_ids=document_ids, vector=embedding)
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+    async def run(
+        self,
+        query: str = None,
+        top_k: int = None,
+        filters: dict | None = None,
+        queries: list[str] | None = None
+    ):
         """
         Retrieve relevant document chunks.
         
         Args:
             query: Search query string
             top_k: Number of results to return (defaults to config value)
+            filters: Optional ``{"document_ids": [...], "tags": [...]}`` restriction
+            queries: Optional additional query strings searched together with ``query``
         
         Returns:
             List of context dictionaries with 'content' and metadata
         """
-        if not query or not query.strip():
+        if isinstance(queries, str):
+            queries = [queries]
+        texts = list(dict.fromkeys(q.strip() for q in [query, *(queries or [])] if isinstance(q, str) and q.strip()))
+        if not texts:
             logger.log("WARN", "empty_query")
             return []
+        query = texts[0]
         
         top_k = top_k or settings.RETRIEVAL_TOP_K
         
@@ -41,24 +117,56 @@ class RetrievalTool(Tool):
             "INFO",
             "retrieval_started",
             query=query[:100],  # Log first 100 chars
-            top_k=top_k
+            queries_count=len(texts),
+            top_k=top_k,
+            filtered=bool(filters)
         )
 
         try:
-            # Generate embedding for query (this is CPU-bound, run in thread)
+            # Generate embeddings in one batch (a single query is micro-batched with concurrent requests)
             import asyncio
-            embedding = await asyncio.to_thread(
-                embedding_model.embed,
-                [query.strip()]
-            )
-            embedding = embedding[0]
-            
-            # Search vector store (also CPU-bound)
-            results = await asyncio.to_thread(
-                vector_store.search,
-                embedding,
-                k=top_k
-            )
+            embeddings = await self.embedding_service.embed_queries(texts)
+            document_ids = self.vector_store.resolve_filters(filters)
+            if document_ids is not None and not document_ids:
+                logger.log("INFO", "retrieval_filter_matched_nothing", filters=filters)
+                return []
+
+            # Over-fetch for the reranker, which keeps the best top_k
+            fetch_k = max(top_k, settings.RERANK_CANDIDATES) if self.reranker else top_k
+            # Cosines are >= -1, so -1 (or lower) keeps everything
+            min_score = settings.RETRIEVAL_MIN_SCORE if settings.RETRIEVAL_MIN_SCORE > -1 else None
+
+            # Search vector store (also CPU-bound); one batched FAISS call for all queries
+            if settings.HYBRID_SEARCH_ENABLED:
+                candidates = max(fetch_k, settings.HYBRID_CANDIDATES)
+                dense, sparse = await asyncio.gather(
+                    asyncio.to_thread(
+                        self.vector_store.search_batch,
+                        embeddings,
+                        k=candidates,
+                        document_ids=document_ids,
+                        min_score=min_score
+                    ),
+                    asyncio.to_thread(self._sparse_search_all, texts, embeddings, candidates, document_ids)
+                )
+                if min_score is not None:
+                    # Dense hits were cut inside the search; cut keyword hits before fusion truncates
+                    sparse = [[r for r in ranking if r["score"] >= min_score] for ranking in sparse]
+                rankings = dense + sparse
+            else:
+                rankings = await asyncio.to_thread(
+                    self.vector_store.search_batch,
+                    embeddings,
+                    k=fetch_k,
+                    document_ids=document_ids,
+                    min_score=min_score
+                )
+            results = rankings[0][:fetch_k] if len(rankings) == 1 else reciprocal_rank_fusion(rankings, fetch_k)
+            if min_score is not None and not results:
+                logger.log("INFO", "retrieval_below_min_score", query=query[:100], min_score=min_score)
+
+            if self.reranker:
+                results = await self.reranker.rerank(query, results, top_k)
             
             # Normalize results to ensure 'content' key exists
             normalized_results = []
@@ -69,7 +177,10 @@ class RetrievalTool(Tool):
                     "content": content,
                     "document_id": result.get("document_id"),
                     "chunk_index": result.get("chunk_index"),
-                    "file_path": result.get("file_path")
+                    "file_path": result.get("file_path"),
+                    "page": result.get("page"),
+                    "score": result.get("score"),
+                    "rerank_score": result.get("rerank_score")
                 })
 
             logger.log(
@@ -0,0 +1,104 @@
+"""
+Measure chunking throughput for each chunk strategy.
+
+Usage (from ``backend/``; benchmarks are not part of the image):
+    python -m benchmarks.chunker_benchmark [--file path/to/doc.txt] [--size-mb 20]
+
+Without ``--file`` a synthetic markdown corpus (headings, paragraphs and
+sentences of varying length) is generated. Text is fed to the chunkers in
+``TEXT_READ_SIZE`` pieces, the same way ingestion reads files. The ``token``
+strategy loads the embedding model to use its tokenizer.
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from app.rag.chunker import CHUNK_STRATEGIES, create_chunker
+from app.rag.loader import TEXT_READ_SIZE
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("chunker-benchmark")
+
+WORDS = (
+    "retrieval index vector segment query model embedding document chunk token "
+    "latency batch memory throughput cache search result answer context page"
+).split()
+
+
+def synthetic_corpus(size_chars: int, seed: int = 0) -> str:
+    """Markdown-like text with headings, paragraphs and sentences"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_chars:
+        if rng.random() < 0.05:
+            part = f"\n{'#' * rng.randint(1, 3)} {' '.join(rng.choices(WORDS, k=4)).title()}\n\n"
+        else:
+            sentences = [
+                " ".join(rng.choices(WORDS, k=rng.randint(5, 30))).capitalize() + rng.choice(".!?")
+                for _ in range(rng.randint(1, 8))
+            ]
+            part = " ".join(sentences) + "\n\n"
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def benchmark(text: str, strategies: list[str], embedding_model=None) -> list[dict]:
+    pieces = [text[i:i + TEXT_READ_SIZE] for i in range(0, len(text), TEXT_READ_SIZE)]
+    results = []
+    for strategy in strategies:
+        chunker = create_chunker(strategy, embedding_model)
+        start = time.perf_counter()
+        chunks = 0
+        chars = 0
+        for chunk in chunker.chunk(pieces):
+            chunks += 1
+            chars += len(chunk)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "strategy": strategy,
+            "chunks": chunks,
+            "avg_chunk_chars": round(chars / max(chunks, 1), 1),
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(chunks / elapsed, 1),
+            "mb_per_sec": round(len(text) / elapsed / 1e6, 2)
+        })
+        logger.log("INFO", "chunker_benchmarked", **results[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chunks/sec for each chunk strategy")
+    parser.add_argument("--file", type=Path, help="Text or markdown file to chunk")
+    parser.add_argument("--size-mb", type=float, default=20.0, help="Size of the synthetic corpus")
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        choices=CHUNK_STRATEGIES,
+        default=list(CHUNK_STRATEGIES)
+    )
+    args = parser.parse_args()
+
+    if args.file:
+        text = args.file.read_text(encoding="utf-8")
+    else:
+        text = synthetic_corpus(int(args.size_mb * 1e6))
+
+    embedding_model = None
+    if "token" in args.strategies:
+        from app.rag.embeddings import EmbeddingModel
+        embedding_model = EmbeddingModel()
+
+    results = benchmark(text, args.strategies, embedding_model)
+
+    print(f"{'strategy':<10} {'chunks':>9} {'avg chars':>10} {'seconds':>9} {'chunks/s':>11} {'MB/s':>7}")
+    for r in results:
+        print(
+            f"{r['strategy']:<10} {r['chunks']:>9} {r['avg_chunk_chars']:>10} "
+            f"{r['seconds']:>9} {r['chunks_per_sec']:>11} {r['mb_per_sec']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Measure the prompt tokens Ollama has to prefill per query.
+
+Usage (from ``backend/``; benchmarks are not part of the image):
+    python -m benchmarks.prompt_cache_benchmark [--queries 20] [--slots 1]
+
+Runs the planner (LLM mode), verifier and LLM judge for each query against a
+local stand-in for Ollama's ``/api/generate``. Like Ollama, the stand-in keeps
+the tokens last evaluated on each of ``--slots`` slots (``OLLAMA_NUM_PARALLEL``),
+reuses the longest prefix any slot shares with a new prompt (copying it to the
+least recently used slot rather than overwriting a longer cached prompt) and
+only counts the tokens after that prefix in ``prompt_eval_count``; a request continuing a
+``context`` only prefills its own prompt. Three setups are compared:
+
+- ``no_reuse``: every prompt is prefilled in full (model unloaded between calls)
+- ``prefix``: stable prompt prefixes kept warm by ``keep_alive``
+- ``prefix+context``: as above, and the judge continues the verifier's context
+
+Tokens are approximated by words and punctuation, so the numbers compare the
+setups with each other rather than predict a real model's counts.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.agents.evaluator import EvaluatorAgent
+from app.agents.planner import PlannerAgent
+from app.agents.verifier import VerifierAgent
+from app.core.config import settings
+from app.llm.client import LLMClient
+from app.observability.logger import JsonLogger
+
+logger = JsonLogger("prompt-cache-benchmark")
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+WORDS = (
+    "retrieval index vector segment query model embedding document chunk token "
+    "latency batch memory throughput cache search result answer context page"
+).split()
+
+
+class StandInOllama:
+    """Minimal ``/api/generate`` that accounts prompt tokens the way Ollama's KV cache does"""
+
+    def __init__(self, slots: int = 1, reuse: bool = True):
+        self.slots: list[list[int]] = [[] for _ in range(max(1, slots))]
+        self.last_used = [0] * len(self.slots)
+        self.requests = 0
+        self.reuse = reuse
+        self.vocabulary: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def encode(self, text: str) -> list[int]:
+        return [self.vocabulary.setdefault(token, len(self.vocabulary)) for token in TOKEN.findall(text)]
+
+    def generate(self, request: dict) -> dict:
+        prompt = request.get("prompt", "")
+        if "Role: planner" in prompt:
+            question = prompt.rsplit("Question:", 1)[-1].split("\n")[0].strip()
+            response = json.dumps({"tool": "retrieve_documents", "arguments": {"query": question, "top_k": 5}})
+        elif "Role: answer quality evaluator" in prompt:
+            response = json.dumps({"quality_score": 0.8, "needs_refinement": False, "feedback": "Grounded answer"})
+        else:
+            response = "According to the context, the " + " ".join(random.choices(WORDS, k=40)) + "."
+
+        with self.lock:
+            tokens = list(request.get("context") or []) + self.encode(prompt)
+            cached = 0
+            slot = 0
+            if self.reuse:
+                # Take the slot sharing the longest prefix with this prompt
+                for i, previous in enumerate(self.slots):
+                    shared = 0
+                    for a, b in zip(previous, tokens):
+                        if a != b:
+                            break
+                        shared += 1
+                    if shared > cached:
+                        cached, slot = shared, i
+                if cached < len(self.slots[slot]) and len(self.slots) > 1:
+                    # Keep the longer cached prompt; the shared prefix is copied to the least recently used slot
+                    slot = min(range(len(self.slots)), key=lambda i: self.last_used[i])
+            context = tokens + self.encode(response)
+            self.slots[slot] = context if self.reuse else []
+            self.requests += 1
+            self.last_used[slot] = self.requests
+
+        # At least one token is always evaluated, as in llama.cpp
+        prompt_eval_count = max(1, len(tokens) - cached)
+        return {
+            "response": response,
+            "done": True,
+            "context": context,
+            "prompt_eval_count": prompt_eval_count,
+            "eval_count": len(self.encode(response))
+        }
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                body = json.dumps(stand_in.generate(request)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def synthetic_queries(count: int, contexts_per_query: int, seed: int = 0) -> list[tuple[str, list[dict]]]:
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        question = f"How does the {' '.join(rng.choices(WORDS, k=3))} affect {rng.choice(WORDS)} {i}?"
+        contexts = [
+            {"content": " ".join(rng.choices(WORDS, k=rng.randint(60, 110))) + ".", "document_id": f"doc-{j}"}
+            for j in range(contexts_per_query)
+        ]
+        queries.append((question, contexts))
+    return queries
+
+
+async def run_setup(name: str, queries: list, slots: int, reuse_prefix: bool, reuse_context: bool) -> dict:
+    stand_in = StandInOllama(slots=slots, reuse=reuse_prefix)
+    stand_in.start()
+    llm_client = LLMClient(base_url=stand_in.url, model="stand-in")
+    planner = PlannerAgent(llm_client, mode="llm")
+    verifier = VerifierAgent(llm_client)
+    evaluator = EvaluatorAgent(llm_client, embedding_service=None, mode="llm")
+    try:
+        for question, contexts in queries:
+            plan = await planner.plan(question)
+            llm_context = []
+            answer = await verifier.verify(
+                plan["arguments"]["query"],
+                contexts,
+                on_context=llm_context.extend if reuse_context else None
+            )
+            await evaluator.evaluate(question, answer, contexts, llm_context=llm_context or None)
+    finally:
+        await llm_client.close()
+        stand_in.stop()
+
+    result = {
+        "setup": name,
+        "queries": len(queries),
+        "llm_calls": llm_client.usage["requests"],
+        "prefill_tokens_per_query": round(llm_client.usage["prompt_eval_tokens"] / max(len(queries), 1), 1)
+    }
+    logger.log("INFO", "prompt_cache_benchmarked", **result)
+    return result
+
+
+async def benchmark(queries: list, slots: int) -> list[dict]:
+    results = [
+        await run_setup("no_reuse", queries, slots, reuse_prefix=False, reuse_context=False),
+        await run_setup("prefix", queries, slots, reuse_prefix=True, reuse_context=False),
+        await run_setup("prefix+context", queries, slots, reuse_prefix=True, reuse_context=True),
+    ]
+    baseline = results[0]["prefill_tokens_per_query"]
+    for result in results:
+        saved = baseline - result["prefill_tokens_per_query"]
+        result["saved_per_query"] = round(saved, 1)
+        result["saved_pct"] = round(100 * saved / baseline, 1) if baseline else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prefill tokens per query with and without KV-cache reuse")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--contexts", type=int, default=settings.RETRIEVAL_TOP_K, help="Context chunks per query")
+    parser.add_argument("--slots", type=int, default=1, help="Parallel slots of the stand-in (OLLAMA_NUM_PARALLEL)")
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(synthetic_queries(args.queries, args.contexts), args.slots))
+
+    print(f"{'setup':<16} {'llm calls':>9} {'prefill/query':>14} {'saved/query':>12} {'saved':>7}")
+    for r in results:
+        print(
+            f"{r['setup']:<16} {r['llm_calls']:>9} {r['prefill_tokens_per_query']:>14} "
+            f"{r['saved_per_query']:>12} {r['saved_pct']:>6}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
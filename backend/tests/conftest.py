@@ -0,0 +1,23 @@
+import pytest
+from app.core.config import settings
+from app.rag import vectorstore
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    """Point the vector store at a fresh directory"""
+    monkeypatch.setattr(vectorstore, "STORE_PATH", tmp_path / "vectorstore")
+    monkeypatch.setattr(vectorstore, "SEGMENTS_PATH", tmp_path / "vectorstore" / "segments")
+    monkeypatch.setattr(vectorstore, "TAGS_PATH", tmp_path / "vectorstore" / "document_tags.json")
+    monkeypatch.setattr(vectorstore, "LEGACY_INDEX_PATH", tmp_path / "vectorstore" / "index.faiss")
+    monkeypatch.setattr(vectorstore, "LEGACY_CHUNKS_PATH", tmp_path / "vectorstore" / "chunks")
+    monkeypatch.setattr(vectorstore, "LEGACY_META_PATH", tmp_path / "vectorstore" / "meta.pkl")
+    return tmp_path / "vectorstore"
+
+
+@pytest.fixture
+def small_ivf(monkeypatch):
+    """IVF settings small enough to train on a few thousand vectors, probing every list"""
+    monkeypatch.setattr(settings, "IVF_NLIST", 16)
+    monkeypatch.setattr(settings, "IVF_NPROBE", 16)
+    monkeypatch.setattr(settings, "IVF_TRAIN_MIN_VECTORS", 256)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from app.agents.verifier import ERROR_ANSWER, NO_CONTEXT_ANSWER
+from app.rag.vectorstore import VectorStore
+from app.services.answer_cache import SemanticAnswerCache
+
+DIM = 8
+CONTEXTS = [{"document_id": "doc", "chunk_index": 0, "content": "The pump runs at 40 bar."}]
+
+
+@pytest.fixture
+def cache(store_path):
+    return SemanticAnswerCache(None, VectorStore(DIM), max_entries=8, ttl_seconds=3600, similarity_threshold=0.9)
+
+
+def _question_vector() -> np.ndarray:
+    vector = np.ones((1, DIM), dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def _response(answer: str, quality_score: float) -> dict:
+    return {"answer": answer, "contexts": CONTEXTS, "confidence": quality_score, "quality_score": quality_score}
+
+
+def test_good_answer_is_cached(cache):
+    cache.store("pressure?", _question_vector(), _response("It runs at 40 bar.", 0.9), cache.generation)
+    assert cache.lookup(_question_vector())["answer"] == "It runs at 40 bar."
+
+
+@pytest.mark.parametrize("response", [
+    _response(ERROR_ANSWER, 0.29),
+    _response(NO_CONTEXT_ANSWER, 0.9),
+    _response("I don't have enough information in the provided documents to answer this question.", 0.8),
+    _response("Maybe 40 bar.", 0.3),
+    {"answer": "It runs at 40 bar.", "contexts": CONTEXTS},
+])
+def test_fallback_and_low_quality_answers_are_not_cached(cache, response):
+    cache.store("pressure?", _question_vector(), response, cache.generation)
+    assert cache.stats()["entries"] == 0
+    assert cache.lookup(_question_vector()) is None
@@ -0,0 +1,177 @@
+import random
+import re
+import pytest
+from app.core.config import settings
+from app.rag.chunker import (
+    FixedSizeChunker,
+    MarkdownChunker,
+    SentenceChunker,
+    TokenChunker,
+    chunk_pages,
+    chunk_stream,
+    chunk_text,
+    create_chunker,
+)
+
+
+def baseline_chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> list[str]:
+    """The original whole-string chunk_text, kept as the reference for the streaming chunker"""
+    if not text or not text.strip():
+        return []
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunk = text[start:min(start + chunk_size, len(text))].strip()
+        if chunk:
+            chunks.append(chunk)
+        start += chunk_size - overlap
+    return chunks
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    alphabet = "abcdefgh      \n\n.,"
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def random_pieces(rng: random.Random, text: str) -> list[str]:
+    """Split ``text`` at random points, including empty pieces"""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 12)))
+    return [text[start:end] for start, end in zip([0, *cuts], [*cuts, len(text)])]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_chunk_stream_matches_the_original_chunk_text(seed):
+    rng = random.Random(seed)
+    chunk_size = rng.randint(1, 60)
+    overlap = rng.randint(0, chunk_size - 1)
+    text = random_text(rng, rng.randint(0, 400))
+
+    expected = baseline_chunk_text(text, chunk_size, overlap)
+    assert list(chunk_stream(random_pieces(rng, text), chunk_size, overlap)) == expected
+    assert list(chunk_text(text, chunk_size, overlap)) == expected
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_chunk_pages_matches_chunking_the_joined_pages(seed):
+    rng = random.Random(seed)
+    pages = [(number, random_text(rng, rng.randint(0, 150))) for number in range(1, rng.randint(1, 6) + 1)]
+    joined = "".join(text + "\n" for _, text in pages).lstrip()
+
+    chunks = list(chunk_pages(pages, chunk_size=40, overlap=10))
+    assert [chunk for chunk, _ in chunks] == baseline_chunk_text(joined, 40, 10)
+
+    # Each chunk is attributed to the page its window starts on
+    page_of = []
+    for number, text in pages:
+        page_of.extend([number] * len(text + "\n"))
+    page_of = page_of[len(page_of) - len(joined):]
+    starts = range(0, len(joined), 30)
+    expected_pages = [page_of[start] for start in starts if joined[start:start + 40].strip()]
+    assert [page for _, page in chunks] == expected_pages
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(0, 0), (10, 10), (10, -1)])
+def test_invalid_sizes_are_rejected(chunk_size, overlap):
+    with pytest.raises(ValueError):
+        list(chunk_stream(["text"], chunk_size, overlap))
+
+
+SENTENCES = [
+    "The pump runs at 40 bar.",
+    "Check the valve yearly!",
+    "Is the seal worn?",
+    "Replace it (see page 4).",
+    "Warranty: two years.",
+]
+
+
+def random_markdown(rng: random.Random, sections: int = 6) -> str:
+    parts = []
+    for _ in range(sections):
+        parts.append(f"{'#' * rng.randint(1, 3)} Section {rng.randint(1, 99)}\n\n")
+        for _ in range(rng.randint(1, 4)):
+            parts.append(" ".join(rng.choices(SENTENCES, k=rng.randint(1, 5))) + "\n\n")
+    return "".join(parts)
+
+
+class WhitespaceTokenizer:
+    """Stand-in for a fast tokenizer: one token per run of non-space characters"""
+
+    def __call__(self, text, **kwargs):
+        return {"offset_mapping": [match.span() for match in re.finditer(r"\S+", text)]}
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("chunker_class", [SentenceChunker, MarkdownChunker])
+def test_sentence_chunks_are_bounded_and_independent_of_piece_splits(seed, chunker_class):
+    rng = random.Random(seed)
+    text = random_markdown(rng)
+    chunker = chunker_class(chunk_size=rng.randint(30, 120), overlap=rng.randint(0, 25))
+
+    chunks = list(chunker.chunk([text]))
+    assert chunks == list(chunker.chunk(random_pieces(rng, text)))
+    assert all(0 < len(chunk) <= chunker.chunk_size for chunk in chunks)
+    # Sentences fit in a chunk, so every chunk ends on a sentence or a heading line
+    assert all(chunk.endswith((".", "!", "?", ")")) or chunk.splitlines()[-1].startswith("#") for chunk in chunks)
+    # No text is lost
+    covered = "".join(chunks)
+    assert all(sentence in covered for sentence in SENTENCES if sentence in text)
+
+
+def test_sentences_carry_over_as_overlap():
+    chunker = SentenceChunker(chunk_size=50, overlap=25)
+    chunks = list(chunker.chunk_text(" ".join(SENTENCES)))
+    assert chunks[:2] == [
+        "The pump runs at 40 bar. Check the valve yearly!",
+        "Check the valve yearly! Is the seal worn?",
+    ]
+
+
+def test_long_sentences_are_split_at_chunk_size():
+    chunker = SentenceChunker(chunk_size=20, overlap=0)
+    assert list(chunker.chunk_text("a" * 45 + ".")) == ["a" * 20, "a" * 20, "a" * 5 + "."]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_markdown_chunks_stay_within_one_section(seed):
+    rng = random.Random(seed)
+    chunker = MarkdownChunker(chunk_size=rng.randint(40, 200), overlap=rng.randint(0, 30))
+    for chunk in chunker.chunk([random_markdown(rng)]):
+        # A heading may only open a chunk
+        assert re.search(r"\n#{1,3} ", chunk) is None
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_token_windows_respect_the_token_limit(seed):
+    rng = random.Random(seed)
+    text = random_markdown(rng)
+    max_tokens = rng.randint(2, 30)
+    chunker = TokenChunker(WhitespaceTokenizer(), max_tokens=max_tokens, overlap_tokens=rng.randint(0, max_tokens - 1))
+
+    windows = list(chunker.windows([text]))
+    assert windows == list(chunker.windows(random_pieces(rng, text)))
+    assert all(len(chunk.split()) <= max_tokens for chunk, _ in windows)
+    # Windows start every max_tokens - overlap tokens and cover the whole text
+    tokens = text.split()
+    step = max_tokens - chunker.overlap_tokens
+    assert [chunk.split()[0] for chunk, _ in windows] == tokens[::step][:len(windows)]
+    assert windows[-1][0].split()[-1] == tokens[-1]
+    assert all(text[offset:offset + len(chunk)] == chunk for chunk, offset in windows)
+
+
+def test_create_chunker(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_TOKENS", 1000)
+
+    class Model:
+        tokenizer = WhitespaceTokenizer()
+        max_seq_length = 128
+
+    assert isinstance(create_chunker("fixed"), FixedSizeChunker)
+    assert type(create_chunker("sentence")) is SentenceChunker
+    assert isinstance(create_chunker("MARKDOWN"), MarkdownChunker)
+    # Token windows leave room for the special tokens the model adds
+    assert create_chunker("token", Model()).max_tokens == 126
+    with pytest.raises(ValueError):
+        create_chunker("token")
+    with pytest.raises(ValueError):
+        create_chunker("paragraph")
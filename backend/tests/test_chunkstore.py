@@ -0,0 +1,96 @@
+import numpy as np
+from app.rag.chunkstore import COLUMNS, TEXT_FILE, ChunkStore
+
+
+def _rows(document_id: str, count: int, start: int = 0) -> list[dict]:
+    return [
+        {
+            "document_id": document_id,
+            "file_path": f"/docs/{document_id}.pdf",
+            "chunk_index": start + i,
+            "content": f"{document_id} chunk {start + i} — Größe",
+            "page": start + i + 1,
+        }
+        for i in range(count)
+    ]
+
+
+def _column_file(store: ChunkStore, name: str):
+    return store.path / f"{name}.{COLUMNS[name][1:]}"
+
+
+def test_rows_are_readable_before_and_after_flush(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    rows = _rows("a", 2) + [{"document_id": "b", "file_path": "/docs/b.txt", "content": "plain", "page": None}]
+    store.append(rows)
+    assert store.get(2) == {**rows[2], "chunk_index": 0}
+
+    store.flush()
+    store.append(_rows("a", 1, start=2))
+    reopened_before_flush = ChunkStore(tmp_path / "chunks")
+    assert len(store) == 4 and len(reopened_before_flush) == 3
+
+    store.flush()
+    reopened = ChunkStore(tmp_path / "chunks")
+    assert [reopened.get(i) for i in range(4)] == [store.get(i) for i in range(4)]
+    assert reopened.get(0) == rows[0]
+    assert reopened.get(4) is None and reopened.get(-1) is None
+
+
+def test_partially_appended_rows_are_trimmed_on_open(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    store.import_rows(_rows("a", 3))
+    text_size = (store.path / TEXT_FILE).stat().st_size
+
+    # A crash after the text and the first column of a fourth row were appended
+    with open(store.path / TEXT_FILE, "ab") as f:
+        f.write(b"lost chunk")
+    with open(_column_file(store, "doc_ids"), "ab") as f:
+        f.write(np.asarray([0], dtype=COLUMNS["doc_ids"]).tobytes())
+
+    recovered = ChunkStore(tmp_path / "chunks")
+    assert len(recovered) == 3
+    assert (store.path / TEXT_FILE).stat().st_size == text_size
+    for name, dtype in COLUMNS.items():
+        assert _column_file(store, name).stat().st_size == 3 * np.dtype(dtype).itemsize
+
+    # The trimmed store keeps appending where the last complete row ended
+    recovered.import_rows(_rows("b", 1))
+    assert ChunkStore(tmp_path / "chunks").get(3)["content"] == "b chunk 0 — Größe"
+
+
+def test_rows_referencing_unwritten_interned_values_are_trimmed(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    store.import_rows(_rows("a", 2))
+
+    # Complete columns for a row whose new document id never reached documents.json
+    text_end = int(np.fromfile(_column_file(store, "text_end"), dtype=COLUMNS["text_end"])[-1])
+    extra = {"doc_ids": 1, "path_ids": 0, "chunk_index": 0, "text_end": text_end + 4, "page": -1}
+    with open(store.path / TEXT_FILE, "ab") as f:
+        f.write(b"lost")
+    for name, dtype in COLUMNS.items():
+        with open(_column_file(store, name), "ab") as f:
+            f.write(np.asarray([extra[name]], dtype=dtype).tobytes())
+
+    assert len(ChunkStore(tmp_path / "chunks")) == 2
+
+
+def test_row_ranges_follow_document_runs(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    store.import_rows(_rows("a", 3) + _rows("b", 2) + _rows("a", 1, start=3) + _rows("c", 2))
+
+    starts, ends = store.row_ranges({"a", "missing"})
+    assert list(zip(starts, ends)) == [(0, 3), (5, 6)]
+    starts, ends = store.row_ranges({"c"})
+    assert list(zip(starts, ends)) == [(6, 8)]
+    assert len(store.row_ranges({"missing"})[0]) == 0
+
+
+def test_missing_page_column_is_backfilled(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    store.import_rows(_rows("a", 2))
+    _column_file(store, "page").unlink()
+
+    reopened = ChunkStore(tmp_path / "chunks")
+    assert len(reopened) == 2
+    assert reopened.get(1)["page"] is None
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from app.rag.chunker import chunk_text
+from app.rag.context_packer import ContextPacker, _overlap, estimate_tokens
+
+TEXT = " ".join(f"Step {i}: tighten bolt {i} of the P-200 housing to {10 + i} Nm." for i in range(30))
+
+
+class FixedEmbeddings:
+    """Embeds texts containing a marker onto that marker's axis"""
+
+    markers = ("bolt", "valve", "seal")
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    async def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return [float(marker in text) for marker in self.markers] + [0.01]
+
+
+def chunks(document_id: str, text: str = TEXT, size: int = 200, overlap: int = 50) -> list[dict]:
+    return [
+        {"document_id": document_id, "chunk_index": index, "content": content}
+        for index, content in enumerate(chunk_text(text, size, overlap))
+    ]
+
+
+def pack(contexts: list[dict], **kwargs) -> list[dict]:
+    packer = ContextPacker(FixedEmbeddings(), **{"token_budget": 10_000, "similarity_threshold": 1.0, **kwargs})
+    return asyncio.run(packer.pack(contexts))
+
+
+def test_overlap():
+    shared = TEXT[:60]
+    assert _overlap("Intro. " + shared, shared + " Outro.") == len(shared)
+    assert _overlap(shared + shared, shared + shared + "!") == 2 * len(shared)
+    assert _overlap(shared, "Unrelated text") == 0
+    # Overlaps shorter than the probe are not detected
+    assert _overlap("abcdef", "defgh") == 0
+    assert _overlap("abc", "") == 0
+
+
+def test_consecutive_chunks_merge_back_into_the_source_text():
+    document = chunks("manual")
+    # Retrieval order is by relevance, not by position
+    packed = pack([document[3], document[1], document[2]])
+    assert len(packed) == 1
+    assert packed[0]["content"] == TEXT[150:650]
+    assert packed[0]["chunk_index"] == 1
+    assert packed[0]["chunk_count"] == 3
+
+
+def test_blocks_keep_relevance_order():
+    manual, guide = chunks("manual"), chunks("guide")
+    packed = pack([guide[5], manual[0], guide[7], manual[1], guide[6]])
+    assert [(c["document_id"], c["chunk_index"], c["chunk_count"]) for c in packed] == [
+        ("guide", 5, 3), ("manual", 0, 2)
+    ]
+
+
+def test_repeated_chunks_are_dropped():
+    document = chunks("manual")
+    # Older results carry their text under ``context``
+    legacy = {"document_id": "manual", "chunk_index": 4, "context": document[4]["content"]}
+    packed = pack([document[0], document[4], dict(document[0]), legacy])
+    assert [c["chunk_index"] for c in packed] == [0, 4]
+    assert all(c["chunk_count"] == 1 for c in packed)
+
+
+def test_near_duplicates_of_more_relevant_blocks_are_dropped():
+    contexts = [
+        {"document_id": "a", "chunk_index": 0, "content": "Replace the valve yearly."},
+        {"document_id": "b", "chunk_index": 0, "content": "The valve is replaced every year."},
+        {"document_id": "c", "chunk_index": 0, "content": "Check the seal monthly."},
+    ]
+    packed = pack(contexts, similarity_threshold=0.95)
+    assert [c["document_id"] for c in packed] == ["a", "c"]
+
+
+def test_embedding_failures_keep_every_block():
+    contexts = [
+        {"document_id": "a", "chunk_index": 0, "content": "Replace the valve yearly."},
+        {"document_id": "b", "chunk_index": 0, "content": "The valve is replaced every year."},
+    ]
+    packer = ContextPacker(FixedEmbeddings(fail=True), token_budget=10_000, similarity_threshold=0.95)
+    assert len(asyncio.run(packer.pack(contexts))) == 2
+
+
+def test_blocks_that_do_not_fit_the_budget_are_skipped():
+    contexts = [
+        {"document_id": "a", "chunk_index": 0, "content": "x" * 40},
+        {"document_id": "b", "chunk_index": 0, "content": "y" * 80},
+        {"document_id": "c", "chunk_index": 0, "content": "z" * 20},
+    ]
+    # 10 + 20 tokens overflow the budget of 16, so the smaller third block is packed instead
+    packed = pack(contexts, token_budget=16)
+    assert [c["document_id"] for c in packed] == ["a", "c"]
+    assert sum(estimate_tokens(c["content"]) for c in packed) <= 16
+
+
+def test_oversized_top_block_is_truncated():
+    packed = pack([{"document_id": "a", "chunk_index": 0, "content": "x" * 100}], token_budget=5)
+    assert packed[0]["content"] == "x" * 20
+
+
+@pytest.mark.parametrize("contexts", [None, [], [{"document_id": "a", "content": ""}]])
+def test_nothing_to_pack(contexts):
+    assert pack(contexts) == []
@@ -0,0 +1,115 @@
+import asyncio
+from pathlib import Path
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.routes import documents
+from app.auth import api_key, rate_limit
+from app.core.config import settings
+from app.services.ingestion_scheduler import QueueFullError
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_key, "VALID_API_KEYS", {"secret"})
+    monkeypatch.setattr(rate_limit, "_requests", {})
+    app = FastAPI()
+    app.include_router(documents.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-API-Key": "wrong"}])
+def test_delete_requires_an_api_key(client, headers):
+    assert client.delete("/documents/doc", headers=headers).status_code == 401
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-API-Key": "wrong"}])
+def test_replace_requires_an_api_key(client, headers):
+    response = client.put("/documents/doc", headers=headers, files={"file": ("a.txt", b"text")})
+    assert response.status_code == 401
+
+
+class FakeScheduler:
+    """Scheduler with one finished job per document that yields to the loop on every call"""
+
+    def __init__(self, queue_full: bool = False):
+        self.jobs = {"doc": {"document_id": "doc", "status": "done", "error": None, "queue_position": None}}
+        self.queue_full = queue_full
+
+    async def status(self, document_id):
+        await asyncio.sleep(0.01)
+        return self.jobs.get(document_id)
+
+    async def is_active(self, document_id):
+        job_status = await self.status(document_id)
+        return job_status is not None and job_status["status"] in ("queued", "running")
+
+    async def find_document(self, content_hash, document_id=None):
+        await asyncio.sleep(0.01)
+        return None
+
+    async def has_capacity(self):
+        return True
+
+    async def submit(self, document_id, file_path, content_hash=None, deduplicate=False):
+        await asyncio.sleep(0.01)
+        if self.queue_full:
+            raise QueueFullError("Ingestion queue is full (1/1 jobs)")
+        self.jobs[document_id] = {**self.jobs[document_id], "status": "queued", "queue_position": 1}
+        return 1
+
+    async def mark_deleted(self, document_id):
+        self.jobs[document_id] = {**self.jobs[document_id], "status": "deleted"}
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.deletes = 0
+
+    def delete_document(self, document_id, keep_tags=False):
+        self.deletes += 1
+        return 3
+
+    def document_tags(self, document_id):
+        return []
+
+
+@pytest.fixture
+def replace_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_key, "VALID_API_KEYS", {"secret"})
+    monkeypatch.setattr(rate_limit, "_requests", {})
+    monkeypatch.setattr(settings, "DOCUMENT_STORAGE_PATH", str(tmp_path / "documents"))
+    app = FastAPI()
+    app.include_router(documents.router)
+    app.state.vector_store = FakeVectorStore()
+    return app
+
+
+def _put(client: httpx.AsyncClient, content: bytes):
+    return client.put("/documents/doc", headers={"X-API-Key": "secret"}, files={"file": ("a.txt", content)})
+
+
+def test_concurrent_replaces_queue_one_job(replace_app):
+    replace_app.state.ingestion_scheduler = FakeScheduler()
+
+    async def run():
+        transport = httpx.ASGITransport(app=replace_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(_put(client, b"version 2"), _put(client, b"version 3"))
+
+    codes = sorted(response.status_code for response in asyncio.run(run()))
+    assert codes == [202, 409]
+    assert replace_app.state.vector_store.deletes == 1
+
+
+def test_replace_on_full_queue_removes_the_saved_file(replace_app):
+    replace_app.state.ingestion_scheduler = FakeScheduler(queue_full=True)
+
+    async def run():
+        transport = httpx.ASGITransport(app=replace_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await _put(client, b"version 2")
+
+    assert asyncio.run(run()).status_code == 429
+    assert not (Path(settings.DOCUMENT_STORAGE_PATH) / "doc").exists()
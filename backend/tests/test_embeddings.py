@@ -0,0 +1,53 @@
+import asyncio
+import hashlib
+import numpy as np
+import pytest
+from app.rag import embeddings
+from app.rag.embedding_cache import EmbeddingCache, content_hash
+from app.rag.embeddings import EmbeddingModel, EmbeddingService
+
+
+class HashEncoder:
+    """Stand-in for SentenceTransformer that derives vectors from the text hash"""
+
+    def __init__(self, model_name: str):
+        self.encoded: list[str] = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([
+            np.frombuffer(hashlib.sha256(text.encode()).digest(), dtype="uint8")[:8] / 255.0
+            for text in texts
+        ])
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "load_sentence_transformer", HashEncoder)
+    model = EmbeddingModel(model_name="hash", cache=EmbeddingCache(tmp_path / "embeddings.db"))
+    yield model
+    model.cache.close()
+
+
+def test_queries_are_cached_in_memory_only(model, tmp_path):
+    async def run():
+        service = EmbeddingService(model, max_wait_ms=0)
+        try:
+            await service.embed_query("what is the max pressure?")
+            await service.embed_queries(["rewrite one", "rewrite two"])
+            await service.embed_query("what is the max pressure?")
+        finally:
+            await service.stop()
+
+    asyncio.run(run())
+    # Repeated queries are served from memory without touching the disk tier
+    assert model.model.encoded.count("what is the max pressure?") == 1
+    assert model.cache.stats()["disk_bytes"] == 0
+
+    model.embed(["ingested chunk"])
+    assert model.cache.stats()["disk_bytes"] > 0
+
+    reopened = EmbeddingCache(tmp_path / "embeddings.db")
+    keys = [content_hash("hash", text) for text in ("ingested chunk", "what is the max pressure?")]
+    assert list(reopened.get_many(keys)) == keys[:1]
+    reopened.close()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from app.agents.evaluator import EvaluatorAgent
+from app.core.config import settings
+
+QUESTION = "What is the rated pressure of the P-200 pump?"
+CONTEXT = {"content": "The P-200 pump has a rated pressure of 40 bar and weighs 12 kg."}
+
+
+class FixedEmbeddings:
+    """Returns a preset vector per text, or a vector orthogonal to all of them"""
+
+    def __init__(self, vectors: dict[str, list[float]]):
+        self.vectors = vectors
+
+    async def embed_query(self, text: str) -> list[float]:
+        return self.vectors.get(text, [0.0, 0.0, 1.0])
+
+
+class FailingEmbeddings:
+    async def embed_query(self, text: str):
+        raise RuntimeError("model unavailable")
+
+
+class ScriptedLLM:
+    def __init__(self, quality_score: float = 0.9):
+        self.response = json.dumps({"quality_score": quality_score, "needs_refinement": False, "feedback": "judged"})
+        self.calls = 0
+
+    async def generate(self, prompt: str, context=None) -> str:
+        self.calls += 1
+        return self.response
+
+
+@pytest.fixture(autouse=True)
+def borderline(monkeypatch):
+    monkeypatch.setattr(settings, "EVALUATOR_BORDERLINE_LOW", 0.4)
+    monkeypatch.setattr(settings, "EVALUATOR_BORDERLINE_HIGH", 0.7)
+
+
+def local_score(answer: str, vectors: dict, contexts=(CONTEXT,), iteration: int = 0) -> dict:
+    agent = EvaluatorAgent(None, FixedEmbeddings(vectors), mode="local")
+    return asyncio.run(agent.local_evaluate(QUESTION, answer, list(contexts), iteration))
+
+
+def test_grounded_answer_scores_every_signal():
+    answer = "The P-200 pump is rated at 40 bar."
+    result = local_score(answer, {QUESTION: [1, 0, 0], answer: [1, 0, 0], CONTEXT["content"]: [1, 0, 0]})
+    assert result["quality_score"] == 1.0
+    assert not result["needs_refinement"]
+    assert result["feedback"] == "relevance 1.00, context support 1.00, grounding 1.00, keyword coverage 1.00"
+
+
+def test_partial_signals_are_weighted():
+    # Two of the answer's five content words are in the context, and the
+    # answer is unrelated to the question in embedding space
+    answer = "Pump pressure reaches dangerous levels."
+    result = local_score(answer, {QUESTION: [1, 0, 0], answer: [0, 1, 0], CONTEXT["content"]: [0, 1, 0]})
+    # relevance 0, support 1, grounding 2/5, keyword coverage 4/4
+    assert result["quality_score"] == pytest.approx(0.3 * 1 + 0.2 * 0.4 + 0.2 * 1)
+
+
+def test_answer_without_contexts_asks_for_refinement():
+    answer = "Unrelated words entirely."
+    result = local_score(answer, {QUESTION: [1, 0, 0], answer: [0, 1, 0]}, contexts=())
+    assert result["quality_score"] == 0.0
+    assert result["needs_refinement"]
+    assert result["suggested_query_improvement"] is None
+    # Refinement stops after two iterations
+    assert not local_score(answer, {QUESTION: [1, 0, 0], answer: [0, 1, 0]}, contexts=(), iteration=2)["needs_refinement"]
+
+
+@pytest.mark.parametrize("mode, answer_vector, llm_calls", [
+    ("auto", [1, 0, 0], 0),
+    ("auto", [0, 1, 0], 1),
+    ("local", [0, 1, 0], 0),
+    ("llm", [1, 0, 0], 1),
+])
+def test_only_borderline_scores_reach_the_llm(mode, answer_vector, llm_calls):
+    answer = "The P-200 pump is rated at 40 bar."
+    llm = ScriptedLLM()
+    embeddings = FixedEmbeddings({QUESTION: [1, 0, 0], answer: answer_vector, CONTEXT["content"]: [1, 0, 0]})
+    result = asyncio.run(EvaluatorAgent(llm, embeddings, mode=mode).evaluate(QUESTION, answer, [CONTEXT]))
+    assert llm.calls == llm_calls
+    assert (result["feedback"] == "judged") == bool(llm_calls)
+
+
+def test_local_failure_falls_back_to_the_llm():
+    llm = ScriptedLLM(0.8)
+    result = asyncio.run(EvaluatorAgent(llm, FailingEmbeddings(), mode="local").evaluate(QUESTION, "40 bar.", [CONTEXT]))
+    assert llm.calls == 1
+    assert result["quality_score"] == 0.8
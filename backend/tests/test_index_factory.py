@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from app.rag.index_factory import build_index, search_ranges
+from app.rag.vectorstore import VectorStore
+
+DIM = 16
+
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, DIM)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+@pytest.mark.parametrize("runs", [1, 3, 8, 40])
+def test_search_ranges_only_returns_selected_rows(index_type, runs, small_ivf):
+    vectors = _vectors(2000)
+    index = build_index(vectors, index_type)
+    starts = np.arange(runs, dtype="int64") * 50
+    ends = starts + 20
+    deleted = np.zeros(len(vectors), dtype=bool)
+    deleted[starts + 1] = True
+
+    selected = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+    live = selected[~deleted[selected]]
+    queries = vectors[live[:4]]
+
+    for mask in (None, deleted):
+        allowed = set((selected if mask is None else live).tolist())
+        distances, ids = search_ranges(index, queries, 10, starts, ends, deleted=mask)
+        assert ids.shape == (len(queries), 10)
+        # HNSW may pad with -1 when the filter leaves few rows reachable
+        assert set(ids.ravel().tolist()) - {-1} <= allowed
+        # Every query vector is selected, so it is its own nearest neighbour
+        assert ids[:, 0].tolist() == live[:4].tolist()
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "hnsw"])
+def test_filtered_search_over_many_documents(index_type, store_path, small_ivf):
+    store = VectorStore(DIM, index_type=index_type)
+    vectors = _vectors(40 * 25, seed=1)
+    for document in range(40):
+        rows = slice(document * 25, (document + 1) * 25)
+        store.add(
+            vectors[rows],
+            [{"document_id": f"doc-{document}", "chunk_index": i, "content": f"chunk {i}"} for i in range(25)]
+        )
+    store.persist()
+    assert store.segments[0].index_type == index_type
+
+    # Every other document: 20 separate row ranges in the segment
+    selected = {f"doc-{document}" for document in range(0, 40, 2)}
+    results = store.search_batch(vectors[[0, 50, 950]], k=10, document_ids=selected)
+
+    assert [len(r) for r in results] == [10, 10, 10]
+    for query_results in results:
+        assert {r["document_id"] for r in query_results} <= selected
+    assert results[0][0]["document_id"] == "doc-0"
+    assert results[1][0]["document_id"] == "doc-2"
+    assert results[2][0]["document_id"] == "doc-38"
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+import pytest
+from app.core.config import settings
+from app.rag.vectorstore import VectorStore
+from app.services import ingestion_scheduler
+from app.services.ingestion_scheduler import STATUS_DONE, STATUS_FAILED, IngestionScheduler, JobQueue
+
+DIM = 8
+
+
+class HashEmbeddingModel:
+    """Deterministic stand-in for EmbeddingModel; optionally fails from the ``fail_on``-th call"""
+
+    def __init__(self, fail_on: int | None = None):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        if self.fail_on is not None and self.calls >= self.fail_on:
+            raise RuntimeError("encoder crashed")
+        return [
+            np.frombuffer(hashlib.sha256(text.encode()).digest()[:DIM * 4], dtype="uint32").astype("float32").tolist()
+            for text in texts
+        ]
+
+
+@pytest.fixture
+def scheduler_settings(tmp_path, store_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_QUEUE_PATH", str(tmp_path / "queue.db"))
+    monkeypatch.setattr(settings, "INGESTION_WORKERS", 1)
+    monkeypatch.setattr(settings, "INGESTION_PARSE_PROCESSES", 1)
+    monkeypatch.setattr(settings, "CHUNK_STRATEGY", "fixed")
+    monkeypatch.setattr(ingestion_scheduler, "EMBED_BATCH_SIZE", 2)
+    document = tmp_path / "manual.txt"
+    document.write_text("\n\n".join(f"Section {i}. " + "The pump is serviced yearly. " * 20 for i in range(6)))
+    return document
+
+
+def _document_rows(store: VectorStore, document_id: str) -> list[int]:
+    results = store.search_batch(np.zeros((1, DIM), dtype="float32"), k=1000, document_ids={document_id})[0]
+    return sorted(r["chunk_index"] for r in results)
+
+
+async def _run_until(scheduler: IngestionScheduler, document_id: str, statuses: tuple) -> dict:
+    for _ in range(500):
+        job_status = await scheduler.status(document_id)
+        if job_status["status"] in statuses:
+            return job_status
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stuck in {job_status}")
+
+
+def test_recovered_job_replaces_partial_rows(scheduler_settings):
+    store = VectorStore(DIM)
+    model = HashEmbeddingModel()
+
+    # A previous process sealed two chunks of the document, then stopped mid-job
+    queue = JobQueue(Path(settings.INGESTION_QUEUE_PATH))
+    queue.enqueue("doc", str(scheduler_settings), max_size=10)
+    queue.claim_next()
+    queue.close()
+    store.add(model.embed(["partial 0", "partial 1"]), [
+        {"document_id": "doc", "chunk_index": 0, "content": "partial 0"},
+        {"document_id": "doc", "chunk_index": 1, "content": "partial 1"},
+    ])
+    store.persist()
+
+    async def run():
+        scheduler = IngestionScheduler(store, model)
+        await scheduler.start()
+        try:
+            return await _run_until(scheduler, "doc", (STATUS_DONE, STATUS_FAILED))
+        finally:
+            await scheduler.stop()
+
+    assert asyncio.run(run())["status"] == STATUS_DONE
+    rows = _document_rows(store, "doc")
+    assert rows == list(range(len(rows)))
+    assert len(rows) > 2
+
+
+def test_failed_job_leaves_no_rows(scheduler_settings):
+    store = VectorStore(DIM)
+    store.set_document_tags("doc", ["manual"])
+
+    async def run():
+        scheduler = IngestionScheduler(store, HashEmbeddingModel(fail_on=2))
+        await scheduler.start()
+        try:
+            await scheduler.submit("doc", scheduler_settings)
+            return await _run_until(scheduler, "doc", (STATUS_DONE, STATUS_FAILED))
+        finally:
+            await scheduler.stop()
+
+    job_status = asyncio.run(run())
+    assert job_status["status"] == STATUS_FAILED
+    assert "encoder crashed" in job_status["error"]
+    assert _document_rows(store, "doc") == []
+    assert store.document_tags("doc") == ["manual"]
+
+
+def test_queue_is_used_off_the_event_loop(scheduler_settings, monkeypatch):
+    threads = []
+    for name in ("recover", "enqueue", "claim_next", "finish", "status", "close"):
+        method = getattr(JobQueue, name)
+
+        def recorded(self, *args, _method=method, **kwargs):
+            threads.append(threading.current_thread())
+            return _method(self, *args, **kwargs)
+
+        monkeypatch.setattr(JobQueue, name, recorded)
+
+    async def run():
+        scheduler = IngestionScheduler(VectorStore(DIM), HashEmbeddingModel())
+        await scheduler.start()
+        try:
+            await scheduler.submit("doc", scheduler_settings)
+            return await _run_until(scheduler, "doc", (STATUS_DONE, STATUS_FAILED))
+        finally:
+            await scheduler.stop()
+
+    assert asyncio.run(run())["status"] == STATUS_DONE
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+import httpx
+import pytest
+from app.llm.cache import LLMResponseCache
+from app.llm.client import LLMClient
+
+
+def _client(cache: LLMResponseCache, handler) -> LLMClient:
+    client = LLMClient(model="test-model", base_url="http://ollama.test", cache=cache)
+    client._client = httpx.AsyncClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    return client
+
+
+def _record_threads(cache: LLMResponseCache, monkeypatch) -> list[str]:
+    """Wrap the SQLite-backed cache methods to record which thread runs them"""
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+
+        def recorded(*args, _method=method, **kwargs):
+            threads.append(threading.current_thread().name)
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(cache, name, recorded)
+    return threads
+
+
+def test_disk_cache_is_used_off_the_event_loop(tmp_path, monkeypatch):
+    calls = []
+
+    def ollama(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": " 40 bar ", "done": True})
+
+    async def run(cache: LLMResponseCache) -> list[str]:
+        client = _client(cache, ollama)
+        try:
+            return [await client.generate("pressure?") for _ in range(2)]
+        finally:
+            await client.close()
+
+    cache = LLMResponseCache(tmp_path / "llm.db")
+    threads = _record_threads(cache, monkeypatch)
+    assert asyncio.run(run(cache)) == ["40 bar", "40 bar"]
+    # Miss and store go through a worker thread; the repeat is a memory hit on the loop
+    assert len(calls) == 1
+    assert len(threads) == 2 and threading.main_thread().name not in threads
+    assert cache.stats()["memory_hits"] == 1
+    cache.close()
+
+    # A restarted process is served from disk, also off the loop
+    cache = LLMResponseCache(tmp_path / "llm.db")
+    threads = _record_threads(cache, monkeypatch)
+    assert asyncio.run(run(cache)) == ["40 bar", "40 bar"]
+    assert len(calls) == 1
+    assert threads and threading.main_thread().name not in threads
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def test_truncated_stream_is_not_cached(tmp_path):
+    lines = [{"response": "The pump runs at", "done": False}]
+
+    def ollama(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+
+    async def run(client: LLMClient) -> str:
+        return "".join([fragment async for fragment in client.generate_stream("pressure?", max_retries=1)])
+
+    async def main():
+        client = _client(LLMResponseCache(tmp_path / "llm.db"), ollama)
+        try:
+            with pytest.raises(ValueError, match="done event"):
+                await run(client)
+            # Nothing was stored, so the complete answer is generated next time
+            lines.append({"response": " 40 bar", "done": True})
+            assert await run(client) == "The pump runs at 40 bar"
+            assert await client.generate("pressure?") == "The pump runs at 40 bar"
+        finally:
+            await client.close()
+            client.cache.close()
+
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+from pypdf import PageObject
+from app.core.config import settings
+from app.rag.loader import iter_document_pages
+
+
+def write_pdf(path, pages: list[str]):
+    """Minimal uncompressed PDF with one line of Helvetica text per page"""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages)))}] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+def test_serial_pdf_pages_are_extracted_as_they_are_consumed(tmp_path, monkeypatch):
+    path = tmp_path / "manual.pdf"
+    write_pdf(path, [f"Page {i} text" for i in range(5)])
+
+    extracted = []
+    extract_text = PageObject.extract_text
+
+    def counting_extract_text(page, *args, **kwargs):
+        extracted.append(page)
+        return extract_text(page, *args, **kwargs)
+
+    monkeypatch.setattr(PageObject, "extract_text", counting_extract_text)
+
+    pages = iter_document_pages(path)
+    page_number, text = next(pages)
+    assert (page_number, text.strip()) == (1, "Page 0 text")
+    assert len(extracted) == 1
+
+    rest = list(pages)
+    assert [number for number, _ in rest] == [2, 3, 4, 5]
+    assert len(extracted) == 5
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """Thread pool that records the most page ranges ever submitted but not yet consumed"""
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.outstanding = 0
+        self.peak = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.outstanding += 1
+        self.peak = max(self.peak, self.outstanding)
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_parallel_pdf_ranges_are_bounded_by_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_TASK", 1)
+    path = tmp_path / "manual.pdf"
+    write_pdf(path, [f"Page {i} text" for i in range(12)])
+
+    with RecordingExecutor() as executor:
+        numbers = []
+        for page_number, text in iter_document_pages(path, executor=executor, workers=2):
+            # One range is consumed per page
+            executor.outstanding -= 1
+            numbers.append(page_number)
+            assert text.strip() == f"Page {page_number - 1} text"
+
+    assert numbers == list(range(1, 13))
+    # Two ranges per worker in flight, plus the one whose pages are being yielded
+    assert executor.peak == 2 * 2 + 1
@@ -0,0 +1,36 @@
+import pytest
+from app.agents.orchestrator import AgentOrchestrator, context_confidence
+from app.core.config import settings
+
+WEAK = [{"content": "pump", "document_id": "d", "chunk_index": 0, "score": 0.3}]
+STRONG = [{"content": "pump", "document_id": "d", "chunk_index": 0, "score": 0.8}]
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    monkeypatch.setattr(settings, "PLANNER_MODE", "auto")
+    return AgentOrchestrator(None, None, mode="speculative")
+
+
+def test_context_confidence_uses_top_scores():
+    contexts = [{"score": s} for s in (0.9, 0.1, 0.6, 0.3)]
+    assert context_confidence(contexts) == pytest.approx(0.6)
+    # Without scores it falls back to the number of contexts
+    assert context_confidence([{}, {}]) == pytest.approx(0.4)
+    assert context_confidence([]) == 0.0
+
+
+def test_speculates_only_on_weak_retrieval(orchestrator):
+    assert orchestrator._should_speculate("What is the pump pressure?", WEAK, iteration=0)
+    assert not orchestrator._should_speculate("What is the pump pressure?", STRONG, iteration=0)
+    assert not orchestrator._should_speculate("What is the pump pressure?", WEAK, iteration=2)
+
+
+def test_never_speculates_with_the_llm_planner(orchestrator):
+    orchestrator.planner.mode = "llm"
+    assert not orchestrator._should_speculate("What is the pump pressure?", WEAK, iteration=0)
+
+
+def test_serial_mode_never_speculates(orchestrator):
+    orchestrator.mode = "serial"
+    assert not orchestrator._should_speculate("What is the pump pressure?", WEAK, iteration=0)
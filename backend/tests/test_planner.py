@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.agents import planner
+from app.agents.planner import PlannerAgent, extract_keywords
+from app.core.config import settings
+
+RETRIEVE = SimpleNamespace(
+    name="retrieve_documents",
+    description="Search for relevant documents",
+    input_schema={"query": "string", "top_k": "integer", "filters": "object"}
+)
+CALCULATOR = SimpleNamespace(name="calculator", description="Evaluate arithmetic", input_schema={"expression": "string"})
+
+
+class ScriptedLLM:
+    def __init__(self, response: str):
+        self.response = response
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        return self.response
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    registered = [RETRIEVE]
+    monkeypatch.setattr(planner, "list_tools", lambda: list(registered))
+    monkeypatch.setattr(settings, "PLANNER_FAST_MIN_CONFIDENCE", 0.7)
+    monkeypatch.setattr(settings, "RETRIEVAL_TOP_K", 5)
+    return registered
+
+
+def test_extract_keywords():
+    assert extract_keywords("What is the max pressure of the P-200 pump, and the pump's rating?") == [
+        "max", "pressure", "P-200", "pump", "rating"
+    ]
+
+
+def test_fast_plan_strips_conversational_filler(tools):
+    plan, confidence, simple = PlannerAgent(None).fast_plan("Hi! Could you please tell me what the P-200 pressure is?")
+    assert plan == {"tool": "retrieve_documents", "arguments": {"query": "what the P-200 pressure is?", "top_k": 5}}
+    assert confidence == 1.0
+    assert simple
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What is the rated pressure of the pump?", 1.0),
+    ("What about it, the pump?", 0.4),
+    ("Compare the pumps. Which one is cheaper?", 0.7),
+    ("What is the?", 0.0),
+])
+def test_fast_plan_confidence(tools, question, expected):
+    assert PlannerAgent(None).fast_plan(question)[1] == expected
+
+
+def test_auto_mode_answers_simple_questions_without_the_llm(tools):
+    llm = ScriptedLLM("{}")
+    agent = PlannerAgent(llm, mode="auto")
+    tools.append(CALCULATOR)
+
+    plan = asyncio.run(agent.plan("What is the rated pressure of the pump?"))
+    assert plan["arguments"]["query"] == "What is the rated pressure of the pump?"
+    assert llm.calls == 0
+    assert not agent.uses_llm("What is the rated pressure of the pump?")
+
+
+def test_auto_mode_falls_back_to_the_llm(tools):
+    llm = ScriptedLLM('```json\n{"tool": "calculator", "arguments": {"expression": "2*3"}}\n```')
+    agent = PlannerAgent(llm, mode="auto")
+    tools.append(CALCULATOR)
+
+    # Not a single-lookup question and more than one tool to choose from
+    assert agent.uses_llm("Multiply two by three")
+    plan = asyncio.run(agent.plan("Multiply two by three"))
+    assert plan == {"tool": "calculator", "arguments": {"expression": "2*3", "top_k": 5}}
+    assert llm.calls == 1
+
+
+def test_single_tool_skips_the_llm_for_any_confident_question(tools):
+    agent = PlannerAgent(ScriptedLLM("{}"), mode="auto")
+    assert not agent.uses_llm("Pump maintenance schedule")
+    assert agent.uses_llm("What about it, the pump?")
+
+
+def test_llm_mode_always_asks_the_llm(tools):
+    llm = ScriptedLLM("not json")
+    plan = asyncio.run(PlannerAgent(llm, mode="llm").plan("What is the rated pressure of the pump?"))
+    # Unparseable responses fall back to retrieval with the raw question
+    assert plan["arguments"]["query"] == "What is the rated pressure of the pump?"
+    assert llm.calls == 1
+
+
+def test_request_filters_override_the_plan(tools):
+    llm = ScriptedLLM('{"tool": "retrieve_documents", "arguments": {"query": "pump", "filters": {"tag": "x"}}}')
+    agent = PlannerAgent(llm, mode="llm")
+    assert "filters" not in asyncio.run(agent.plan("pump"))["arguments"]
+    assert asyncio.run(agent.plan("pump", {"tag": "manuals"}))["arguments"]["filters"] == {"tag": "manuals"}
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        PlannerAgent(None, mode="magic")
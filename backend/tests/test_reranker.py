@@ -0,0 +1,73 @@
+import asyncio
+import time
+import pytest
+from app.rag import reranker
+from app.rag.reranker import CrossEncoderReranker
+
+CANDIDATES = [
+    {"content": "The warranty covers two years."},
+    {"content": "Pump pressure is 40 bar."},
+    {"content": "Service the pump pressure valve yearly."},
+]
+
+
+class KeywordCrossEncoder:
+    """Stand-in for CrossEncoder scoring a pair by the query words its text contains"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def predict(self, pairs, batch_size, show_progress_bar):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [sum(word in text.lower() for word in query.lower().split()) for query, text in pairs]
+
+
+def _reranker(monkeypatch, model: KeywordCrossEncoder, budget_ms: float = 1000) -> CrossEncoderReranker:
+    monkeypatch.setattr(reranker, "load_cross_encoder", lambda name, max_length: model)
+    return CrossEncoderReranker(model_name="stub", budget_ms=budget_ms)
+
+
+def test_candidates_are_reordered_in_one_batch(monkeypatch):
+    model = KeywordCrossEncoder()
+    ranker = _reranker(monkeypatch, model)
+    try:
+        results = asyncio.run(ranker.rerank("pump pressure valve", CANDIDATES, k=2))
+    finally:
+        ranker.close()
+
+    assert [r["content"] for r in results] == [CANDIDATES[2]["content"], CANDIDATES[1]["content"]]
+    assert [r["rerank_score"] for r in results] == [3.0, 2.0]
+    assert model.batches == [3]
+
+
+@pytest.mark.parametrize("model", [KeywordCrossEncoder(delay=0.2), KeywordCrossEncoder(fail=True)])
+def test_retrieval_order_is_kept_past_the_budget_or_on_errors(monkeypatch, model):
+    ranker = _reranker(monkeypatch, model, budget_ms=20)
+    try:
+        results = asyncio.run(ranker.rerank("pump pressure valve", CANDIDATES, k=2))
+    finally:
+        ranker.close()
+
+    assert results == CANDIDATES[:2]
+
+
+def test_requests_skip_reranking_while_an_overrun_is_running(monkeypatch):
+    model = KeywordCrossEncoder(delay=0.2)
+    ranker = _reranker(monkeypatch, model, budget_ms=20)
+
+    async def run():
+        first = await ranker.rerank("pump pressure valve", CANDIDATES, k=2)
+        second = await ranker.rerank("pump pressure valve", CANDIDATES, k=2)
+        return first, second
+
+    try:
+        assert asyncio.run(run()) == (CANDIDATES[:2], CANDIDATES[:2])
+    finally:
+        ranker.close()
+    # The second request did not queue behind the slow one
+    assert model.batches == [3]
@@ -0,0 +1,53 @@
+import asyncio
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.rag.vectorstore import VectorStore
+from app.tools.retrieval import RetrievalTool, reciprocal_rank_fusion
+
+DIM = 8
+
+
+class QueryEmbeddings:
+    """Embeds every query as ``vector`` and counts the texts it was asked to embed"""
+
+    def __init__(self, vector: np.ndarray):
+        self.vector = vector
+        self.embedded: list[str] = []
+
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        self.embedded.extend(texts)
+        return [self.vector.tolist() for _ in texts]
+
+
+def test_reciprocal_rank_fusion_prefers_chunks_ranked_by_both():
+    a, b, c = ({"document_id": "d", "chunk_index": i} for i in range(3))
+    fused = reciprocal_rank_fusion([[a, b], [b, c]], k=3, rrf_k=60)
+    assert [r["chunk_index"] for r in fused] == [1, 0, 2]
+
+
+def test_min_score_is_applied_before_fusion_truncates(store_path, monkeypatch):
+    monkeypatch.setattr(settings, "HYBRID_SEARCH_ENABLED", True)
+    monkeypatch.setattr(settings, "HYBRID_CANDIDATES", 20)
+    monkeypatch.setattr(settings, "RETRIEVAL_MIN_SCORE", 0.5)
+    monkeypatch.setattr(settings, "RERANK_ENABLED", False)
+
+    query = np.eye(DIM, dtype="float32")[0]
+    related = np.tile(query, (10, 1)) + np.random.default_rng(0).normal(scale=0.05, size=(10, DIM))
+    # Keyword matches whose embeddings are unrelated to the query
+    unrelated = np.tile(np.eye(DIM, dtype="float32")[1], (10, 1))
+    store = VectorStore(DIM)
+    store.add(
+        np.vstack([related, unrelated]).astype("float32"),
+        [{"document_id": "related", "chunk_index": i, "content": f"pump maintenance {i}"} for i in range(10)]
+        + [{"document_id": "keyword", "chunk_index": i, "content": f"error ERR-1042 {i}"} for i in range(10)]
+    )
+
+    embeddings = QueryEmbeddings(query)
+    results = asyncio.run(RetrievalTool(store, embeddings).run("ERR-1042", top_k=5))
+
+    assert len(results) == 5
+    assert {r["document_id"] for r in results} == {"related"}
+    assert all(r["score"] >= 0.5 for r in results)
+    # Keyword hits are scored from the stored vectors, not re-embedded
+    assert embeddings.embedded == ["ERR-1042"]
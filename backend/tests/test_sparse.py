@@ -0,0 +1,125 @@
+import math
+import numpy as np
+import pytest
+from app.rag import sparse
+from app.rag.sparse import (
+    BM25_B,
+    BM25_K1,
+    CorpusStats,
+    MemorySparseIndex,
+    SparseIndex,
+    analyze,
+    query_terms,
+    term_hash,
+    tokenize,
+)
+
+TEXTS = [
+    "pump pressure pump",
+    "valve pressure check",
+    "error ERR-1042 on pump",
+    "",
+]
+
+
+def _stats(*indexes, hashes):
+    return CorpusStats(
+        sum(index.rows for index in indexes),
+        sum(index.total_length for index in indexes),
+        sum(index.document_frequencies(hashes) for index in indexes)
+    )
+
+
+def _reference_bm25(query: str, texts: list[str]) -> dict[int, float]:
+    """Textbook BM25 over whole texts"""
+    documents = [tokenize(text) for text in texts]
+    average_length = sum(map(len, documents)) / len(documents)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(term in document for document in documents)
+        if not df:
+            continue
+        idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+        for row, document in enumerate(documents):
+            tf = document.count(term)
+            if tf:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * len(document) / average_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return scores
+
+
+def test_identifiers_are_indexed_whole_and_in_parts():
+    assert sorted(tokenize("See ERR-1042 in v2.3.1")) == sorted(
+        ["see", "err-1042", "in", "v2.3.1", "err", "1042", "v2", "3", "1"]
+    )
+
+
+def test_postings_layout(tmp_path):
+    index = SparseIndex.write(tmp_path / "sparse", TEXTS)
+    terms, offsets = index._arrays["terms"], index._arrays["offsets"]
+
+    assert index.rows == 4 and index.total_length == 3 + 3 + 6
+    assert list(index._arrays["lengths"]) == [3, 3, 6, 0]
+    assert np.all(terms[1:] > terms[:-1])
+    assert offsets[0] == 0 and offsets[-1] == len(index._arrays["rows"])
+
+    position = int(np.searchsorted(terms, np.uint64(term_hash("pump"))))
+    start, end = offsets[position], offsets[position + 1]
+    assert list(index._arrays["rows"][start:end]) == [0, 2]
+    assert list(index._arrays["tfs"][start:end]) == [2, 1]
+
+
+@pytest.mark.parametrize("query", ["pump pressure", "err-1042", "valve check pump"])
+def test_disk_and_memory_indexes_score_bm25(tmp_path, query):
+    disk = SparseIndex.write(tmp_path / "sparse", TEXTS)
+    memory = MemorySparseIndex()
+    memory.add(analyze(TEXTS))
+    hashes = query_terms(query)
+    expected = _reference_bm25(query, TEXTS)
+
+    for index in (disk, memory):
+        results = index.search(hashes, _stats(index, hashes=hashes), k=10)
+        assert {row: score for score, row in results} == pytest.approx(expected, rel=1e-5)
+        assert [row for _, row in results] == sorted(expected, key=lambda row: -expected[row])
+
+
+def test_scores_are_comparable_across_indexes(tmp_path):
+    disk = SparseIndex.write(tmp_path / "sparse", TEXTS[:2])
+    memory = MemorySparseIndex()
+    memory.add(analyze(TEXTS[2:]))
+    hashes = query_terms("pump pressure")
+    stats = _stats(disk, memory, hashes=hashes)
+
+    combined = {row: score for score, row in disk.search(hashes, stats, k=10)}
+    combined.update({row + 2: score for score, row in memory.search(hashes, stats, k=10)})
+    assert combined == pytest.approx(_reference_bm25("pump pressure", TEXTS), rel=1e-5)
+
+
+def test_ranges_and_tombstones_filter_postings(tmp_path):
+    index = SparseIndex.write(tmp_path / "sparse", TEXTS)
+    hashes = query_terms("pump pressure")
+    stats = _stats(index, hashes=hashes)
+
+    ranges = (np.array([1]), np.array([3]))
+    assert {row for _, row in index.search(hashes, stats, k=10, ranges=ranges)} == {1, 2}
+    deleted = np.array([True, False, False, False])
+    assert {row for _, row in index.search(hashes, stats, k=10, deleted=deleted)} == {1, 2}
+
+
+def test_common_terms_are_skipped_only_next_to_rarer_ones(monkeypatch):
+    monkeypatch.setattr(sparse, "COMMON_TERM_MIN_POSTINGS", 1)
+    stats = CorpusStats(100, 1000, np.array([50, 2, 0]))
+    assert list(stats.scored) == [False, True, False]
+    # With only common terms the rarest still ranks the results
+    stats = CorpusStats(100, 1000, np.array([50, 30, 0]))
+    assert list(stats.scored) == [False, True, False]
+
+
+def test_memory_index_since_renumbers_rows():
+    memory = MemorySparseIndex()
+    memory.add(analyze(TEXTS))
+    tail = memory.since(2)
+    hashes = query_terms("pump")
+
+    assert tail.rows == 2 and tail.total_length == 6
+    assert [row for _, row in tail.search(hashes, _stats(tail, hashes=hashes), k=10)] == [0]
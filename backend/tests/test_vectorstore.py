@@ -0,0 +1,177 @@
+import threading
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.rag.index_factory import reconstruct_range
+from app.rag.migrate_index import migrate_segment
+from app.rag.segments import Segment
+from app.rag.vectorstore import VectorStore
+
+DIM = 8
+
+
+def _add_document(store: VectorStore, document_id: str, rows: int = 3, seed: int = 0):
+    vectors = np.random.default_rng(seed).normal(size=(rows, DIM)).astype("float32")
+    store.add(
+        vectors,
+        [{"document_id": document_id, "chunk_index": i, "content": f"{document_id} {i}"} for i in range(rows)]
+    )
+    return vectors
+
+
+def test_tag_filters_resolve_while_documents_are_deleted(store_path):
+    store = VectorStore(DIM)
+    for i in range(200):
+        store.set_document_tags(f"doc-{i}", ["manual"])
+
+    errors = []
+
+    def delete_all():
+        for i in range(200):
+            store.delete_document(f"doc-{i}")
+
+    def resolve():
+        try:
+            for _ in range(500):
+                store.resolve_filters({"tags": ["manual"]})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=delete_all), threading.Thread(target=resolve)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert store.resolve_filters({"tags": ["manual"]}) == set()
+
+
+def test_tags_can_be_set_while_the_manifest_is_busy(store_path):
+    store = VectorStore(DIM)
+    with store._manifest_lock:
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (store.set_document_tags("doc", ["a"]), done.set()))
+        thread.start()
+        assert done.wait(5)
+        thread.join()
+    assert store.document_tags("doc") == ["a"]
+
+
+def test_deleted_documents_are_excluded_and_purged(store_path):
+    store = VectorStore(DIM)
+    vectors = _add_document(store, "keep", seed=1)
+    _add_document(store, "drop", seed=2)
+    store.persist()
+
+    assert store.delete_document("drop") == 3
+    assert {r["document_id"] for r in store.search(vectors[0], k=6)} == {"keep"}
+    # More than TOMBSTONE_COMPACTION_RATIO of the segment is dead, so it is rewritten
+    assert store.compact()
+    assert store.segments[0].count == 3
+    assert store.segments[0].deleted_count == 0
+
+
+def test_sparse_hits_are_scored_from_stored_vectors(store_path):
+    store = VectorStore(DIM)
+    vectors = _add_document(store, "doc", seed=3)
+    store.persist()
+    _add_document(store, "memtable", seed=4)
+
+    query = vectors[1]
+    results = store.sparse_search("doc memtable", k=6, vector=query)
+
+    assert len(results) == 6
+    for result in results:
+        stored = vectors[result["chunk_index"]] if result["document_id"] == "doc" else None
+        if stored is not None:
+            expected = stored @ query / (np.linalg.norm(stored) * np.linalg.norm(query))
+            assert result["score"] == pytest.approx(expected, abs=1e-5)
+        assert -1.0 - 1e-6 <= result["score"] <= 1.0 + 1e-6
+
+
+def test_commits_and_deletes_proceed_during_a_merge(store_path, monkeypatch):
+    monkeypatch.setattr(settings, "SEGMENT_MERGE_FACTOR", 2)
+    store = VectorStore(DIM)
+    keep = _add_document(store, "keep", seed=5)
+    store.persist()
+    _add_document(store, "drop", seed=6)
+    store.persist()
+
+    writing, release = threading.Event(), threading.Event()
+    write = Segment.write
+
+    def slow_write(*args, **kwargs):
+        if threading.current_thread().name == "merge":
+            writing.set()
+            assert release.wait(5)
+        return write(*args, **kwargs)
+
+    monkeypatch.setattr(Segment, "write", slow_write)
+    merge = threading.Thread(target=store.compact, name="merge")
+    merge.start()
+    try:
+        assert writing.wait(5)
+        # Neither waits for the merged segment to be written
+        assert store.delete_document("drop") == 3
+        _add_document(store, "new", seed=7)
+        store.persist()
+    finally:
+        release.set()
+        merge.join()
+
+    assert sorted(s.count for s in store.segments) == [3, 6]
+    merged = max(store.segments, key=lambda s: s.count)
+    assert merged.deleted_count == 3
+    results = store.search(keep[0], k=9)
+    assert {r["document_id"] for r in results} == {"keep", "new"}
+
+
+def test_ivf_pq_segments_compact_from_exact_vectors(store_path, small_ivf, monkeypatch):
+    monkeypatch.setattr(settings, "PQ_M", 4)
+    store = VectorStore(DIM, index_type="ivf_pq")
+    rng = np.random.default_rng(8)
+    vectors = rng.normal(size=(600, DIM)).astype("float32")
+    for document in range(6):
+        rows = slice(document * 100, (document + 1) * 100)
+        store.add(
+            vectors[rows],
+            [{"document_id": f"doc-{document}", "chunk_index": i, "content": f"chunk {i}"} for i in range(100)]
+        )
+    store.persist()
+    assert store.segments[0].index_type == "ivf_pq"
+    # The index only keeps PQ codes; the column keeps the rows as added
+    assert not np.allclose(reconstruct_range(store.segments[0].index, 0, 600), vectors, atol=1e-4)
+    np.testing.assert_array_equal(store.segments[0].vectors(), vectors)
+
+    store.delete_document("doc-0")
+    store.delete_document("doc-1")
+    assert store.compact()
+    np.testing.assert_array_equal(store.segments[0].vectors(), vectors[200:])
+
+    # Reopened from disk, keyword hits are scored against the exact vectors too
+    reopened = VectorStore(DIM, index_type="ivf_pq")
+    np.testing.assert_array_equal(reopened.segments[0].vectors(), vectors[200:])
+    query = vectors[250]
+    hit = next(r for r in reopened.sparse_search("chunk 50", k=20, vector=query) if r["document_id"] == "doc-2")
+    assert hit["chunk_index"] == 50
+    assert hit["score"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_migration_keeps_exact_vectors_through_ivf_pq(store_path, small_ivf, monkeypatch):
+    monkeypatch.setattr(settings, "PQ_M", 4)
+    store = VectorStore(DIM, index_type="flat")
+    vectors = np.random.default_rng(9).normal(size=(600, DIM)).astype("float32")
+    store.add(vectors, [{"document_id": "doc", "chunk_index": i, "content": f"chunk {i}"} for i in range(600)])
+    store.persist()
+    path = store.segments[0].path
+
+    migrate_segment(path, "ivf_pq", keep_backup=False)
+    assert Segment.open(path).index_type == "ivf_pq"
+    np.testing.assert_array_equal(Segment.open(path).vectors(), vectors)
+
+    # Back to flat from the column, not from the PQ reconstructions
+    migrate_segment(path, "flat", keep_backup=False)
+    segment = Segment.open(path)
+    assert segment.raw_vectors is None
+    np.testing.assert_array_equal(segment.vectors(), vectors)
@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+from app.agents.verifier import ERROR_ANSWER, VerifierAgent
+
+CONTEXTS = [{"content": "The pump runs at 40 bar.", "document_id": "d", "chunk_index": 0}]
+
+
+class BrokenStreamClient:
+    """Streams ``fragments`` and then fails, like a connection dropped mid-answer"""
+
+    def __init__(self, fragments: list[str]):
+        self.fragments = fragments
+
+    async def generate_stream(self, prompt, on_context=None):
+        for fragment in self.fragments:
+            yield fragment
+        raise ValueError("LLM stream ended before the done event")
+
+
+async def _collect(verifier: VerifierAgent) -> list[str]:
+    return [fragment async for fragment in verifier.verify_stream("pressure?", CONTEXTS)]
+
+
+def test_stream_failing_before_output_yields_error_answer():
+    assert asyncio.run(_collect(VerifierAgent(BrokenStreamClient([])))) == [ERROR_ANSWER]
+
+
+def test_stream_failing_mid_answer_raises():
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(VerifierAgent(BrokenStreamClient(["The pump runs at"]))))
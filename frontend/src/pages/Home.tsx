@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { apiClient } from "../services/api";
 import type { ApiError } from "../services/api";
 
@@ -17,6 +17,8 @@ interface ProgressStage {
 export default function Home() {
     const [question, setQuestion] = useState("");
     const [answer, setAnswer] = useState<string | null>(null);
+    // Iteration the streamed answer belongs to; a refinement restarts it
+    const answerIteration = useRef<number | null>(null);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState<string | null>(null);
     const [apiKey, setApiKey] = useState<string>("");
@@ -101,6 +103,7 @@ export default function Home() {
 
         setLoading(true);
         setAnswer(null);
+        answerIteration.current = null;
         setError(null);
         setProgress([]);
         setCurrentStage(null);
@@ -124,6 +127,11 @@ export default function Home() {
                 setError(errorMsg);
                 setCurrentStage("error");
                 setLoading(false);
+            },
+            (token, iteration) => {
+                const restart = answerIteration.current !== iteration;
+                answerIteration.current = iteration;
+                setAnswer((prev) => (restart || prev === null ? token : prev + token));
             }
         );
 
@@ -145,6 +153,7 @@ export default function Home() {
             verifying: "Verifying",
             evaluating: "Evaluating",
             refining: "Refining",
+            cached: "From Cache",
             complete: "Ready!"
         };
         return labels[stage] || stage;
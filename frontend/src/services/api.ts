@@ -78,7 +78,8 @@ class ApiClient {
         question: string,
         onProgress: (stage: string, message: string, data?: any) => void,
         onComplete: (result: any) => void,
-        onError: (error: string) => void
+        onError: (error: string) => void,
+        onToken?: (token: string, iteration: number) => void
     ): () => void {
         const headers = this.getHeaders();
         const headers_all = {...headers, "Accept" : "text/event-stream" };
@@ -128,6 +129,8 @@ class ApiClient {
                             
                             if (data.type === "progress") {
                                 onProgress(data.stage, data.message, data);
+                            } else if (data.type === "token") {
+                                onToken?.(data.token, data.iteration);
                             } else if (data.type === "complete") {
                                 onComplete(data.result);
                                 return;